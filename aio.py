@@ -0,0 +1,104 @@
+"""
+One event loop per worker process.
+
+The async upstream clients (AsyncAnthropic, httpx, Stripe's async API) keep
+connection pools that belong to the loop they were first used on, so every
+coroutine in a worker must run on the same loop:
+
+- Under gunicorn's sync workers a daemon thread runs the loop, and Flask's
+  async views are handed to it with run_sync().
+- Under the ASGI server (asgi.py) the server's own loop is registered with
+  set_worker_loop() and async views are awaited on it directly.
+
+spawn() schedules fire-and-forget background work on the same loop.
+"""
+
+import asyncio
+import concurrent.futures
+import contextvars
+import os
+import threading
+
+_loop = None
+_loop_pid = None
+_loop_thread_id = None
+_lock = threading.Lock()
+_background = set()
+
+
+def set_worker_loop(loop):
+    """Use an already running loop (the ASGI server's) as this worker's loop."""
+    global _loop, _loop_pid, _loop_thread_id
+    with _lock:
+        _loop, _loop_pid, _loop_thread_id = loop, os.getpid(), threading.get_ident()
+
+
+def worker_loop_is_unset():
+    return _loop is None or _loop_pid != os.getpid()
+
+
+def worker_loop():
+    """Return this process's loop, starting a background loop thread if needed."""
+    global _loop, _loop_pid, _loop_thread_id
+    if _loop is not None and _loop_pid == os.getpid():
+        return _loop
+    with _lock:
+        if _loop is None or _loop_pid != os.getpid():
+            loop = asyncio.new_event_loop()
+            started = threading.Event()
+
+            def run():
+                global _loop_thread_id
+                asyncio.set_event_loop(loop)
+                _loop_thread_id = threading.get_ident()
+                started.set()
+                loop.run_forever()
+
+            threading.Thread(target=run, name='worker-loop', daemon=True).start()
+            started.wait()
+            _loop, _loop_pid = loop, os.getpid()
+    return _loop
+
+
+def _submit(coro, context):
+    loop = worker_loop()
+    future = concurrent.futures.Future()
+
+    def done(task):
+        if task.cancelled():
+            future.cancel()
+        elif task.exception() is not None:
+            future.set_exception(task.exception())
+        else:
+            future.set_result(task.result())
+
+    def start():
+        task = loop.create_task(coro, context=context)
+        _background.add(task)
+        task.add_done_callback(_background.discard)
+        task.add_done_callback(done)
+
+    loop.call_soon_threadsafe(start)
+    return future
+
+
+def run_sync(coro):
+    """Run `coro` on the worker loop from a sync thread and wait for its result.
+
+    The coroutine sees the caller's context variables (Flask's request
+    context, the current trace).
+    """
+    if threading.get_ident() == _loop_thread_id and _loop_pid == os.getpid():
+        raise RuntimeError('run_sync() called from the worker loop; await the coroutine instead')
+    return _submit(coro, contextvars.copy_context()).result()
+
+
+def spawn(coro, context=None):
+    """Schedule `coro` on the worker loop without waiting. Returns a concurrent Future.
+
+    Safe to call from the loop itself or from any thread. The task gets a
+    fresh context, so it is not tied to the request that started it, unless
+    `context` is given (e.g. contextvars.copy_context() to keep the current
+    trace; the task must still not touch the request once it has ended).
+    """
+    return _submit(coro, context if context is not None else contextvars.Context())
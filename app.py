@@ -1,21 +1,56 @@
 import os
 import io
+import base64
 import uuid
 import time
 import json
 import re
 import hashlib
+import importlib
+import asyncio
+import contextvars
+import threading
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 load_dotenv()
-from flask import Flask, render_template, request, jsonify, redirect, url_for
-import anthropic
-import stripe
-import requests as http_requests
-from pypdf import PdfReader
-from docx import Document
-
-app = Flask(__name__)
+from flask import (Flask, render_template, request, jsonify, redirect, url_for, g, send_from_directory, abort,
+                   template_rendered)
+from metrics import Metrics
+import tracing
+import aio
+import emails
+from payments import PaymentLedger
+from eventlog import EventLog
+from scorestats import ScoreStats
+from sharecard import ShareCards
+from pagetable import PageTable
+from httpcache import HttpCache, StaticFingerprints
+from jobmatch import KeywordIndex
+from cvexport import CvExports, FORMATS as EXPORT_FORMATS
+from modelrouter import ModelRouter, InvalidReply, require
+import resumetext
+
+
+class CVRoastFlask(Flask):
+    def async_to_sync(self, func):
+        # Run async views on this worker's long-lived loop rather than a new loop
+        # per request, so the async upstream clients can reuse their connections
+        def run(*args, **kwargs):
+            if profiler:
+                with profiler.waiting_on_loop():
+                    return aio.run_sync(func(*args, **kwargs))
+            return aio.run_sync(func(*args, **kwargs))
+        return run
+
+    def get_send_file_max_age(self, filename):
+        # static_url() links carry the file's content hash, so those URLs never change
+        if request.endpoint == 'static' and _fingerprinted(filename):
+            return STATIC_IMMUTABLE_MAX_AGE
+        return STATIC_MAX_AGE
+
+
+app = CVRoastFlask(__name__)
 app.secret_key = os.environ.get('SECRET_KEY', 'dev-secret-change-me')
 app.config['MAX_CONTENT_LENGTH'] = 5 * 1024 * 1024  # 5MB max upload
 
@@ -27,6 +62,25 @@ STRIPE_WEBHOOK_SECRET = os.environ.get('STRIPE_WEBHOOK_SECRET')
 BASE_URL = os.environ.get('BASE_URL', 'http://localhost:5000')
 MAILERSEND_API_KEY = os.environ.get('MAILERSEND_API_KEY')
 FROM_EMAIL = os.environ.get('FROM_EMAIL', 'reviews@cvroast.com')
+# Upstream endpoints are overridable so benchmarks can point them at local fakes
+# (the Anthropic SDK reads ANTHROPIC_BASE_URL itself)
+MAILERSEND_API_URL = os.environ.get('MAILERSEND_API_URL', 'https://api.mailersend.com/v1/email')
+IPAPI_URL = os.environ.get('IPAPI_URL', 'https://ipapi.co')
+STRIPE_API_BASE = os.environ.get('STRIPE_API_BASE')
+# SQLite payment ledger fed by the Stripe webhook, shared by all workers
+PAYMENTS_DB = os.environ.get('PAYMENTS_DB', 'payments.db')
+# Append-only analytics event log with hourly/daily rollups
+ANALYTICS_DB = os.environ.get('ANALYTICS_DB', 'analytics.db')
+# Start the paid rewrite when checkout begins; caps what abandoned checkouts may cost per day (0 disables)
+SPECULATIVE_BUDGET_USD = float(os.environ.get('SPECULATIVE_BUDGET_USD', '0'))
+# Pre-rendered /score/<n> share cards (python -m sharecard og_cache)
+OG_CACHE_DIR = os.environ.get('OG_CACHE_DIR', 'og_cache')
+# 'single' rewrites the CV in one call; 'sectional' splits it and rewrites sections in parallel
+REWRITE_MODE = os.environ.get('REWRITE_MODE', 'single')
+# PDF/DOCX exports of rewritten CVs, named by content hash; rendered by a process pool per worker (0: a thread)
+CV_EXPORT_DIR = os.environ.get('CV_EXPORT_DIR', 'cv_exports')
+CV_EXPORT_WORKERS = int(os.environ.get('CV_EXPORT_WORKERS', '1'))
+# MODEL_ROUTES (JSON or a JSON file) overrides which model tiers each task uses, see modelrouter.py
 
 # Currency config per country
 CURRENCY_MAP = {
@@ -36,76 +90,240 @@ CURRENCY_MAP = {
 }
 DEFAULT_CURRENCY = CURRENCY_MAP['US']
 
-stripe.api_key = STRIPE_SECRET_KEY
-ai = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
+# The upstream SDKs are most of the import cost (stripe alone is ~1s), so they are
+# imported and their clients built on first use; a worker boots and answers /health
+# without them. Under `gunicorn --preload` the master imports them once instead and
+# every forked worker shares the loaded modules (see gunicorn.conf.py).
+HEAVY_MODULES = ('stripe', 'anthropic', 'httpx', 'pypdf', 'docx')
+ai = None       # anthropic.AsyncAnthropic, see _ai()
+http = None     # httpx.AsyncClient, see _http()
+_stripe_module = None
+
+
+def _ai():
+    global ai
+    if ai is None:
+        import anthropic
+        ai = anthropic.AsyncAnthropic(api_key=ANTHROPIC_API_KEY)
+    return ai
+
+
+def _http():
+    global http
+    if http is None:
+        import httpx
+        http = httpx.AsyncClient()
+    return http
+
+
+def _stripe():
+    global _stripe_module
+    if _stripe_module is None:
+        import stripe
+        stripe.api_key = STRIPE_SECRET_KEY
+        if STRIPE_API_BASE:
+            stripe.api_base = STRIPE_API_BASE
+        _stripe_module = stripe
+    return _stripe_module
+
+
+def preload_heavy_modules():
+    """Import the lazily loaded SDKs now (the gunicorn master calls this before forking)."""
+    for name in HEAVY_MODULES:
+        importlib.import_module(name)
+    # The SDKs import more on first use: stripe its response classes, and the clients their
+    # transports (httpcore, anyio). Build throwaway clients so that happens here too; the
+    # clients used for requests are still created per worker, so no connection pool is forked.
+    importlib.import_module('stripe._object_classes')
+    import anthropic
+    anthropic.AsyncAnthropic(api_key='preload')
+
 
 ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN', 'change-me-in-prod')
 ADMIN_EMAIL = os.environ.get('ADMIN_EMAIL', 'matthewjwills1@gmail.com')
 
+# --- Metrics (exposed at /metrics, aggregated across gunicorn workers) ---
+metrics = Metrics(directory=os.environ.get('METRICS_DIR'))
+metrics.describe('http_request_duration_seconds', 'histogram', 'Time spent handling HTTP requests.')
+metrics.describe('http_requests_in_flight', 'gauge', 'Requests currently being handled.')
+metrics.describe('upstream_request_duration_seconds', 'histogram',
+                 'Time spent waiting on Anthropic, Stripe, MailerSend and ipapi.')
+metrics.describe('payment_checks_total', 'counter',
+                 'Full-review payment checks, by whether the local ledger or the Stripe API answered.')
+metrics.describe('stripe_webhooks_total', 'counter', 'Stripe webhook deliveries, by event type and outcome.')
+metrics.describe('rewrite_prestarts_total', 'counter',
+                 'Full reviews started from the payment webhook, by outcome (started, failed).')
+metrics.describe('speculative_rewrites_total', 'counter',
+                 'Rewrites started at checkout, by outcome (started, used, failed, abandoned, skipped over budget).')
+metrics.describe('job_matches_total', 'counter', 'Resume vs job description matches, by whether the model commented.')
+metrics.describe('speculative_spend_usd_total', 'counter',
+                 'Estimated Anthropic spend on speculative rewrites, by whether they were used or abandoned.')
+metrics.describe('cv_export_render_seconds', 'histogram', 'Time spent rendering a CV export, by format.')
+metrics.describe('cv_exports_total', 'counter', 'Full-review CV exports, by outcome (rendered, failed).')
+metrics.describe('full_reviews_total', 'counter',
+                 'Full-review calls, by outcome (generated, stored, attached, waited, failed, expired, gone).')
+metrics.describe('model_call_duration_seconds', 'histogram', 'Time spent on routed model calls, by task and tier.')
+metrics.describe('model_calls_total', 'counter',
+                 'Routed model calls, by task, tier and outcome (accepted, escalated to the next tier, invalid).')
+metrics.describe('model_spend_usd_total', 'counter', 'Estimated Anthropic spend, by task and tier.')
+metrics.describe('resume_compactions_total', 'counter',
+                 'Resumes cleaned up for a model call, by task and whether they were trimmed to fit the budget.')
+metrics.describe('resume_tokens_saved_total', 'counter',
+                 'Estimated input tokens removed from resumes, by task and step (cleaned, trimmed).')
+
+# --- Tracing (X-Trace-Id / Server-Timing headers, opt-in slow-request profiling) ---
+SLOW_REQUEST_PROFILE_MS = int(os.environ.get('SLOW_REQUEST_PROFILE_MS', '0'))  # 0 disables profiling
+PROFILE_DIR = os.environ.get('PROFILE_DIR', 'profiles')
+profiler = tracing.SlowRequestProfiler(
+    SLOW_REQUEST_PROFILE_MS, PROFILE_DIR, interval_ms=int(os.environ.get('PROFILE_INTERVAL_MS', '10')),
+) if SLOW_REQUEST_PROFILE_MS else None
+
 # --- In-memory stores (fine for single-instance deploy) ---
 resume_store = {}       # uuid -> {resume, created_at}
 rate_limits = {}        # ip_hash -> {count, window_start}
-paid_sessions = set()   # session_ids that have been used
-
-# --- Analytics ---
-analytics = {
-    'total_roasts': 0,
-    'total_checkouts': 0,
-    'total_payments': 0,
-    'revenue_cents': 0,
-    'started_at': datetime.utcnow().isoformat(),
-    'daily': {},        # "2026-02-10" -> {roasts, checkouts, payments, revenue_cents}
-    'scores': [],       # last 100 scores for avg calculation
-}
+# SQLite, and a write may wait on another worker's lock: async code calls it through asyncio.to_thread
+ledger = PaymentLedger(PAYMENTS_DB)
+reviews_inflight = {}   # session_id -> Future of a full review being generated by this worker
+cv_exports = CvExports(CV_EXPORT_DIR, workers=CV_EXPORT_WORKERS,
+                       observe=lambda fmt, seconds: metrics.observe('cv_export_render_seconds', seconds, format=fmt))
+
+
+def _observe_model_call(task, tier, seconds, cost, outcome):
+    metrics.observe('model_call_duration_seconds', seconds, task=task, tier=tier)
+    metrics.inc('model_calls_total', task=task, tier=tier, outcome=outcome)
+    metrics.inc('model_spend_usd_total', cost, task=task, tier=tier)
+
+
+models = ModelRouter.from_env(observe=_observe_model_call)
+
+# --- Analytics (durable; survives restarts and deploys) ---
+events = EventLog(ANALYTICS_DB)
+STARTED_AT = datetime.utcnow().isoformat()
+
+def _track(event, amount_cents=0, score=None):
+    """Record a roast, checkout, payment, email signup or upload."""
+    events.log(event, amount_cents, score)
 
-def _track(event, amount_cents=0):
-    today = datetime.utcnow().strftime('%Y-%m-%d')
-    if today not in analytics['daily']:
-        analytics['daily'][today] = {'roasts': 0, 'checkouts': 0, 'payments': 0, 'revenue_cents': 0}
-    day = analytics['daily'][today]
-    if event == 'roast':
-        analytics['total_roasts'] += 1
-        day['roasts'] += 1
-    elif event == 'checkout':
-        analytics['total_checkouts'] += 1
-        day['checkouts'] += 1
-    elif event == 'payment':
-        analytics['total_payments'] += 1
-        analytics['revenue_cents'] += amount_cents
-        day['payments'] += 1
-        day['revenue_cents'] += amount_cents
+
+def _summary(totals):
+    """Shape EventLog totals for /admin/stats and the payment email."""
+    roasts = totals['roast']
+    return {
+        'roasts': roasts['count'],
+        'checkouts': totals['checkout']['count'],
+        'payments': totals['payment']['count'],
+        'revenue_cents': totals['payment']['amount_cents'],
+        'emails': totals['email']['count'],
+        'uploads': totals['upload']['count'],
+        'avg_score': round(roasts['score_sum'] / roasts['score_count'], 1) if roasts['score_count'] else 0,
+    }
 
 FREE_ROASTS_PER_DAY = 5
 RESUME_TTL_HOURS = 2
-
-# Recent scores for social proof
+REVIEW_TTL_HOURS = 24            # finished reviews are served again on reloads of /success for this long
+PAYMENT_EMAIL_TTL_HOURS = 24     # customer emails are cleared from the payment ledger after this long
+CV_EXPORT_TTL_HOURS = REVIEW_TTL_HOURS   # stored reviews link to their exports
+REVIEW_POLL_SECONDS = 1
+REVIEW_WAIT_SECONDS = 20         # a reload waits this long on another worker's review, then is told to poll again
+PURGE_INTERVAL = 60              # seconds between purges of the ledger and CV_EXPORT_DIR, per worker
+# Estimated input tokens of resume text per model call, after clean-up (see resumetext.py)
+ROAST_INPUT_TOKENS = 1250        # the 5,000 characters the roast used to cut at
+REWRITE_INPUT_TOKENS = 3000
+CV_EXPORT_TIMEOUT = 20           # seconds full_review waits for the exports before sending the email without them
+SPECULATIVE_TTL_MINUTES = 30     # Stripe's shortest checkout session lifetime
+SPECULATIVE_COST_GUESS_USD = 0.06  # one Sonnet rewrite, until a real one has been measured
+REWRITE_GIVE_UP_SECONDS = 600    # a rewrite another worker hasn't finished by now is taken to have died with it
+# Likewise a review: the rewrite, the exports, then the admin and customer emails (10 s each at most)
+REVIEW_GIVE_UP_SECONDS = REWRITE_GIVE_UP_SECONDS + CV_EXPORT_TIMEOUT + 2 * 10
+
+_ai_spend = contextvars.ContextVar('ai_spend', default=None)
+
+# Recent scores for social proof and admin stats
 import random
-recent_scores = [random.randint(22, 58) for _ in range(10)]  # seed with realistic scores
+score_stats = ScoreStats(window=256)
+seed_scores = [random.randint(22, 58) for _ in range(10)]  # realistic scores until real ones arrive
+SOCIAL_PROOF_WINDOW = 20
+SOCIAL_PROOF_INTERVAL = 60     # seconds between social-proof feed rebuilds
+SOCIAL_PROOF_FEED_SIZE = 8
+
+
+@contextmanager
+def _upstream(service, operation, **attrs):
+    """Trace and time a call to an external service."""
+    with tracing.span(f'{service}.{operation}', **attrs), \
+            metrics.timer('upstream_request_duration_seconds', service=service, operation=operation):
+        yield
+
 
+async def _ai_create(**kwargs):
+    """Call the Anthropic Messages API, recording its latency per model."""
+    with _upstream('anthropic', 'messages.create', model=kwargs.get('model', '')):
+        response = await _ai().messages.create(**kwargs)
+    spend = _ai_spend.get()
+    if spend is not None:
+        spend[0] += models.cost(kwargs.get('model', ''), response.usage)
+    return response
+
+
+async def _ai_json(task, signals, parse=None, **kwargs):
+    """A Messages API call for `task` on the tier the router picks, retried a tier up if `parse` rejects it.
+
+    `parse` defaults to _parse_json_reply, so any JSON reply is accepted.
+    """
+    return await models.run(task, signals, lambda model: _ai_create(model=model, **kwargs),
+                            parse or _parse_json_reply)
 
-def _notify_admin_payment(email, amount_display):
+
+async def _send_email(to_email, subject, html, text, timeout=10, attachments=None):
+    """Send a transactional email via MailerSend. Returns True if accepted.
+
+    attachments: [(filename, bytes)], sent base64-encoded.
+    """
+    payload = {
+        'from': {'email': FROM_EMAIL, 'name': 'CVRoast'},
+        'to': [{'email': to_email}],
+        'subject': subject,
+        'html': html,
+        'text': text,
+    }
+    if attachments:
+        payload['attachments'] = [
+            {'filename': filename, 'content': base64.b64encode(data).decode(), 'disposition': 'attachment'}
+            for filename, data in attachments
+        ]
+    try:
+        with _upstream('mailersend', 'email.send'):
+            resp = await _http().post(
+                MAILERSEND_API_URL,
+                headers={
+                    'Authorization': f'Bearer {MAILERSEND_API_KEY}',
+                    'Content-Type': 'application/json',
+                },
+                json=payload,
+                timeout=timeout,
+            )
+        return resp.status_code in (200, 201, 202)
+    except Exception:
+        return False
+
+
+async def _notify_admin_payment(email, amount_display):
     """Email admin when a payment comes in."""
     if not MAILERSEND_API_KEY or not ADMIN_EMAIL:
         return
-    try:
-        http_requests.post(
-            'https://api.mailersend.com/v1/email',
-            headers={'Authorization': f'Bearer {MAILERSEND_API_KEY}', 'Content-Type': 'application/json'},
-            json={
-                'from': {'email': FROM_EMAIL, 'name': 'CVRoast'},
-                'to': [{'email': ADMIN_EMAIL}],
-                'subject': f'New CVRoast payment from {email}',
-                'html': f'<h2 style="color:#22c55e;">New Payment!</h2>'
-                        f'<p><strong>Customer:</strong> {email}</p>'
-                        f'<p><strong>Amount:</strong> {amount_display}</p>'
-                        f'<p><strong>Time:</strong> {datetime.utcnow().strftime("%Y-%m-%d %H:%M UTC")}</p>'
-                        f'<p>Total revenue: ${analytics["revenue_cents"]/100:.2f} ({analytics["total_payments"]} payments)</p>',
-                'text': f'New payment from {email} for {amount_display}',
-            },
-            timeout=5,
-        )
-    except Exception:
-        pass
+    events.flush()
+    totals = _summary(events.totals())
+    await _send_email(
+        ADMIN_EMAIL,
+        f'New CVRoast payment from {email}',
+        f'<h2 style="color:#22c55e;">New Payment!</h2>'
+        f'<p><strong>Customer:</strong> {email}</p>'
+        f'<p><strong>Amount:</strong> {amount_display}</p>'
+        f'<p><strong>Time:</strong> {datetime.utcnow().strftime("%Y-%m-%d %H:%M UTC")}</p>'
+        f'<p>Total revenue: ${totals["revenue_cents"]/100:.2f} ({totals["payments"]} payments)</p>',
+        f'New payment from {email} for {amount_display}',
+        timeout=5,
+    )
 
 
 # --- Helpers ---
@@ -114,6 +332,15 @@ def _hash_ip(ip):
     return hashlib.sha256(ip.encode()).hexdigest()[:16]
 
 
+def _is_admin():
+    """Admin endpoints accept the token as ?token= or an Authorization: Bearer header."""
+    token = request.args.get('token')
+    if not token:
+        auth = request.headers.get('Authorization', '')
+        token = auth[len('Bearer '):] if auth.startswith('Bearer ') else None
+    return token == ADMIN_TOKEN
+
+
 def _check_rate_limit(ip):
     key = _hash_ip(ip)
     now = time.time()
@@ -130,101 +357,203 @@ def _check_rate_limit(ip):
     return True
 
 
+def _compact_resume(resume_text, task, budget_tokens):
+    """The resume as a model call gets it: cleaned up and fitted into `budget_tokens`."""
+    with tracing.span('resume.compact', task=task, chars=len(resume_text)):
+        compacted = resumetext.compact(resume_text, budget_tokens)
+    metrics.inc('resume_compactions_total', task=task, trimmed='yes' if compacted.trimmed else 'no')
+    metrics.inc('resume_tokens_saved_total', compacted.raw_tokens - compacted.clean_tokens, task=task, step='cleaned')
+    metrics.inc('resume_tokens_saved_total', compacted.clean_tokens - compacted.tokens, task=task, step='trimmed')
+    return compacted.text
+
+
+def _parse_json_reply(response):
+    """Parse a model reply as JSON, stripping code fences if present."""
+    with tracing.span('json.parse'):
+        raw = response.content[0].text.strip()
+        if raw.startswith('```'):
+            raw = raw.split('\n', 1)[1].rsplit('```', 1)[0].strip()
+        return json.loads(raw)
+
+
+_last_purge = {'interval': None}
+
+
 def _cleanup_old_resumes():
     cutoff = time.time() - (RESUME_TTL_HOURS * 3600)
     expired = [k for k, v in resume_store.items() if v['created_at'] < cutoff]
     for k in expired:
         del resume_store[k]
+    # The ledger and export purges touch disk: at most once per PURGE_INTERVAL, off the request's thread
+    interval = int(time.time() // PURGE_INTERVAL)
+    if _last_purge['interval'] != interval:
+        _last_purge['interval'] = interval
+        threading.Thread(target=_purge_stored, name='purge-stored', daemon=True).start()
 
 
-def _send_cv_email(to_email, cv_data):
-    """Send the rewritten CV to the customer via MailerSend."""
-    if not MAILERSEND_API_KEY or not to_email:
-        return False
-
-    cv = cv_data.get('cv', {})
-    name = cv.get('name', 'Your Name')
-    title = cv.get('title', '')
-    location = cv.get('location', '')
-    phone = cv.get('phone', '')
-    email = cv.get('email', '')
-
-    # Build experience HTML
-    exp_html = ''
-    for job in cv.get('experience', []):
-        bullets = ''.join(f'<li style="margin:4px 0;color:#333;">{b}</li>' for b in job.get('bullets', []))
-        exp_html += f'''
-        <div style="margin-bottom:20px;">
-            <div style="font-weight:700;font-size:15px;color:#1a1a2e;">{job.get("title", "")}</div>
-            <div style="font-size:13px;color:#666;margin-bottom:6px;">{job.get("company", "")} | {job.get("dates", "")}</div>
-            <ul style="padding-left:20px;margin:0;">{bullets}</ul>
-        </div>'''
-
-    skills_html = ' &bull; '.join(cv.get('key_skills', []))
-    certs_html = ''.join(f'<li style="margin:2px 0;color:#333;">{c}</li>' for c in cv.get('certifications', []))
-
-    score_before = cv_data.get('ats_score_before', '?')
-    score_after = cv_data.get('ats_score_after', '?')
-
-    html_body = f"""
-    <div style="max-width:660px;margin:0 auto;font-family:Arial,sans-serif;">
-        <div style="text-align:center;padding:24px;background:#0a0a0b;border-radius:12px 12px 0 0;">
-            <span style="font-size:22px;font-weight:800;color:#ff6b2c;">CVRoast</span>
-            <h1 style="font-size:22px;font-weight:700;color:#fff;margin:12px 0 4px;">Your Professionally Rewritten CV</h1>
-            <p style="color:#8e8e9a;font-size:13px;margin:0;">ATS Score: {score_before}/100 → {score_after}/100</p>
-        </div>
-        <div style="background:#ffffff;padding:40px 36px;border:1px solid #e0e0e0;">
-            <h1 style="font-size:26px;font-weight:800;color:#1a1a2e;margin:0;">{name}</h1>
-            <div style="font-size:14px;color:#555;margin:4px 0 16px;">{title}</div>
-            <div style="font-size:13px;color:#666;margin-bottom:20px;padding-bottom:16px;border-bottom:2px solid #1a365d;">
-                {f'{location}' if location else ''}{f' | {phone}' if phone else ''}{f' | {email}' if email else ''}
-            </div>
-            <h2 style="font-size:14px;font-weight:700;color:#1a365d;text-transform:uppercase;letter-spacing:1px;margin:20px 0 8px;">Professional Summary</h2>
-            <p style="font-size:14px;color:#333;line-height:1.7;margin:0 0 20px;">{cv.get("personal_statement", "")}</p>
-            <h2 style="font-size:14px;font-weight:700;color:#1a365d;text-transform:uppercase;letter-spacing:1px;margin:20px 0 8px;">Key Skills</h2>
-            <p style="font-size:13px;color:#333;line-height:1.8;margin:0 0 20px;">{skills_html}</p>
-            <h2 style="font-size:14px;font-weight:700;color:#1a365d;text-transform:uppercase;letter-spacing:1px;margin:20px 0 12px;">Professional Experience</h2>
-            {exp_html}
-            {f'<h2 style="font-size:14px;font-weight:700;color:#1a365d;text-transform:uppercase;letter-spacing:1px;margin:20px 0 8px;">Certifications</h2><ul style="padding-left:20px;margin:0;">{certs_html}</ul>' if certs_html else ''}
-        </div>
-        <div style="text-align:center;padding:24px;background:#f8f8f8;border-radius:0 0 12px 12px;border:1px solid #e0e0e0;border-top:none;">
-            <p style="color:#666;font-size:13px;margin:0 0 8px;">Tip: Open this email on your computer and print to save as PDF.</p>
-            <a href="https://cvroast.com" style="display:inline-block;padding:10px 24px;background:#ff6b2c;color:#fff;text-decoration:none;border-radius:8px;font-weight:700;font-size:13px;">Share CVRoast</a>
-            <p style="color:#999;font-size:11px;margin-top:16px;">&copy; 2026 CVRoast</p>
-        </div>
-    </div>
-    """
+def _purge_stored():
+    """Delete what the ledger and CV_EXPORT_DIR hold past its retention."""
+    now = time.time()
+    ledger.purge_emails(now - PAYMENT_EMAIL_TTL_HOURS * 3600)
+    ledger.purge_reviews(now - REVIEW_TTL_HOURS * 3600)
+    _expire_speculative()
+    cv_exports.purge(now - CV_EXPORT_TTL_HOURS * 3600)
 
-    # Plain text fallback
-    plain = f"{name}\n{title}\n{location} | {phone} | {email}\n\n"
-    plain += f"PROFESSIONAL SUMMARY\n{cv.get('personal_statement', '')}\n\n"
-    plain += f"KEY SKILLS\n{', '.join(cv.get('key_skills', []))}\n\n"
-    plain += "EXPERIENCE\n"
-    for job in cv.get('experience', []):
-        plain += f"\n{job.get('title', '')}\n{job.get('company', '')} | {job.get('dates', '')}\n"
-        for b in job.get('bullets', []):
-            plain += f"  - {b}\n"
 
+async def _export_cv(cv_data):
+    """Render the PDF and DOCX of a rewrite (or find them cached). Returns the export key, or None."""
     try:
-        resp = http_requests.post(
-            'https://api.mailersend.com/v1/email',
-            headers={
-                'Authorization': f'Bearer {MAILERSEND_API_KEY}',
-                'Content-Type': 'application/json',
-            },
-            json={
-                'from': {'email': FROM_EMAIL, 'name': 'CVRoast'},
-                'to': [{'email': to_email}],
-                'subject': 'Your Rewritten CV — CVRoast',
-                'html': html_body,
-                'text': plain,
-            },
-            timeout=10,
-        )
-        return resp.status_code in (200, 201, 202)
+        with tracing.span('cv.export'):
+            key = await asyncio.wait_for(cv_exports.render(cv_data), CV_EXPORT_TIMEOUT)
     except Exception:
+        metrics.inc('cv_exports_total', outcome='failed')
+        return None
+    metrics.inc('cv_exports_total', outcome='rendered')
+    return key
+
+
+def _export_urls(key):
+    return {fmt: url_for('cv_export', key=key, fmt=fmt) for fmt in EXPORT_FORMATS} if key else {}
+
+
+async def _send_cv_email(to_email, cv_data, export_key=None):
+    """Send the rewritten CV to the customer via MailerSend, with its PDF and DOCX attached if rendered."""
+    if not MAILERSEND_API_KEY or not to_email:
         return False
 
+    attachments = []
+    if export_key:
+        for fmt in EXPORT_FORMATS:
+            data = cv_exports.read(export_key, fmt)
+            if data is not None:
+                attachments.append((f'CV.{fmt}', data))
+    html_body, plain = emails.render_cv(cv_data, attached=bool(attachments))
+    return await _send_email(to_email, 'Your Rewritten CV — CVRoast', html_body, plain, attachments=attachments)
+
+
+# --- Request instrumentation ---
+
+@app.before_request
+def _start_request_metrics():
+    metrics.ensure_flusher()
+    g.request_started = time.perf_counter()
+    metrics.add('http_requests_in_flight', 1)
+
+
+@app.after_request
+def _record_request_metrics(response):
+    started = g.get('request_started')
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.observe('http_request_duration_seconds', time.perf_counter() - started,
+                        route=route, method=request.method, status=response.status_code)
+    return response
+
+
+@app.teardown_request
+def _finish_request_metrics(exc):
+    if g.get('request_started') is not None:
+        metrics.add('http_requests_in_flight', -1)
+
+
+@app.before_request
+def _start_trace():
+    trace = tracing.start_trace(tracing.trace_id_from_headers(request.headers), f'{request.method} {request.path}')
+    if profiler:
+        profiler.instrument(aio.worker_loop())
+        profiler.begin(trace)
+
+
+@app.after_request
+def _finish_trace(response):
+    trace = tracing.end_trace()
+    if trace is not None:
+        response.headers['X-Trace-Id'] = trace.trace_id
+        response.headers['Server-Timing'] = trace.server_timing()
+        if profiler:
+            profiler.finish(trace)
+    return response
+
+
+# --- HTTP caching (compression, ETags and 304s in httpcache.py) ---
+STATIC_MAX_AGE = 3600
+STATIC_IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+PAGE_CACHE = 'public, max-age=300'
+PRIVATE = 'no-store'
+# endpoint -> (Cache-Control, whether the page changes only on deploy and so gets a Last-Modified).
+# Views that set their own Cache-Control keep it.
+CACHE_POLICIES = {
+    'index': (PAGE_CACHE, True),
+    'seo_page': (PAGE_CACHE, True),
+    'comparison_page': (PAGE_CACHE, True),
+    'role_page': (PAGE_CACHE, True),
+    'blog_index': (PAGE_CACHE, True),
+    'blog_post': (PAGE_CACHE, True),
+    'embed_page': (PAGE_CACHE, True),
+    'privacy': (PAGE_CACHE, True),
+    'rss_feed': ('public, max-age=3600', True),
+    'score_page': (PAGE_CACHE, False),    # switches to the rendered share card once it exists
+    'detect_geo': ('private, max-age=3600', False),
+    'social_proof': ('no-cache', False),
+    'health': (PRIVATE, False),
+    'success': (PRIVATE, False),
+    'upload_resume': (PRIVATE, False),
+    'free_roast': (PRIVATE, False),
+    'job_match': (PRIVATE, False),
+    'capture_email': (PRIVATE, False),
+    'create_checkout': (PRIVATE, False),
+    'full_review': (PRIVATE, False),
+    'cv_export': (PRIVATE, False),
+    'stripe_webhook': (PRIVATE, False),
+    'admin_stats': (PRIVATE, False),
+    'metrics_endpoint': (PRIVATE, False),
+}
+http_cache = HttpCache()
+static_fingerprints = StaticFingerprints(app.static_folder)
+_source_mtimes = {}     # path -> mtime; sources only change with a deploy (a restart)
+metrics.describe('http_compression_cache_bytes', 'gauge', 'Compressed response bodies kept for reuse.')
+metrics.gauge_fn('http_compression_cache_bytes', lambda: http_cache.size)
+
+
+def _fingerprinted(filename):
+    version = request.args.get('v')
+    return bool(version) and version == static_fingerprints.version(filename)
+
+
+@app.template_global()
+def static_url(filename):
+    """URL of a static file that carries its content hash, so browsers can cache it for good."""
+    return url_for('static', filename=filename, v=static_fingerprints.version(filename))
+
+
+def _note_template(sender, template, context, **extra):
+    g.rendered_templates = g.get('rendered_templates', ()) + (template.filename,)
+
+
+template_rendered.connect(_note_template, app)
+
+
+def _source_mtime(paths):
+    for path in paths:
+        if path not in _source_mtimes:
+            _source_mtimes[path] = os.stat(path).st_mtime
+    return max(_source_mtimes[path] for path in paths)
+
+
+@app.after_request
+def _http_caching(response):
+    # Registered after the metrics and tracing hooks, so it runs before them and they time it
+    policy = CACHE_POLICIES.get(request.endpoint)
+    if policy:
+        cache_control, deploy_stable = policy
+        response.headers.setdefault('Cache-Control', cache_control)
+        # The page is built from this file (its tables) and the templates it rendered
+        if deploy_stable and response.last_modified is None:
+            response.last_modified = _source_mtime((__file__, *g.get('rendered_templates', ())))
+    elif request.endpoint == 'static' and response.status_code == 200 and _fingerprinted(request.view_args['filename']):
+        response.cache_control.immutable = True
+    return http_cache.process(response, request)
+
 
 # --- Routes ---
 
@@ -242,20 +571,29 @@ def upload_resume():
 
     if ext == 'pdf':
         try:
-            reader = PdfReader(io.BytesIO(file.read()))
-            text = '\n'.join(page.extract_text() or '' for page in reader.pages)
+            with tracing.span('upload.read'):
+                data = file.read()
+            with tracing.span('upload.extract', format='pdf', size=len(data)):
+                from pypdf import PdfReader
+                reader = PdfReader(io.BytesIO(data))
+                text = '\n'.join(page.extract_text() or '' for page in reader.pages)
         except Exception:
             return jsonify({'error': 'Could not read PDF. Try pasting the text instead.'}), 400
     elif ext == 'docx':
         try:
-            doc = Document(io.BytesIO(file.read()))
-            text = '\n'.join(p.text for p in doc.paragraphs if p.text.strip())
+            with tracing.span('upload.read'):
+                data = file.read()
+            with tracing.span('upload.extract', format='docx', size=len(data)):
+                from docx import Document
+                doc = Document(io.BytesIO(data))
+                text = '\n'.join(p.text for p in doc.paragraphs if p.text.strip())
         except Exception:
             return jsonify({'error': 'Could not read DOCX. Try pasting the text instead.'}), 400
     elif ext == 'doc':
         return jsonify({'error': 'Legacy .doc format not supported. Please save as .docx or paste the text.'}), 400
     elif ext == 'txt':
-        text = file.read().decode('utf-8', errors='ignore')
+        with tracing.span('upload.read'):
+            text = file.read().decode('utf-8', errors='ignore')
     else:
         return jsonify({'error': 'Supported formats: PDF, DOCX, TXT'}), 400
 
@@ -263,27 +601,54 @@ def upload_resume():
     if len(text) < 50:
         return jsonify({'error': 'Could not extract enough text from the file. Try pasting the text instead.'}), 400
 
+    _track('upload')
     return jsonify({'text': text, 'filename': file.filename})
 
 
+_social_feed = {'interval': None, 'items': [], 'body': b'', 'etag': ''}
+
+
+def _social_proof_feed():
+    """The anonymized feed of recent scores, rebuilt once per SOCIAL_PROOF_INTERVAL."""
+    interval = int(time.time() // SOCIAL_PROOF_INTERVAL)
+    if _social_feed['interval'] != interval:
+        scores = score_stats.recent(SOCIAL_PROOF_WINDOW) or seed_scores
+        picks = random.sample(scores, min(SOCIAL_PROOF_FEED_SIZE, len(scores)))
+        minutes = sorted(random.randint(1, 15) for _ in picks)
+        items = [{'score': score, 'minutes_ago': m} for score, m in zip(picks, minutes)]
+        body = json.dumps({'items': items, 'refresh_after': SOCIAL_PROOF_INTERVAL}).encode()
+        _social_feed.update(interval=interval, items=items, body=body, etag=hashlib.sha1(body).hexdigest()[:16])
+    return _social_feed
+
+
+@app.route('/api/social-proof/feed', methods=['GET'])
+def social_proof_feed():
+    """Recent scores for the social proof notifications; pages cycle through them locally."""
+    feed = _social_proof_feed()
+    # Cacheable until the next rebuild, by the browser and any proxy in front of us
+    response = app.response_class(feed['body'], mimetype='application/json')
+    response.set_etag(feed['etag'])
+    response.cache_control.public = True
+    response.cache_control.max_age = SOCIAL_PROOF_INTERVAL - int(time.time()) % SOCIAL_PROOF_INTERVAL
+    return response.make_conditional(request)
+
+
 @app.route('/api/social-proof', methods=['GET'])
 def social_proof():
-    """Return a random recent score for social proof notifications."""
-    if recent_scores:
-        score = random.choice(recent_scores)
-        minutes_ago = random.randint(1, 15)
-        return jsonify({'score': score, 'minutes_ago': minutes_ago})
-    return jsonify({'score': 42, 'minutes_ago': 3})
+    """Return one recent score (for pages cached before the feed existed)."""
+    items = _social_proof_feed()['items']
+    return jsonify(random.choice(items) if items else {'score': 42, 'minutes_ago': 3})
 
 
 @app.route('/api/geo', methods=['GET'])
-def detect_geo():
+async def detect_geo():
     """Detect user's country from IP for currency selection."""
     ip = request.headers.get('X-Forwarded-For', request.remote_addr) or ''
     ip = ip.split(',')[0].strip()
     try:
-        resp = http_requests.get(f'https://ipapi.co/{ip}/country/', timeout=3)
-        country = resp.text.strip().upper() if resp.ok and len(resp.text.strip()) == 2 else 'US'
+        with _upstream('ipapi', 'country'):
+            resp = await _http().get(f'{IPAPI_URL}/{ip}/country/', timeout=3)
+        country = resp.text.strip().upper() if resp.is_success and len(resp.text.strip()) == 2 else 'US'
     except Exception:
         country = 'US'
     pricing = CURRENCY_MAP.get(country, DEFAULT_CURRENCY)
@@ -322,7 +687,7 @@ def index():
 
 
 # --- SEO Landing Pages ---
-SEO_PAGES = {
+SEO_PAGES = PageTable({
     'free-resume-checker': {
         'title': 'Free Resume Checker — Instant ATS Score | CVRoast',
         'h1': 'Free Resume Checker',
@@ -418,7 +783,7 @@ SEO_PAGES = {
             ('Is my resume data private?', 'Completely. Your resume is processed in memory, never stored permanently, and automatically deleted within 2 hours. We don\'t sell or share any data.'),
         ],
     },
-}
+})
 
 
 @app.route('/free-resume-checker')
@@ -434,7 +799,7 @@ def seo_page():
     return redirect('/')
 
 
-COMPARISON_PAGES = {
+COMPARISON_PAGES = PageTable({
     'cvroast-vs-jobscan': {
         'title': 'CVRoast vs Jobscan — Which Resume Checker Is Better? (2026)',
         'meta_desc': 'Compare CVRoast and Jobscan side-by-side. Free ATS scoring, pricing, features, and honest pros/cons. Find the best resume checker for you.',
@@ -568,7 +933,7 @@ COMPARISON_PAGES = {
             ('60-second delivery', True, False),
         ],
     },
-}
+})
 
 
 @app.route('/cvroast-vs-jobscan')
@@ -589,15 +954,24 @@ def comparison_page():
 # --- Email capture / mailing list ---
 email_list = []  # In-memory for now; will persist across restarts if you add a DB later
 
+metrics.describe('resume_store_size', 'gauge', 'Resumes held for paid upgrades.')
+metrics.describe('rate_limit_entries', 'gauge', 'IP hashes tracked by the free-roast rate limiter.')
+metrics.describe('email_list_size', 'gauge', 'Captured mailing-list emails.')
+metrics.gauge_fn('resume_store_size', lambda: len(resume_store))
+metrics.gauge_fn('rate_limit_entries', lambda: len(rate_limits))
+metrics.gauge_fn('email_list_size', lambda: len(email_list))
+
 
 @app.route('/api/capture-email', methods=['POST'])
-def capture_email():
+async def capture_email():
     data = request.get_json(silent=True) or {}
     email = (data.get('email') or '').strip().lower()
     if not email or '@' not in email:
         return jsonify({'error': 'Invalid email'}), 400
 
-    score = data.get('score', 0)
+    score = data.get('score')
+    if not isinstance(score, int) or isinstance(score, bool) or not 0 <= score <= 100:
+        score = None
     one_liner = data.get('one_liner', '')
     roasts = data.get('roasts', [])
 
@@ -607,73 +981,19 @@ def capture_email():
         'score': score,
         'timestamp': datetime.utcnow().isoformat(),
     })
+    _track('email', score=score)
 
     # Send roast results + tips email
     if MAILERSEND_API_KEY:
-        roast_html = ''.join(
-            f'<tr><td style="padding:8px 12px;color:#ff6b2c;font-weight:700;font-size:18px;vertical-align:top;width:30px;">{i+1}</td>'
-            f'<td style="padding:8px 12px;font-size:14px;color:#333;line-height:1.6;">{r}</td></tr>'
-            for i, r in enumerate(roasts)
-        )
-        color = '#ef4444' if score < 45 else ('#eab308' if score < 70 else '#22c55e')
-
-        html = f"""
-        <div style="max-width:580px;margin:0 auto;font-family:Arial,sans-serif;">
-            <div style="text-align:center;padding:28px;background:#0a0a0b;border-radius:12px 12px 0 0;">
-                <span style="font-size:22px;font-weight:800;color:#ff6b2c;">CVRoast</span>
-                <h1 style="font-size:22px;font-weight:700;color:#fff;margin:12px 0 4px;">Your Resume Roast Results</h1>
-            </div>
-            <div style="background:#fff;padding:32px;border:1px solid #e0e0e0;">
-                <div style="text-align:center;margin-bottom:24px;">
-                    <div style="display:inline-block;padding:16px 32px;border-radius:12px;background:{color}15;border:2px solid {color}30;">
-                        <span style="font-size:48px;font-weight:900;color:{color};">{score}</span>
-                        <span style="font-size:16px;color:#666;">/100</span>
-                    </div>
-                </div>
-                <p style="text-align:center;font-size:16px;font-style:italic;color:#ff6b2c;margin-bottom:24px;">"{one_liner}"</p>
-                <table style="width:100%;border-collapse:collapse;">{roast_html}</table>
-                <div style="margin-top:28px;padding:20px;background:#f8f8f8;border-radius:8px;">
-                    <h3 style="font-size:14px;font-weight:700;color:#1a365d;margin-bottom:12px;">Quick Tips to Improve Your Score:</h3>
-                    <ul style="padding-left:20px;margin:0;font-size:13px;color:#555;line-height:1.8;">
-                        <li>Replace every "responsible for" with an action verb + metric</li>
-                        <li>Add numbers to every bullet point (even estimates help)</li>
-                        <li>Match keywords from job descriptions you're targeting</li>
-                        <li>Keep it to 1-2 pages with consistent formatting</li>
-                        <li>Remove graphics/tables that break ATS parsers</li>
-                    </ul>
-                </div>
-            </div>
-            <div style="text-align:center;padding:24px;background:#f8f8f8;border-radius:0 0 12px 12px;border:1px solid #e0e0e0;border-top:none;">
-                <p style="color:#666;font-size:14px;margin-bottom:12px;">Want your CV professionally rewritten?</p>
-                <a href="https://cvroast.com/#get-started" style="display:inline-block;padding:12px 28px;background:#ff6b2c;color:#fff;text-decoration:none;border-radius:8px;font-weight:700;font-size:14px;">Get My CV Rewritten</a>
-                <p style="color:#999;font-size:11px;margin-top:16px;">&copy; 2026 CVRoast</p>
-            </div>
-        </div>
-        """
-        try:
-            http_requests.post(
-                'https://api.mailersend.com/v1/email',
-                headers={
-                    'Authorization': f'Bearer {MAILERSEND_API_KEY}',
-                    'Content-Type': 'application/json',
-                },
-                json={
-                    'from': {'email': FROM_EMAIL, 'name': 'CVRoast'},
-                    'to': [{'email': email}],
-                    'subject': f'Your Resume Score: {score}/100 — CVRoast',
-                    'html': html,
-                    'text': f'Your resume scored {score}/100.\n\n"{one_liner}"\n\n' + '\n'.join(f'{i+1}. {r}' for i, r in enumerate(roasts)),
-                },
-                timeout=10,
-            )
-        except Exception:
-            pass
+        shown = '?' if score is None else score
+        html, text = emails.render_roast(shown, one_liner, roasts)
+        await _send_email(email, f'Your Resume Score: {shown}/100 — CVRoast', html, text)
 
     return jsonify({'ok': True})
 
 
 # --- Programmatic SEO: role-specific resume checker pages ---
-ROLE_PAGES = {
+ROLE_PAGES = PageTable({
     'nurse': {'title': 'Resume Checker for Nurses', 'role': 'Nurse', 'keywords': 'Patient Care, Clinical Documentation, HIPAA, Electronic Health Records, Triage, Medication Administration, Care Coordination, BLS/ACLS, Nursing Assessment, Discharge Planning', 'salary': '$70-95K', 'ats_tip': 'Nursing resumes that mention specific certifications (BLS, ACLS, PALS) and quantify patient loads score 30% higher in ATS systems.', 'common_mistake': 'Listing "patient care" without specifying the type of unit (ICU, ER, Med-Surg), patient volume, or acuity level.'},
     'software-engineer': {'title': 'Resume Checker for Software Engineers', 'role': 'Software Engineer', 'keywords': 'Python, JavaScript, AWS, CI/CD, Microservices, REST APIs, Agile, Git, System Design, Docker, Kubernetes, SQL, React, Node.js', 'salary': '$90-180K', 'ats_tip': 'Tech resumes with specific frameworks and tools in a dedicated "Technical Skills" section score 25% higher than those burying them in job descriptions.', 'common_mistake': 'Listing technologies without context — "Used Python" means nothing. "Built data pipeline in Python processing 2M records/day" gets interviews.'},
     'teacher': {'title': 'Resume Checker for Teachers', 'role': 'Teacher', 'keywords': 'Curriculum Development, Differentiated Instruction, Classroom Management, Student Assessment, IEP, STEM, Safeguarding, Lesson Planning, Parent Communication, Behaviour Management', 'salary': '$45-75K', 'ats_tip': 'Education resumes that mention specific curricula, year groups, and standardised test improvements get 40% more callbacks.', 'common_mistake': 'Writing "taught Year 6 class" instead of "Delivered differentiated maths curriculum to 30 Year 6 pupils, achieving 85% at expected standard in SATs."'},
@@ -694,10 +1014,12 @@ ROLE_PAGES = {
     'remote-worker': {'title': 'Resume Checker for Remote Jobs', 'role': 'Remote Worker', 'keywords': 'Remote Collaboration, Asynchronous Communication, Self-Directed, Zoom, Slack, Project Management Tools, Time Zone Management, Virtual Team Leadership, Documentation', 'salary': 'Varies', 'ats_tip': 'Remote job applications should explicitly mention remote work experience, tools used for collaboration, and evidence of self-direction and async communication skills.', 'common_mistake': 'Not mentioning remote experience at all. If you\'ve worked remotely, say so: "Collaborated with distributed team across 4 time zones using Slack, Notion, and Zoom."'},
     'freelancer': {'title': 'Resume Checker for Freelancers', 'role': 'Freelancer / Contractor', 'keywords': 'Client Management, Project Delivery, Contract, Scope Management, Proposals, Business Development, Portfolio, Multi-client, Deadline Management', 'salary': 'Varies', 'ats_tip': 'Freelance resumes should group similar projects under one "Freelance [Role]" heading with bullet points per major client, rather than listing each gig separately.', 'common_mistake': 'Listing 20 tiny gigs separately. Group them: "Freelance Web Developer (2022-2026) — Delivered 35+ projects for clients including [notable names], averaging 4.9/5.0 satisfaction."'},
     'healthcare-worker': {'title': 'Resume Checker for Healthcare Workers', 'role': 'Healthcare Worker', 'keywords': 'Patient Care, Clinical Skills, Medical Records, Infection Control, CPR, Manual Handling, Care Plans, Medication Administration, Risk Assessment, CQC, NHS', 'salary': '$25-55K', 'ats_tip': 'Healthcare resumes must list all current certifications with expiry dates. DBS check status, mandatory training completion, and specific care settings boost ATS scores significantly.', 'common_mistake': 'Not specifying care setting and patient demographics. "Provided patient care" vs "Delivered personal care to 12 elderly residents with dementia in a CQC-rated Outstanding care home."'},
-}
+})
+# Stemmed inverted index of the role keywords, for /api/match
+job_keywords = KeywordIndex.from_roles(ROLE_PAGES)
 
 
-BLOG_POSTS = [
+BLOG_POSTS = PageTable.from_list([
     {
         'slug': 'what-is-ats-score',
         'title': 'What Is an ATS Score? Everything You Need to Know in 2026',
@@ -805,17 +1127,17 @@ BLOG_POSTS = [
             ('How to use these keywords', 'Don\'t just dump keywords into your resume. Weave them naturally into your bullet points and summary. Match the exact phrasing from the job description when possible. Use a tool like CVRoast to check your ATS score and see which keywords are working.'),
         ],
     },
-]
+])
 
 
 @app.route('/blog')
 def blog_index():
-    return render_template('blog_index.html', posts=BLOG_POSTS)
+    return render_template('blog_index.html', posts=BLOG_POSTS.values())
 
 
 @app.route('/blog/<slug>')
 def blog_post(slug):
-    post = next((p for p in BLOG_POSTS if p['slug'] == slug), None)
+    post = BLOG_POSTS.get(slug)
     if not post:
         return redirect('/blog')
     return render_template('blog_post.html', post=post)
@@ -845,10 +1167,9 @@ if(t)t.parentNode.insertBefore(s,t);
     return js, 200, {'Content-Type': 'application/javascript', 'Cache-Control': 'public, max-age=86400'}
 
 
-@app.route('/feed.xml')
-def rss_feed():
+def _build_rss():
     items = ''
-    for post in BLOG_POSTS:
+    for post in BLOG_POSTS.values():
         items += f'''
     <item>
       <title>{post["title"]}</title>
@@ -866,17 +1187,51 @@ def rss_feed():
     <atom:link href="https://cvroast.com/feed.xml" rel="self" type="application/rss+xml"/>{items}
   </channel>
 </rss>'''
-    return rss, 200, {'Content-Type': 'application/rss+xml'}
+    return rss
+
+
+RSS_FEED = _build_rss()   # the posts only change with a deploy
+
+
+@app.route('/feed.xml')
+def rss_feed():
+    return RSS_FEED, 200, {'Content-Type': 'application/rss+xml'}
+
+
+share_cards = ShareCards(OG_CACHE_DIR)
+SHARE_CARD_NAME = re.compile(r'^score-\d{3}-[0-9a-f]{12}\.png$')
 
 
 @app.route('/score/<int:score>')
 def score_page(score):
     score = max(0, min(100, score))
-    return render_template('score.html', score=score)
+    # Fall back to the generic image while the cards are still rendering
+    card = share_cards.name_for(score)
+    og_image = url_for('share_card', name=card) if card else static_url('og.png')
+    return render_template('score.html', score=score, og_image=og_image)
+
+
+@app.route('/og/<name>')
+def share_card(name):
+    """A rendered share card. Names are content hashes, so they never change."""
+    if not SHARE_CARD_NAME.match(name):
+        abort(404)
+    response = send_from_directory(os.path.abspath(OG_CACHE_DIR), name, max_age=365 * 24 * 3600)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+def _roast_reply(response):
+    result = _parse_json_reply(response)
+    require(result, score=(int, float), roasts=list, one_liner=str)
+    if not 0 <= result['score'] <= 100:
+        raise InvalidReply(f"score {result['score']} out of range")
+    return result
 
 
 @app.route('/api/roast', methods=['POST'])
-def free_roast():
+async def free_roast():
     ip = request.headers.get('X-Forwarded-For', request.remote_addr) or '0.0.0.0'
     if not _check_rate_limit(ip):
         return jsonify({'error': 'Daily limit reached. Upgrade to get unlimited reviews.'}), 429
@@ -889,9 +1244,10 @@ def free_roast():
     if len(resume_text) > 15000:
         return jsonify({'error': 'Resume is too long. Paste the text content only.'}), 400
 
+    resume_prompt = _compact_resume(resume_text, 'roast', ROAST_INPUT_TOKENS)
     try:
-        response = ai.messages.create(
-            model="claude-haiku-4-5-20251001",
+        result = await _ai_json(
+            'roast', models.signals(resume_prompt), parse=_roast_reply,
             max_tokens=600,
             messages=[{
                 "role": "user",
@@ -918,34 +1274,28 @@ Rules:
 - The one_liner should make them laugh AND want to fix their resume
 
 Resume:
-{resume_text[:5000]}"""
+{resume_prompt}"""
             }]
         )
 
-        raw = response.content[0].text.strip()
-        if raw.startswith('```'):
-            raw = raw.split('\n', 1)[1].rsplit('```', 1)[0].strip()
-        result = json.loads(raw)
-
         # Store resume for potential paid upgrade
         resume_id = str(uuid.uuid4())
         resume_store[resume_id] = {
             'resume': resume_text,
             'created_at': time.time()
         }
-        _cleanup_old_resumes()
+        with tracing.span('resume_store.cleanup'):
+            _cleanup_old_resumes()
 
         result['resume_id'] = resume_id
-        _track('roast')
-        score_val = result.get('score', 0)
-        analytics['scores'].append(score_val)
-        analytics['scores'] = analytics['scores'][-100:]
-        recent_scores.append(score_val)
-        if len(recent_scores) > 20:
-            recent_scores.pop(0)
+        score_val = result.get('score')
+        score_val = int(score_val) if isinstance(score_val, (int, float)) else None
+        _track('roast', score=score_val)
+        if score_val is not None:
+            score_stats.add(score_val)
         return jsonify(result)
 
-    except json.JSONDecodeError:
+    except (json.JSONDecodeError, InvalidReply):
         return jsonify({
             'score': 42,
             'roasts': [
@@ -962,8 +1312,68 @@ Resume:
         return jsonify({'error': 'Something went wrong. Try again in a moment.'}), 500
 
 
+def _commentary_reply(response):
+    result = _parse_json_reply(response)
+    require(result, summary=str, tips=list)
+    return result
+
+
+@app.route('/api/match', methods=['POST'])
+async def job_match():
+    """Score a resume against a job description. The score and missing keywords are computed
+    locally in a few milliseconds; only the commentary comes from the model."""
+    data = request.get_json(silent=True) or {}
+    resume_text = (data.get('resume') or '').strip()
+    job_text = (data.get('job_description') or '').strip()
+
+    if len(resume_text) < 80:
+        return jsonify({'error': 'Paste at least a few lines of your resume.'}), 400
+    if len(job_text) < 80:
+        return jsonify({'error': 'Paste the job description you are applying for.'}), 400
+    if len(resume_text) > 15000 or len(job_text) > 20000:
+        return jsonify({'error': 'Text is too long. Paste the text content only.'}), 400
+
+    with tracing.span('match.keywords', resume_chars=len(resume_text), job_chars=len(job_text)):
+        result = job_keywords.match(resume_text, job_text)
+    result['roles'] = [{'slug': slug, 'role': ROLE_PAGES[slug]['role'],
+                        'url': url_for('role_page', role_slug=slug)} for slug in result['roles']]
+    result['commentary'] = None
+
+    # The commentary is a model call, so it shares the free roasts' daily limit
+    ip = request.headers.get('X-Forwarded-For', request.remote_addr) or '0.0.0.0'
+    if data.get('commentary', True) and result['score'] is not None and _check_rate_limit(ip):
+        try:
+            result['commentary'] = await _ai_json(
+                'commentary', models.signals(resume_text), parse=_commentary_reply,
+                max_tokens=400,
+                messages=[{
+                    "role": "user",
+                    "content": f"""You are a blunt but helpful resume coach. A keyword check of a resume against a job description found:
+
+Match score: {result['score']}/100
+Keywords the resume covers: {', '.join(result['matched']) or 'none'}
+Keywords it is missing: {', '.join(result['missing']) or 'none'}
+
+Job description (start):
+{job_text[:1500]}
+
+Return EXACTLY this JSON, nothing else:
+{{
+  "summary": "<one sentence on how well this resume fits the job>",
+  "tips": ["<tip 1>", "<tip 2>", "<tip 3>"]
+}}
+
+Each tip should say where and how to work a missing keyword in honestly. Don't invent experience."""
+                }]
+            )
+        except Exception:
+            pass
+    metrics.inc('job_matches_total', commentary='yes' if result['commentary'] else 'no')
+    return jsonify(result)
+
+
 @app.route('/api/checkout', methods=['POST'])
-def create_checkout():
+async def create_checkout():
     data = request.get_json(silent=True) or {}
     resume_id = data.get('resume_id')
     resume_text = (data.get('resume') or '').strip()
@@ -983,25 +1393,27 @@ def create_checkout():
     pricing = next((v for v in CURRENCY_MAP.values() if v['currency'] == req_currency), DEFAULT_CURRENCY)
 
     try:
-        session = stripe.checkout.Session.create(
-            payment_method_types=['card'],
-            line_items=[{
-                'price_data': {
-                    'currency': pricing['currency'],
-                    'product_data': {
-                        'name': 'Professional CV Rewrite',
-                        'description': 'Complete CV rewrite with ATS-optimized keywords, achievement metrics, and professional formatting.',
+        with _upstream('stripe', 'checkout.session.create'):
+            session = await _stripe().checkout.Session.create_async(
+                payment_method_types=['card'],
+                line_items=[{
+                    'price_data': {
+                        'currency': pricing['currency'],
+                        'product_data': {
+                            'name': 'Professional CV Rewrite',
+                            'description': 'Complete CV rewrite with ATS-optimized keywords, achievement metrics, and professional formatting.',
+                        },
+                        'unit_amount': pricing['amount'],
                     },
-                    'unit_amount': pricing['amount'],
-                },
-                'quantity': 1,
-            }],
-            mode='payment',
-            success_url=BASE_URL + '/success?session_id={CHECKOUT_SESSION_ID}&rid=' + resume_id,
-            cancel_url=BASE_URL + '/#get-started',
-            client_reference_id=resume_id,
-        )
+                    'quantity': 1,
+                }],
+                mode='payment',
+                success_url=BASE_URL + '/success?session_id={CHECKOUT_SESSION_ID}&rid=' + resume_id,
+                cancel_url=BASE_URL + '/#get-started',
+                client_reference_id=resume_id,
+            )
         _track('checkout')
+        await asyncio.to_thread(_start_speculative_rewrite, resume_id, resume_store[resume_id]['resume'])
         return jsonify({'url': session.url})
     except Exception as e:
         return jsonify({'error': 'Payment setup failed. Please try again.'}), 500
@@ -1021,48 +1433,150 @@ def success():
                            stripe_key=STRIPE_PUBLISHABLE_KEY)
 
 
-@app.route('/api/full-review', methods=['POST'])
-def full_review():
-    data = request.get_json(silent=True) or {}
-    session_id = data.get('session_id')
-    resume_id = data.get('resume_id')
+@app.route('/cv/<key>.<fmt>')
+def cv_export(key, fmt):
+    """A rendered PDF or DOCX of a rewrite. The key is a hash of the CV, so only its owner has the link."""
+    path = cv_exports.path(key, fmt)
+    if path is None:
+        abort(404)
+    response = send_from_directory(os.path.abspath(CV_EXPORT_DIR), os.path.basename(path),
+                                   mimetype=EXPORT_FORMATS[fmt], as_attachment=True, download_name=f'CV.{fmt}')
+    # send_from_directory sets its own Cache-Control, which _http_caching would leave in place
+    response.cache_control.no_cache = None
+    response.cache_control.public = False
+    response.cache_control.max_age = None
+    response.cache_control.no_store = True
+    response.cache_control.private = True
+    return response
+
+
+@app.route('/stripe/webhook', methods=['POST'])
+def stripe_webhook():
+    """Record completed Checkout payments in the ledger and start their rewrites early."""
+    if not STRIPE_WEBHOOK_SECRET:
+        return jsonify({'error': 'Webhook not configured'}), 503
+    try:
+        event = _stripe().Webhook.construct_event(
+            request.get_data(), request.headers.get('Stripe-Signature', ''), STRIPE_WEBHOOK_SECRET)
+    except (ValueError, _stripe().SignatureVerificationError):
+        metrics.inc('stripe_webhooks_total', type='unknown', outcome='rejected')
+        return jsonify({'error': 'Invalid signature'}), 400
+
+    outcome = 'ignored'
+    if event['type'] in ('checkout.session.completed', 'checkout.session.async_payment_succeeded'):
+        payment = ledger.record(event['data']['object'], source='webhook')
+        if payment['payment_status'] == 'paid':
+            _prestart_rewrite(payment)
+        outcome = 'recorded'
+    metrics.inc('stripe_webhooks_total', type=event['type'], outcome=outcome)
+    return jsonify({'received': True})
+
+
+def _prestart_rewrite(payment):
+    """Start the full review of a paid CV while the customer is still being redirected to /success.
+
+    Only the worker that took the checkout holds the resume text, so only it
+    starts. It redeems the session in the ledger first: full_review then
+    attaches to the running job on this worker, or waits for the stored
+    review on any other, instead of rewriting a second time.
+    """
+    session_id = payment['session_id']
+    cached = resume_store.get(payment['resume_id'])
+    if not cached or payment['redeemed_at'] or not ledger.redeem(session_id):
+        return
+    metrics.inc('rewrite_prestarts_total', outcome='started')
+    job = _start_review(session_id, payment, payment['resume_id'], cached['resume'])
 
-    if not session_id or not resume_id:
-        return jsonify({'error': 'Missing parameters'}), 400
+    def done(job):
+        if job.cancelled() or job.exception() is not None:
+            metrics.inc('rewrite_prestarts_total', outcome='failed')   # released; /success starts again
+    job.add_done_callback(done)
 
-    # Verify payment
-    customer_email = None
-    try:
-        session = stripe.checkout.Session.retrieve(session_id)
-        if session.payment_status != 'paid':
-            return jsonify({'error': 'Payment not completed'}), 402
-        customer_email = session.customer_details.email if session.customer_details else None
-    except Exception:
-        return jsonify({'error': 'Could not verify payment'}), 400
 
-    # Prevent replay (one review per payment)
-    if session_id in paid_sessions:
-        return jsonify({'error': 'This review has already been generated. Check your email or refresh the page.'}), 409
-    paid_sessions.add(session_id)
-    amount = session.amount_total or 499
-    _track('payment', amount)
-    currency_sym = {'gbp': '£', 'aud': 'A$'}.get(session.currency, '$')
-    _notify_admin_payment(customer_email or 'unknown', f'{currency_sym}{amount/100:.2f}')
+# --- Speculative rewrites (started at checkout, before payment) ---
+speculative_jobs = {}   # resume_id -> Future of a speculative rewrite running on this worker
 
-    # Get resume — try in-memory cache first, fall back to client-submitted text
-    cached = resume_store.get(resume_id)
-    resume_text = cached['resume'] if cached else (data.get('resume') or '').strip()
 
-    if len(resume_text) < 80:
-        return jsonify({'error': 'Resume expired. Please start over.'}), 410
+def _start_speculative_rewrite(resume_id, resume_text):
+    """Rewrite the CV while the customer is on Stripe Checkout, if the daily budget allows.
 
-    try:
-        response = ai.messages.create(
-            model="claude-sonnet-4-5-20250929",
-            max_tokens=4096,
-            messages=[{
-                "role": "user",
-                "content": f"""You are an expert CV/resume writer with 15 years of experience. Your job is to COMPLETELY REWRITE this CV into a professional, ATS-optimized document.
+    The rewrite and the budget live in the payment ledger, shared by every
+    worker (see PaymentLedger.start_speculative).
+    """
+    if not SPECULATIVE_BUDGET_USD:
+        return
+    _expire_speculative()
+    outcome = ledger.start_speculative(resume_id, SPECULATIVE_BUDGET_USD, SPECULATIVE_COST_GUESS_USD)
+    if outcome is None:
+        return
+    metrics.inc('speculative_rewrites_total', outcome=outcome)
+    if outcome == 'skipped':
+        return
+
+    async def run():
+        spend = [0.0]
+        _ai_spend.set(spend)
+        result = None
+        try:
+            result = await _rewrite_cv(resume_text)
+        finally:
+            await asyncio.to_thread(ledger.finish_speculative, resume_id, result, spend[0])
+
+    job = aio.spawn(run())
+    speculative_jobs[resume_id] = job
+    job.add_done_callback(lambda _: speculative_jobs.pop(resume_id, None))
+
+
+async def _take_speculative(resume_id):
+    """Claim the speculative rewrite of a paid resume, waiting for it if needed. None if there isn't one.
+
+    One running on this worker is awaited; one running on another is polled
+    for in the ledger until it is stored.
+    """
+    job = speculative_jobs.get(resume_id)
+    if job is not None:
+        try:
+            await asyncio.wrap_future(job)
+        except Exception:
+            pass  # stored as failed
+    while True:
+        entry = await asyncio.to_thread(ledger.take_speculative, resume_id)
+        if entry is None or (not entry.finished and entry.started_at < time.time() - REWRITE_GIVE_UP_SECONDS):
+            return None
+        if entry.finished:
+            break
+        await asyncio.sleep(REVIEW_POLL_SECONDS)
+    # A failed one bought nothing: the ledger counts it as abandoned, not used
+    used = entry.result is not None
+    metrics.inc('speculative_rewrites_total', outcome='used' if used else 'failed')
+    metrics.inc('speculative_spend_usd_total', entry.cost, outcome='used' if used else 'abandoned')
+    return entry.result
+
+
+def _expire_speculative():
+    """Drop speculative rewrites nobody paid for in time and count them as abandoned."""
+    for cost in ledger.abandon_speculative(time.time() - SPECULATIVE_TTL_MINUTES * 60):
+        metrics.inc('speculative_rewrites_total', outcome='abandoned')
+        metrics.inc('speculative_spend_usd_total', cost, outcome='abandoned')
+
+
+# --- CV rewrite ---
+
+def _rewrite_reply(response):
+    result = _parse_json_reply(response)
+    require(result, cv=dict)
+    require(result['cv'], name=str, experience=list)
+    return result
+
+
+async def _rewrite_cv_single(resume_text, signals=None):
+    """Rewrite the whole CV in one call."""
+    return await _ai_json(
+        'rewrite', signals or models.signals(resume_text), parse=_rewrite_reply,
+        max_tokens=4096,
+        messages=[{
+            "role": "user",
+            "content": f"""You are an expert CV/resume writer with 15 years of experience. Your job is to COMPLETELY REWRITE this CV into a professional, ATS-optimized document.
 
 Return ONLY a JSON object (no markdown, no code fences, no explanation) with this exact structure:
 
@@ -1122,64 +1636,465 @@ CRITICAL RULES:
 
 CV to rewrite:
 {resume_text}"""
-            }]
-        )
+        }]
+    )
 
-        raw = response.content[0].text.strip()
-        # Strip code fences if present
-        if raw.startswith('```'):
-            raw = raw.split('\n', 1)[1].rsplit('```', 1)[0].strip()
 
-        result = json.loads(raw)
+# Rules shared by every sectional prompt so the pieces stay consistent with each other
+# and with the single-call rewrite.
+SECTION_RULES = """- Keep the same jobs, companies, and timeline — NEVER invent experience
+- Convert ALL vague/conversational language to specific, ATS-scannable professional terms
+- Add realistic estimated metrics where the original has none, but be realistic — don't over-inflate
+- Only use facts present in the CV; do not add employers, qualifications, or dates
+- Return ONLY valid JSON. No text before or after."""
+
+
+def _sections_reply(response):
+    sections = _parse_json_reply(response)
+    require(sections, experience=list)
+    return sections
+
+
+async def _split_cv_sections(resume_text, signals):
+    """Locate the header fields and experience entries of a CV.
+
+    The model only returns line numbers, so this call stays short no matter how
+    long the CV is. Entry text is then sliced from the original locally.
+    """
+    lines = resume_text.splitlines()
+    numbered = '\n'.join(f'{i + 1}: {line}' for i, line in enumerate(lines))
+    sections = await _ai_json(
+        'split', signals, parse=_sections_reply,
+        max_tokens=1024,
+        messages=[{
+            "role": "user",
+            "content": f"""Split this CV into sections. Each line is prefixed with its line number.
+
+Return ONLY a JSON object with this exact structure:
+{{
+  "name": "Full name, or empty string",
+  "location": "Location, or empty string",
+  "phone": "Phone, or empty string",
+  "email": "Email, or empty string",
+  "experience": [
+    {{"title": "Job title", "company": "Company, Location", "dates": "Start — End", "start_line": 12, "end_line": 20}}
+  ]
+}}
+
+Rules:
+- One experience entry per job, in the order they appear
+- start_line/end_line cover the job's heading and all of its description lines
+- Copy values exactly as written; do not rewrite anything
+- Return ONLY valid JSON. No text before or after.
+
+CV:
+{numbered}"""
+        }]
+    )
+    for job in sections.get('experience', []):
+        start = max(int(job.get('start_line', 1)), 1)
+        end = max(int(job.get('end_line', start)), start)
+        job['text'] = '\n'.join(lines[start - 1:end])
+    return sections
+
+
+def _job_reply(response):
+    job = _parse_json_reply(response)
+    require(job, bullets=list)
+    return job
+
+
+async def _rewrite_job(job, industry_hint, signals):
+    """Rewrite the bullets of a single experience entry, on the tier the whole CV was routed to."""
+    return await _ai_json(
+        'rewrite', signals, parse=_job_reply,
+        max_tokens=700,
+        messages=[{
+            "role": "user",
+            "content": f"""You are an expert CV/resume writer. Rewrite ONE job from a CV into achievement-focused, ATS-optimized bullet points.
+
+Return ONLY a JSON object with this exact structure:
+{{
+  "title": "Job Title",
+  "company": "Company, Location",
+  "dates": "Start — End",
+  "bullets": [
+    "Achievement-focused bullet with estimated metrics",
+    "Second bullet with quantified impact"
+  ]
+}}
+
+Rules:
+- Write 2-4 strong bullet points with achievement language
+- Keep the title, company, and dates of THIS job; do not merge in other jobs
+{SECTION_RULES}
+
+The candidate is: {industry_hint}
+
+Job to rewrite:
+{job['text']}"""
+        }]
+    )
+
+
+def _profile_reply(response):
+    profile = _parse_json_reply(response)
+    require(profile, personal_statement=str, key_skills=list)
+    return profile
+
+
+async def _rewrite_profile(resume_text, signals):
+    """Write the title, personal statement, skills, certifications and scores."""
+    return await _ai_json(
+        'rewrite', signals, parse=_profile_reply,
+        max_tokens=1200,
+        messages=[{
+            "role": "user",
+            "content": f"""You are an expert CV/resume writer with 15 years of experience. Write the profile section of a professional, ATS-optimized rewrite of this CV. The experience bullets are rewritten separately; do not return them.
+
+Return ONLY a JSON object with this exact structure:
+{{
+  "title": "A professional title/tagline, e.g. 'Experienced Cleaning & Hospitality Professional | 25+ Years'",
+  "personal_statement": "A powerful 3-4 sentence professional summary packed with ATS keywords relevant to their industry.",
+  "key_skills": ["ATS-friendly skill 1", "Skill 2", "...up to 10"],
+  "certifications": ["Cert they have", "Relevant Cert [Recommended]"],
+  "references": "Available on request",
+  "ats_score_before": 32,
+  "ats_score_after": 78,
+  "changes_made": [
+    "Brief description of improvement 1",
+    "Brief description of improvement 2",
+    "Brief description of improvement 3",
+    "Brief description of improvement 4",
+    "Brief description of improvement 5"
+  ]
+}}
+
+Rules:
+- key_skills must be industry-standard terms, NOT conversational phrases
+- personal_statement: 3-4 sentences, keyword-rich, compelling — sell this person
+- certifications: include ones they mention + suggest up to 3 relevant ones marked [Recommended]
+- references: use "Available on request" unless the CV includes actual referee names/details
+- changes_made should describe the full rewrite, including rewritten experience bullets with metrics
+{SECTION_RULES}
+
+CV:
+{resume_text}"""
+        }]
+    )
+
 
-        # Email the rewritten CV
+def _tips_reply(response):
+    tips = _parse_json_reply(response)
+    require(tips, tips_to_100=list)
+    return tips
+
+
+async def _rewrite_tips(resume_text, signals):
+    """Write the tips_to_100 block."""
+    return await _ai_json(
+        'rewrite', signals, parse=_tips_reply,
+        max_tokens=1000,
+        messages=[{
+            "role": "user",
+            "content": f"""You are an expert CV/resume writer. This CV is being professionally rewritten with achievement language, metrics and ATS keywords. Give advice on what only the candidate can do to push the rewritten CV's ATS score to 100.
+
+Return ONLY a JSON object with this exact structure:
+{{
+  "tips_to_100": [
+    {{
+      "tip": "Short actionable tip",
+      "why": "Why this matters and why only you can do it"
+    }}
+  ]
+}}
+
+Rules:
+- Give 4-6 specific, actionable tips for THIS person
+- Focus on things only THEY know — real certifications they could get, actual metrics from their jobs, missing contact details, LinkedIn URL, tailoring for specific roles, etc.
+- Each tip should explain WHY it matters
+{SECTION_RULES}
+
+CV:
+{resume_text}"""
+        }]
+    )
+
+
+def _suggest_email(name):
+    parts = re.findall(r'[a-z]+', name.lower())
+    local = f'{parts[0]}.{parts[-1]}' if len(parts) > 1 else 'firstname.lastname'
+    return f'{local}@email.com'
+
+
+async def _rewrite_cv_sectional(resume_text, signals=None):
+    """Rewrite the CV as independent sections generated in parallel.
+
+    Wall-clock time is the section split plus the slowest section, instead of
+    one call whose output grows with every job on the CV.
+    """
+    signals = signals or models.signals(resume_text)
+    sections = await _split_cv_sections(resume_text, signals)
+    jobs = [j for j in sections.get('experience', []) if j.get('text', '').strip()]
+    if not jobs:
+        raise ValueError('No experience entries found')
+
+    industry_hint = ', '.join(f"{j.get('title', '')} at {j.get('company', '')}" for j in jobs[:4])
+    profile, tips, *rewritten = await asyncio.gather(
+        _rewrite_profile(resume_text, signals),
+        _rewrite_tips(resume_text, signals),
+        *(_rewrite_job(job, industry_hint, signals) for job in jobs),
+    )
+
+    experience = []
+    for original, job in zip(jobs, rewritten):
+        # Titles, companies and dates come from the CV itself; only bullets are rewritten
+        experience.append({
+            'title': original.get('title') or job.get('title', ''),
+            'company': original.get('company') or job.get('company', ''),
+            'dates': original.get('dates') or job.get('dates', ''),
+            'bullets': job.get('bullets', []),
+        })
+
+    return {
+        'cv': {
+            'name': sections.get('name', ''),
+            'title': profile.get('title', ''),
+            'location': sections.get('location', ''),
+            'phone': sections.get('phone', ''),
+            'email': sections.get('email') or _suggest_email(sections.get('name', '')),
+            'personal_statement': profile.get('personal_statement', ''),
+            'key_skills': profile.get('key_skills', []),
+            'certifications': profile.get('certifications', []),
+            'references': profile.get('references', 'Available on request'),
+            'experience': experience,
+        },
+        'ats_score_before': profile.get('ats_score_before'),
+        'ats_score_after': profile.get('ats_score_after'),
+        'changes_made': profile.get('changes_made', []),
+        'tips_to_100': tips.get('tips_to_100', []),
+    }
+
+
+async def _rewrite_cv(resume_text):
+    """Rewrite a CV using the configured REWRITE_MODE, on the model tier its signals route it to."""
+    resume_text = _compact_resume(resume_text, 'rewrite', REWRITE_INPUT_TOKENS)
+    signals = models.signals(resume_text)
+    if REWRITE_MODE == 'sectional':
+        try:
+            with tracing.span('rewrite.sectional'):
+                return await _rewrite_cv_sectional(resume_text, signals)
+        except Exception:
+            pass  # Fall back to the single-call rewrite
+    with tracing.span('rewrite.single'):
+        return await _rewrite_cv_single(resume_text, signals)
+
+
+@app.route('/api/full-review', methods=['POST'])
+async def full_review():
+    data = request.get_json(silent=True) or {}
+    session_id = data.get('session_id')
+    resume_id = data.get('resume_id')
+
+    if not session_id or not resume_id:
+        return jsonify({'error': 'Missing parameters'}), 400
+
+    # A reload: the review is stored already, or being generated by this worker
+    attaching = session_id in reviews_inflight
+    review = await _existing_review(session_id)
+    if review is not None:
+        metrics.inc('full_reviews_total', outcome='attached' if attaching else 'stored')
+        return jsonify(_review_response(review))
+
+    # Verify payment — the webhook has usually recorded it already; ask Stripe only on a miss
+    payment = await asyncio.to_thread(ledger.get, session_id)
+    if payment is not None and payment['payment_status'] == 'paid':
+        metrics.inc('payment_checks_total', source='ledger')
+    else:
+        try:
+            with _upstream('stripe', 'checkout.session.retrieve'):
+                session = await _stripe().checkout.Session.retrieve_async(session_id)
+            payment = await asyncio.to_thread(ledger.record, session, 'api')
+        except Exception:
+            return jsonify({'error': 'Could not verify payment'}), 400
+        metrics.inc('payment_checks_total', source='stripe')
+        if payment['payment_status'] != 'paid':
+            return jsonify({'error': 'Payment not completed'}), 402
+
+    # Prevent replay (one generation per payment, across all workers); reloads get the same review
+    if not await asyncio.to_thread(ledger.redeem, session_id):
+        review, generating = await _review_from_elsewhere(session_id)
+        if review is not None:
+            metrics.inc('full_reviews_total', outcome='waited')
+            return jsonify(_review_response(review))
+        if generating:
+            # Not holding a worker for the whole rewrite: the page asks again
+            metrics.inc('full_reviews_total', outcome='pending')
+            return jsonify({'pending': True, 'retry_after': REVIEW_POLL_SECONDS}), 202
+        if await asyncio.to_thread(ledger.redeemed_at, session_id) is None:
+            metrics.inc('full_reviews_total', outcome='failed')   # released by a failed attempt elsewhere
+            return jsonify({'error': 'CV generation failed. Please refresh to try again.'}), 500
+        metrics.inc('full_reviews_total', outcome='gone')
+        return jsonify({'error': 'This review has already been generated. Check your email or refresh the page.'}), 409
+
+    cached = resume_store.get(resume_id)
+    resume_text = cached['resume'] if cached else (data.get('resume') or '').strip()
+    job = _start_review(session_id, payment, resume_id, resume_text, contextvars.copy_context())
+    try:
+        review = await asyncio.shield(asyncio.wrap_future(job))
+    except ResumeExpired:
+        metrics.inc('full_reviews_total', outcome='expired')
+        return jsonify({'error': 'Resume expired. Please start over.'}), 410
+    except Exception:
+        metrics.inc('full_reviews_total', outcome='failed')
+        return jsonify({'error': 'CV generation failed. Please refresh to try again.'}), 500
+    metrics.inc('full_reviews_total', outcome='generated')
+    return jsonify(_review_response(review))
+
+
+class ResumeExpired(Exception):
+    """Neither this worker nor the browser still has the resume text to rewrite."""
+
+
+def _start_review(session_id, payment, resume_id, resume_text, context=None):
+    """Generate a redeemed session's review in a task of its own. Returns its Future.
+
+    Not tied to a request, so a reload (or a dropped connection) doesn't lose
+    the paid work; reloads on this worker attach to it through reviews_inflight.
+    """
+    job = aio.spawn(_generate_review(session_id, payment, resume_id, resume_text), context)
+    reviews_inflight[session_id] = job
+    job.add_done_callback(lambda _: reviews_inflight.pop(session_id, None))
+    return job
+
+
+async def _generate_review(session_id, payment, resume_id, resume_text):
+    """Rewrite, export and email a paid CV once. Stores the review for reloads; releases the session on failure."""
+    try:
+        customer_email = payment['email']
+        amount = payment['amount_total'] or 499
+        _track('payment', amount)
+        currency_sym = {'gbp': '£', 'aud': 'A$'}.get(payment['currency'], '$')
+        await _notify_admin_payment(customer_email or 'unknown', f'{currency_sym}{amount/100:.2f}')
+
+        result = None
+        if payment['resume_id'] == resume_id:
+            result = await _take_speculative(resume_id)
+        if result is None and len(resume_text) < 80:
+            raise ResumeExpired()
+        if result is None:
+            result = await _rewrite_cv(resume_text)
+
+        # Render the PDF and DOCX off the request thread, then email the rewritten CV with them
+        export_key = await _export_cv(result)
         emailed = False
         if customer_email:
-            emailed = _send_cv_email(customer_email, result)
+            emailed = await _send_cv_email(customer_email, result, export_key)
+    except BaseException:
+        await asyncio.to_thread(ledger.release, session_id)  # Allow retry on failure
+        raise
+    review = {**result, 'emailed': emailed, 'export_key': export_key}
+    await asyncio.to_thread(ledger.save_review, session_id, review)
+    return review
+
+
+async def _existing_review(session_id):
+    """The session's review if it is stored, or the one this worker is generating now; else None."""
+    review = await asyncio.to_thread(ledger.review, session_id, time.time() - REVIEW_TTL_HOURS * 3600)
+    if review is not None:
+        return review
+    job = reviews_inflight.get(session_id)
+    if job is None:
+        return None
+    try:
+        return await asyncio.shield(asyncio.wrap_future(job))
+    except Exception:
+        return None
 
-        return jsonify({**result, 'emailed': emailed})
 
-    except json.JSONDecodeError:
-        # AI didn't return valid JSON — return raw text as fallback
-        paid_sessions.discard(session_id)
-        return jsonify({'error': 'CV generation failed. Please refresh to try again.'}), 500
-    except Exception as e:
-        paid_sessions.discard(session_id)  # Allow retry on failure
-        return jsonify({'error': 'CV generation failed. Please refresh to try again.'}), 500
+async def _review_from_elsewhere(session_id):
+    """Wait up to REVIEW_WAIT_SECONDS for the review of a session redeemed by another worker.
+
+    Returns (review, generating): the stored review; (None, True) if the
+    session is still redeemed without one, so it is still being generated;
+    (None, False) if it failed (the session was released) or isn't coming.
+    """
+    deadline = time.monotonic() + REVIEW_WAIT_SECONDS
+    while True:
+        review = await _existing_review(session_id)
+        if review is not None:
+            return review, False
+        redeemed_at = await asyncio.to_thread(ledger.redeemed_at, session_id)
+        # Released after a failure; or redeemed so long ago that the review expired, or its worker died
+        if redeemed_at is None or redeemed_at < time.time() - REVIEW_GIVE_UP_SECONDS:
+            return None, False
+        if time.monotonic() >= deadline:
+            return None, True
+        await asyncio.sleep(REVIEW_POLL_SECONDS)
+
+
+def _review_response(review):
+    response = {key: value for key, value in review.items() if key != 'export_key'}
+    response['exports'] = _export_urls(review.get('export_key'))
+    return response
 
 
 # --- Admin stats ---
+def _speculative_stats():
+    stats = ledger.speculative_stats()
+    for day in stats['daily_breakdown'].values():
+        day['used_usd'], day['abandoned_usd'] = round(day['used_usd'], 4), round(day['abandoned_usd'], 4)
+    return stats
+
+
 @app.route('/admin/stats')
 def admin_stats():
-    token = request.args.get('token')
-    if token != ADMIN_TOKEN:
+    if not _is_admin():
         return jsonify({'error': 'Unauthorized'}), 401
 
+    # Totals come from pre-aggregated rollups, so any ?from=YYYY-MM-DD&to=YYYY-MM-DD range costs the same
+    events.flush()
     today = datetime.utcnow().strftime('%Y-%m-%d')
-    today_stats = analytics['daily'].get(today, {'roasts': 0, 'checkouts': 0, 'payments': 0, 'revenue_cents': 0})
-    avg_score = round(sum(analytics['scores']) / len(analytics['scores']), 1) if analytics['scores'] else 0
-    conversion = round(analytics['total_payments'] / analytics['total_checkouts'] * 100, 1) if analytics['total_checkouts'] > 0 else 0
-    upsell = round(analytics['total_checkouts'] / analytics['total_roasts'] * 100, 1) if analytics['total_roasts'] > 0 else 0
+    start, end = request.args.get('from'), request.args.get('to')
+    for day in (start, end):
+        if day and not re.fullmatch(r'\d{4}-\d{2}-\d{2}', day):
+            return jsonify({'error': 'Dates must be YYYY-MM-DD'}), 400
+    today_stats = _summary(events.totals(today, today))
+    all_time = _summary(events.totals())
+    selected = _summary(events.totals(start, end)) if start or end else all_time
+    conversion = round(selected['payments'] / selected['checkouts'] * 100, 1) if selected['checkouts'] > 0 else 0
+    upsell = round(selected['checkouts'] / selected['roasts'] * 100, 1) if selected['roasts'] > 0 else 0
 
     return jsonify({
         'today': today_stats,
-        'all_time': {
-            'roasts': analytics['total_roasts'],
-            'checkouts': analytics['total_checkouts'],
-            'payments': analytics['total_payments'],
-            'revenue': f"${analytics['revenue_cents'] / 100:.2f}",
-        },
+        'all_time': {**all_time, 'revenue': f"${all_time['revenue_cents'] / 100:.2f}"},
+        'range': {'from': start, 'to': end, **selected},
         'rates': {
-            'avg_score': avg_score,
+            'avg_score': selected['avg_score'],
             'upsell_rate': f"{upsell}%",
             'checkout_conversion': f"{conversion}%",
         },
-        'daily_breakdown': dict(sorted(analytics['daily'].items(), reverse=True)[:7]),
-        'uptime_since': analytics['started_at'],
+        'daily_breakdown': {day: _summary(totals) for day, totals in events.daily(7).items()},
+        # This worker's recent roasts: O(1) from the score ring buffer and histograms
+        'scores': {
+            'recent': score_stats.summary(),
+            'today': score_stats.day_summary(),
+        },
+        'hourly_breakdown': {hour: _summary(totals) for hour, totals in events.hourly(24).items()},
+        'uptime_since': STARTED_AT,
         'resumes_cached': len(resume_store),
+        'speculative_rewrites': {'budget_usd': SPECULATIVE_BUDGET_USD, **_speculative_stats()},
     })
 
 
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus scrape endpoint, merged across all gunicorn workers."""
+    if not _is_admin():
+        return jsonify({'error': 'Unauthorized'}), 401
+    return metrics.render(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
+
 # --- Privacy policy ---
 @app.route('/privacy')
 def privacy():
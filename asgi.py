@@ -0,0 +1,168 @@
+"""
+ASGI entry point for CVRoast.
+
+    uvicorn asgi:app --host 0.0.0.0 --port $PORT --workers 2
+
+Routes, hooks and responses are those of the Flask app in app.py. The only
+difference from the WSGI deployment is how views are run:
+
+- async views (everything that waits on Anthropic, Stripe, MailerSend or
+  ipapi) are awaited directly on the server's event loop, so one worker
+  serves many of them at once;
+- sync views (templates, uploads, admin) run in a thread pool through the
+  normal WSGI path.
+"""
+
+import asyncio
+import inspect
+import io
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import request_started
+from werkzeug.exceptions import RequestEntityTooLarge
+
+import aio
+from app import app as flask_app, profiler
+
+SYNC_THREADS = int(os.environ.get('ASGI_SYNC_THREADS', '16'))
+_pool = ThreadPoolExecutor(max_workers=SYNC_THREADS, thread_name_prefix='asgi-sync')
+
+
+def _environ(scope, body):
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for raw_name, raw_value in scope.get('headers', []):
+        name = raw_name.decode('latin-1').upper().replace('-', '_')
+        value = raw_value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+        elif name == 'CONTENT_LENGTH':
+            environ['CONTENT_LENGTH'] = value
+        else:
+            key = f'HTTP_{name}'
+            environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+def _call_wsgi(wsgi_app, environ):
+    """Run a WSGI app and collect (status, headers, body)."""
+    started = {}
+
+    def start_response(status, headers, exc_info=None):
+        started['status'] = int(status.split(' ', 1)[0])
+        started['headers'] = headers
+
+    chunks = wsgi_app(environ, start_response)
+    try:
+        body = b''.join(chunks)
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+    return started['status'], started['headers'], body
+
+
+def _view_for(environ):
+    try:
+        endpoint, _ = flask_app.url_map.bind_to_environ(environ).match()
+    except Exception:
+        return None
+    return flask_app.view_functions.get(endpoint)
+
+
+async def _dispatch_async(environ, view):
+    """Flask's wsgi_app/full_dispatch_request, awaiting the view on this loop."""
+    ctx = flask_app.request_context(environ)
+    error = None
+    ctx.push()
+    try:
+        try:
+            flask_app._got_first_request = True
+            request_started.send(flask_app, _async_wrapper=flask_app.ensure_sync)
+            rv = flask_app.preprocess_request()
+            if rv is None:
+                rv = await view(**ctx.request.view_args)
+        except Exception as e:
+            rv = flask_app.handle_user_exception(e)
+        response = flask_app.finalize_request(rv)
+    except Exception as e:
+        error = e
+        response = flask_app.handle_exception(e)
+    try:
+        return _call_wsgi(response, environ)
+    finally:
+        ctx.pop(error)
+
+
+async def _read_body(receive, limit):
+    body = bytearray()
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if limit is not None and len(body) > limit:
+            raise RequestEntityTooLarge()
+        if not message.get('more_body'):
+            return bytes(body)
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            aio.set_worker_loop(asyncio.get_running_loop())
+            if profiler:
+                # Before the first request's task, so its steps are attributed too
+                profiler.instrument(asyncio.get_running_loop())
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await _lifespan(receive, send)
+    if scope['type'] != 'http':
+        return
+
+    loop = asyncio.get_running_loop()
+    if aio.worker_loop_is_unset():
+        aio.set_worker_loop(loop)
+
+    try:
+        body = await _read_body(receive, flask_app.config.get('MAX_CONTENT_LENGTH'))
+    except RequestEntityTooLarge as e:
+        status, headers, payload = _call_wsgi(e.get_response(), _environ(scope, b''))
+    else:
+        environ = _environ(scope, body)
+        view = _view_for(environ)
+        if view is not None and inspect.iscoroutinefunction(view):
+            status, headers, payload = await _dispatch_async(environ, view)
+        else:
+            status, headers, payload = await loop.run_in_executor(_pool, _call_wsgi, flask_app, environ)
+
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers],
+    })
+    await send({'type': 'http.response.body', 'body': payload})
@@ -0,0 +1,6 @@
+"""
+Benchmarks for CVRoast.
+
+Run from the repo root, e.g. `python -m bench.rewrite_latency`.
+Nothing in here is imported by the app.
+"""
@@ -0,0 +1,106 @@
+"""
+Synthetic resume corpus for benchmarks.
+
+Resumes are deterministic for a given seed so runs are comparable.
+Job headings use the "Title | Company, City | Start — End" layout that
+bench.fakes recognises when it fakes model replies.
+"""
+
+import random
+
+FIRST_NAMES = ['Sarah', 'James', 'Priya', 'Tom', 'Aisha', 'Daniel', 'Mei', 'Oliver']
+LAST_NAMES = ['Thompson', 'Patel', 'Nguyen', 'Walker', 'Okafor', 'Hughes', 'Garcia', 'Reid']
+CITIES = ['Manchester', 'Leeds', 'Austin', 'Sydney', 'Bristol', 'Denver', 'Glasgow', 'Perth']
+TITLES = ['Operations Manager', 'Software Engineer', 'Care Assistant', 'Sales Executive',
+          'Project Coordinator', 'Data Analyst', 'Office Administrator', 'Warehouse Supervisor']
+COMPANIES = ['Acme Logistics', 'Northwind Ltd', 'Brightside Care', 'Bluefin Software',
+             'Harbour Retail', 'Oakridge Council', 'Summit Health', 'Redline Motors']
+DUTIES = [
+    'responsible for managing the team and making sure things got done on time',
+    'dealt with customers on the phone and by email when they had problems',
+    'helped out with the monthly reports and sent them to the managers',
+    'worked on the new system rollout with the IT people',
+    'trained new starters and showed them how everything works',
+    'looked after stock levels and ordered things when we ran low',
+    'went to meetings with suppliers to sort out prices',
+    'kept the filing up to date and answered general enquiries',
+]
+
+
+def make_resume(n_jobs, bullets_per_job=4, seed=0):
+    """Build a plain-text resume with `n_jobs` experience entries."""
+    rng = random.Random(seed * 1000 + n_jobs)
+    name = f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}'
+    city = rng.choice(CITIES)
+    lines = [
+        name,
+        f'{city} | 07700 900{rng.randint(100, 999)} | {name.lower().replace(" ", ".")}@example.com',
+        '',
+        'PROFILE',
+        'Hard working and reliable person looking for a new challenge where I can use my skills.',
+        '',
+        'EXPERIENCE',
+    ]
+    year = 2025
+    for _ in range(n_jobs):
+        start = year - rng.randint(1, 4)
+        lines.append(f'{rng.choice(TITLES)} | {rng.choice(COMPANIES)}, {rng.choice(CITIES)} | {start} — {year}')
+        for duty in rng.sample(DUTIES, min(bullets_per_job, len(DUTIES))):
+            lines.append(f'- {duty}')
+        lines.append('')
+        year = start
+    lines += [
+        'EDUCATION',
+        f'BSc Business Management, University of {rng.choice(CITIES)}, {year - 3}',
+        '',
+        'SKILLS',
+        'Microsoft Office, team player, good communicator, hard worker',
+    ]
+    return '\n'.join(lines)
+
+
+def make_corpus(job_counts=(1, 2, 4, 6, 8), seed=0):
+    """Return [(n_jobs, resume_text)] for each requested job count."""
+    return [(n, make_resume(n, seed=seed)) for n in job_counts]
+
+
+def _pdf_escape(text):
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def make_pdf(resume_text, pages=1):
+    """Render `resume_text` onto `pages` pages of a minimal text-only PDF.
+
+    Good enough for pypdf's text extraction; large page counts give the
+    multi-megabyte uploads used by the load tests.
+    """
+    lines = resume_text.encode('latin-1', 'replace').decode('latin-1').splitlines()
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        None,  # Pages, filled in once page ids are known
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>',
+    ]
+    page_ids = []
+    for _ in range(pages):
+        ops = ['BT', '/F1 9 Tf', '40 800 Td', '11 TL']
+        ops += [f'({_pdf_escape(line)}) Tj T*' for line in lines[:70]]
+        ops.append('ET')
+        stream = '\n'.join(ops).encode('latin-1')
+        objects.append(b'<< /Length %d >>\nstream\n%s\nendstream' % (len(stream), stream))
+        objects.append(b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] '
+                       b'/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>' % (len(objects)))
+        page_ids.append(len(objects))
+    kids = ' '.join(f'{i} 0 R' for i in page_ids).encode()
+    objects[1] = b'<< /Type /Pages /Kids [%s] /Count %d >>' % (kids, len(page_ids))
+
+    out = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for i, obj in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b'%d 0 obj\n%s\nendobj\n' % (i, obj)
+    xref = len(out)
+    out += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    for offset in offsets:
+        out += b'%010d 00000 n \n' % offset
+    out += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref)
+    return bytes(out)
@@ -0,0 +1,119 @@
+"""
+Time the PDF and DOCX exports of rewritten CVs.
+
+    python -m bench.cv_export
+    python -m bench.cv_export --jobs 5,20,100 --bullets 6 --repeat 10 --workers 2
+
+First renders each format in this process for CVs of --jobs experience
+entries (median ms, file size, PDF pages). Then runs cvexport.CvExports the
+way full_review does, on a temporary cache directory with a pool of
+--workers processes: the first render (which starts the pool), renders of
+new CVs, and cache hits for a CV already rendered. While those run, a
+ticker on the event loop records its longest stall, against the same
+renders called directly on the loop, which is what rendering inside the
+request would cost every other request on that worker under uvicorn.
+"""
+
+import argparse
+import asyncio
+import io
+import statistics
+import tempfile
+import time
+
+import cvexport
+from bench.email_render import make_cv
+
+
+def render_times(jobs, bullets, repeat):
+    print(f"{'jobs':>6} {'format':>7} {'ms':>8} {'KB':>7} {'pages':>6}")
+    for n_jobs in jobs:
+        cv_data = make_cv(n_jobs, bullets)
+        for fmt, render in cvexport.RENDERERS.items():
+            render(cv_data)     # imports, first-use caches
+            runs = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                data = render(cv_data)
+                runs.append((time.perf_counter() - start) * 1000)
+            pages = '-'
+            if fmt == 'pdf':
+                from pypdf import PdfReader
+                pages = len(PdfReader(io.BytesIO(data)).pages)
+            print(f'{n_jobs:>6} {fmt:>7} {statistics.median(runs):>8.1f} {len(data) / 1024:>7.1f} {pages:>6}')
+
+
+async def stalls(work):
+    """Run `work` while a 1ms ticker measures the event loop's longest stall (ms)."""
+    worst = 0.0
+    done = asyncio.Event()
+
+    async def ticker():
+        nonlocal worst
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            worst = max(worst, (time.perf_counter() - start) * 1000 - 1)
+
+    tick = asyncio.create_task(ticker())
+    await asyncio.sleep(0.005)      # let the ticker start before `work` can block the loop
+    result = await work()
+    done.set()
+    await tick
+    return result, worst
+
+
+async def pool_times(n_jobs, bullets, count, workers):
+    exports = cvexport.CvExports(tempfile.mkdtemp(prefix='cvroast-exports-'), workers=workers)
+    results = [make_cv(n_jobs, bullets, seed=seed) for seed in range(count + 1)]
+
+    async def timed(cv_data):
+        start = time.perf_counter()
+        await exports.render(cv_data)
+        return (time.perf_counter() - start) * 1000
+
+    first = await timed(results[0])
+
+    async def new_cvs():
+        return [await timed(cv_data) for cv_data in results[1:]]
+    fresh, pool_stall = await stalls(new_cvs)
+
+    async def concurrent():
+        start = time.perf_counter()
+        await asyncio.gather(*(exports.render(make_cv(n_jobs, bullets, seed=100 + seed)) for seed in range(count)))
+        return (time.perf_counter() - start) * 1000
+    together, _ = await stalls(concurrent)
+
+    cached = [await timed(cv_data) for cv_data in results[1:]]
+
+    async def inline():
+        for cv_data in results[1:]:
+            for render in cvexport.RENDERERS.values():
+                render(cv_data)
+    _, inline_stall = await stalls(inline)
+
+    print(f'\nCvExports, {workers} worker process{"es" if workers != 1 else ""}, {n_jobs}-job CVs (PDF + DOCX):')
+    print(f'  first render (starts the pool)   {first:>8.1f} ms')
+    print(f'  new CV, one at a time            {statistics.median(fresh):>8.1f} ms median')
+    print(f'  {count} new CVs at once             {together:>8.1f} ms total')
+    print(f'  cached CV                        {statistics.median(cached):>8.2f} ms median')
+    print(f'  longest event loop stall: {pool_stall:.1f} ms through the pool, '
+          f'{inline_stall:.1f} ms rendering on the loop')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark PDF and DOCX exports of rewritten CVs.')
+    parser.add_argument('--jobs', default='5,20,100', help='comma-separated experience entries per CV')
+    parser.add_argument('--bullets', type=int, default=5, help='bullets per experience entry')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=1, help='CvExports process pool size')
+    parser.add_argument('--count', type=int, default=8, help='CVs rendered through CvExports')
+    args = parser.parse_args()
+
+    jobs = [int(n) for n in args.jobs.split(',')]
+    render_times(jobs, args.bullets, args.repeat)
+    asyncio.run(pool_times(jobs[min(1, len(jobs) - 1)], args.bullets, args.count, args.workers))
+
+
+if __name__ == '__main__':
+    main()
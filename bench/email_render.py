@@ -0,0 +1,188 @@
+"""
+Time rendering the rewritten-CV email for CVs of growing size.
+
+    python -m bench.email_render
+    python -m bench.email_render --jobs 5,50,500 --bullets 8 --repeat 50
+
+Renders the HTML and plain-text bodies of emails.render_cv for synthetic
+full-review results with --jobs experience entries of --bullets bullets
+each, against the f-string builder app.py used before (copied below as
+legacy_cv_email), unescaped as it was and with html.escape applied to every
+value, and reports microseconds per email and output size.
+Also times compiling the templates, the cost a worker would pay per email
+if they weren't kept, and checks both renderers on a CV full of markup:
+the legacy builder passes it through, the templates must escape it.
+"""
+
+import argparse
+import html
+import random
+import statistics
+import time
+
+import emails
+from bench.corpus import COMPANIES, DUTIES, TITLES
+
+HOSTILE = '<script>alert("x")</script> R&D <b>lead</b>'
+
+
+def make_cv(n_jobs, bullets_per_job=5, seed=0, text=None):
+    """A full-review result whose CV has `n_jobs` experience entries."""
+    rng = random.Random(seed * 1000 + n_jobs)
+
+    def line():
+        return text or f'{rng.choice(DUTIES).capitalize()}, cutting costs by {rng.randint(5, 40)}%'
+
+    return {
+        'ats_score_before': 41,
+        'ats_score_after': 88,
+        'cv': {
+            'name': text or 'Sarah Thompson',
+            'title': text or rng.choice(TITLES),
+            'location': 'Manchester',
+            'phone': '07700 900123',
+            'email': 'sarah.thompson@example.com',
+            'personal_statement': ' '.join(line() for _ in range(4)),
+            'key_skills': [text or f'Skill {i}' for i in range(12)],
+            'experience': [{'title': rng.choice(TITLES), 'company': text or rng.choice(COMPANIES),
+                            'dates': f'{2024 - i} — {2025 - i}',
+                            'bullets': [line() for _ in range(bullets_per_job)]}
+                           for i in range(n_jobs)],
+            'certifications': [text or 'PRINCE2 Foundation', 'First Aid at Work'],
+        },
+    }
+
+
+def legacy_cv_email(cv_data):
+    """app._send_cv_email's body before the templates: nested f-strings and `+=`, unescaped."""
+    cv = cv_data.get('cv', {})
+    name = cv.get('name', 'Your Name')
+    title = cv.get('title', '')
+    location = cv.get('location', '')
+    phone = cv.get('phone', '')
+    email = cv.get('email', '')
+
+    exp_html = ''
+    for job in cv.get('experience', []):
+        bullets = ''.join(f'<li style="margin:4px 0;color:#333;">{b}</li>' for b in job.get('bullets', []))
+        exp_html += f'''
+        <div style="margin-bottom:20px;">
+            <div style="font-weight:700;font-size:15px;color:#1a1a2e;">{job.get("title", "")}</div>
+            <div style="font-size:13px;color:#666;margin-bottom:6px;">{job.get("company", "")} | {job.get("dates", "")}</div>
+            <ul style="padding-left:20px;margin:0;">{bullets}</ul>
+        </div>'''
+
+    skills_html = ' &bull; '.join(cv.get('key_skills', []))
+    certs_html = ''.join(f'<li style="margin:2px 0;color:#333;">{c}</li>' for c in cv.get('certifications', []))
+
+    score_before = cv_data.get('ats_score_before', '?')
+    score_after = cv_data.get('ats_score_after', '?')
+
+    html_body = f"""
+    <div style="max-width:660px;margin:0 auto;font-family:Arial,sans-serif;">
+        <div style="text-align:center;padding:24px;background:#0a0a0b;border-radius:12px 12px 0 0;">
+            <span style="font-size:22px;font-weight:800;color:#ff6b2c;">CVRoast</span>
+            <h1 style="font-size:22px;font-weight:700;color:#fff;margin:12px 0 4px;">Your Professionally Rewritten CV</h1>
+            <p style="color:#8e8e9a;font-size:13px;margin:0;">ATS Score: {score_before}/100 → {score_after}/100</p>
+        </div>
+        <div style="background:#ffffff;padding:40px 36px;border:1px solid #e0e0e0;">
+            <h1 style="font-size:26px;font-weight:800;color:#1a1a2e;margin:0;">{name}</h1>
+            <div style="font-size:14px;color:#555;margin:4px 0 16px;">{title}</div>
+            <div style="font-size:13px;color:#666;margin-bottom:20px;padding-bottom:16px;border-bottom:2px solid #1a365d;">
+                {f'{location}' if location else ''}{f' | {phone}' if phone else ''}{f' | {email}' if email else ''}
+            </div>
+            <h2 style="font-size:14px;font-weight:700;color:#1a365d;text-transform:uppercase;letter-spacing:1px;margin:20px 0 8px;">Professional Summary</h2>
+            <p style="font-size:14px;color:#333;line-height:1.7;margin:0 0 20px;">{cv.get("personal_statement", "")}</p>
+            <h2 style="font-size:14px;font-weight:700;color:#1a365d;text-transform:uppercase;letter-spacing:1px;margin:20px 0 8px;">Key Skills</h2>
+            <p style="font-size:13px;color:#333;line-height:1.8;margin:0 0 20px;">{skills_html}</p>
+            <h2 style="font-size:14px;font-weight:700;color:#1a365d;text-transform:uppercase;letter-spacing:1px;margin:20px 0 12px;">Professional Experience</h2>
+            {exp_html}
+            {f'<h2 style="font-size:14px;font-weight:700;color:#1a365d;text-transform:uppercase;letter-spacing:1px;margin:20px 0 8px;">Certifications</h2><ul style="padding-left:20px;margin:0;">{certs_html}</ul>' if certs_html else ''}
+        </div>
+        <div style="text-align:center;padding:24px;background:#f8f8f8;border-radius:0 0 12px 12px;border:1px solid #e0e0e0;border-top:none;">
+            <p style="color:#666;font-size:13px;margin:0 0 8px;">Tip: Open this email on your computer and print to save as PDF.</p>
+            <a href="https://cvroast.com" style="display:inline-block;padding:10px 24px;background:#ff6b2c;color:#fff;text-decoration:none;border-radius:8px;font-weight:700;font-size:13px;">Share CVRoast</a>
+            <p style="color:#999;font-size:11px;margin-top:16px;">&copy; 2026 CVRoast</p>
+        </div>
+    </div>
+    """
+
+    plain = f"{name}\n{title}\n{location} | {phone} | {email}\n\n"
+    plain += f"PROFESSIONAL SUMMARY\n{cv.get('personal_statement', '')}\n\n"
+    plain += f"KEY SKILLS\n{', '.join(cv.get('key_skills', []))}\n\n"
+    plain += "EXPERIENCE\n"
+    for job in cv.get('experience', []):
+        plain += f"\n{job.get('title', '')}\n{job.get('company', '')} | {job.get('dates', '')}\n"
+        for b in job.get('bullets', []):
+            plain += f"  - {b}\n"
+    return html_body, plain
+
+
+def escaped(value):
+    """`value` with every string in it HTML-escaped."""
+    if isinstance(value, str):
+        return html.escape(value)
+    if isinstance(value, dict):
+        return {key: escaped(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [escaped(item) for item in value]
+    return value
+
+
+def legacy_escaped(cv_data):
+    """The legacy builder made safe the cheapest way: escape every value first (the text part would need the
+    raw values, so this only stands in for the HTML)."""
+    return legacy_cv_email(escaped(cv_data))
+
+
+def time_render(fn, cv_data, repeat):
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(cv_data)
+        runs.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(runs)
+
+
+def compile_templates():
+    for name in emails.env.list_templates():
+        source = emails.env.loader.get_source(emails.env, name)[0]
+        emails.env.compile(source, name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark rendering the rewritten-CV email.')
+    parser.add_argument('--jobs', default='5,20,100,500', help='comma-separated experience entries per CV')
+    parser.add_argument('--bullets', type=int, default=5, help='bullets per experience entry')
+    parser.add_argument('--repeat', type=int, default=30)
+    args = parser.parse_args()
+
+    emails.preload()
+    print(f"{'jobs':>6} {'html KB':>8} {'text KB':>8} {'legacy us':>10} {'+escape us':>11} {'template us':>12}")
+    for n_jobs in (int(n) for n in args.jobs.split(',')):
+        cv_data = make_cv(n_jobs, args.bullets)
+        html_body, text = emails.render_cv(cv_data)
+        legacy = time_render(legacy_cv_email, cv_data, args.repeat)
+        legacy_safe = time_render(legacy_escaped, cv_data, args.repeat)
+        current = time_render(emails.render_cv, cv_data, args.repeat)
+        print(f'{n_jobs:>6} {len(html_body) / 1024:>8.1f} {len(text) / 1024:>8.1f} {legacy:>10.0f} '
+              f'{legacy_safe:>11.0f} {current:>12.0f}')
+
+    runs = []
+    for _ in range(max(3, args.repeat // 10)):
+        start = time.perf_counter()
+        compile_templates()
+        runs.append((time.perf_counter() - start) * 1e6)
+    print(f'\ncompiling the email templates: {statistics.median(runs):.0f} us (paid once per worker)')
+
+    hostile = make_cv(3, 2, text=HOSTILE)
+    legacy_html = legacy_cv_email(hostile)[0]
+    html_body, text = emails.render_cv(hostile)
+    print(f"raw '<script>' in the HTML: legacy {legacy_html.count('<script>')}, templates "
+          f"{html_body.count('<script>')}; escaped in the templates: {html_body.count('&lt;script&gt;')}; "
+          f"plain text left as written: "
+          f"{text.count(HOSTILE)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,231 @@
+"""
+Fake PRAW and sync Anthropic clients for benchmarking reddit_monitor.
+
+RedditWorld holds the subreddits, posts and our account's comments; every
+FakeReddit built from it (reddit_monitor builds one per fetch thread) shares
+that state. Each call that would be an HTTP request to Reddit sleeps for
+`latency` and is counted:
+
+- iterating subreddit(...).new(limit=n) or redditor(...).comments.new(limit=n)
+  costs one request per 100 items, like a listing page; subreddit('a+b')
+  is the merged listing of several subreddits;
+- info(fullnames=[...]) costs one request per 100 posts;
+- submission.comments.replace_more() fetches the comment tree, one request;
+- submission.reply() and subreddit(...).submit() are one request each;
+  submissions are listed by redditor(...).submissions.new().
+
+Posts are generated deterministically: a mix of fresh keyword-matching
+requests for help, posts without keywords, link posts and old posts. Some
+fresh candidates are about salaries or interviews, which FakeSyncAnthropic
+scores low when asked to triage and answers with SKIP when asked for a
+reply, as the real prompts ask.
+"""
+
+import json
+import random
+import re
+import threading
+import time
+from types import SimpleNamespace
+
+from bench.fakes import estimate_tokens
+
+HELP_TITLES = ['Resume review please, no callbacks after 80 applications',
+               'Can someone rate my resume? Career changer into data',
+               'Not getting interviews — need resume help',
+               'ATS friendly template? My resume gets no responses']
+OFF_TOPIC_TITLES = ['How do I negotiate salary after an offer?',
+                    'Interview tomorrow, any tips? (no callbacks lately)']
+OTHER_TITLES = ['Quit my job today', 'Is this recruiter legit?', 'Weekly vent thread',
+                'Got the offer!', 'Four day week at my company']
+BODY = ('I have been applying for months with barely any responses. I have six years of experience in '
+        'operations and I keep rewriting my bullet points but nothing changes. Any resume feedback welcome. ')
+SKIP_MARKERS = ('salary', 'Interview tomorrow')
+TRIAGE_ITEM = re.compile(r'^\[(\d+)\] (.*?)(?=^\[\d+\] |\Z)', re.MULTILINE | re.DOTALL)
+
+
+class RedditWorld:
+    def __init__(self, subreddits, posts_per_sub=20, username='cvroast_helper', latency=0.15, help_share=0.08,
+                 seed=0):
+        self.username = username
+        self.latency = latency
+        self.help_share = help_share      # of posts asking for resume help; as many again are off topic
+        self.rng = random.Random(seed)
+        self.subreddits = {name: [] for name in subreddits}
+        self.own_comments = []        # newest first
+        self.own_submissions = []     # newest first
+        self.published = {}           # post id -> publish time, for posts added by publish()
+        self.requests = 0
+        self.lock = threading.Lock()
+        self._next_id = 0
+        self.add_posts(posts_per_sub)
+
+    def request(self):
+        time.sleep(self.latency)
+        with self.lock:
+            self.requests += 1
+
+    def add_posts(self, per_sub, now=None, max_age_hours=6):
+        """Publish `per_sub` new posts in every subreddit (newest first in listings)."""
+        now = now or time.time()
+        for name, posts in self.subreddits.items():
+            fresh = sorted((self._make_post(name, now, max_age_hours) for _ in range(per_sub)),
+                           key=lambda post: post.created_utc)
+            with self.lock:
+                posts[:0] = reversed(fresh)
+
+    def publish(self, n, now=None):
+        """Publish n posts, each in a random subreddit, created now."""
+        now = now or time.time()
+        names = list(self.subreddits)
+        for _ in range(n):
+            name = self.rng.choice(names)
+            post = self._make_post(name, now, 0)
+            with self.lock:
+                self.subreddits[name].insert(0, post)
+                self.published[post.id] = now
+
+    def _make_post(self, subreddit, now, max_age_hours=6):
+        self._next_id += 1
+        kind = self.rng.random()
+        age = self.rng.uniform(0, max_age_hours) * 3600
+        if kind < self.help_share:
+            title, body = self.rng.choice(HELP_TITLES), BODY * 3
+        elif kind < 2 * self.help_share:
+            title, body = self.rng.choice(OFF_TOPIC_TITLES), BODY * 2
+        elif kind < 0.86:
+            title, body = self.rng.choice(OTHER_TITLES), 'Long story short, my manager ' * 5
+        elif kind < 0.93:
+            title, body = self.rng.choice(HELP_TITLES), ''          # link or image post
+        elif max_age_hours:
+            title, body, age = self.rng.choice(HELP_TITLES), BODY, 30 * 3600
+        else:                                                        # published just now: can't be old
+            title, body = self.rng.choice(HELP_TITLES), BODY
+        return FakeSubmission(self, f'p{self._next_id:05d}', subreddit, title, body, now - age)
+
+    def client(self):
+        return FakeReddit(self)
+
+
+class FakeSubmission:
+    def __init__(self, world, post_id, subreddit, title, selftext, created_utc):
+        self._world = world
+        self.id = post_id
+        self.fullname = f't3_{post_id}'
+        self.subreddit = SimpleNamespace(display_name=subreddit)
+        self.title = title
+        self.selftext = selftext
+        self.created_utc = created_utc
+        self.comments = _FakeCommentForest(self)
+        self._comments = [SimpleNamespace(author=SimpleNamespace(name=f'user{i}')) for i in range(3)]
+
+    def reply(self, text):
+        world = self._world
+        world.request()
+        comment = SimpleNamespace(author=SimpleNamespace(name=world.username), body=text,
+                                  link_id=self.fullname, subreddit=self.subreddit, created_utc=time.time())
+        with world.lock:
+            self._comments.append(comment)
+            world.own_comments.insert(0, comment)
+        return comment
+
+
+class _FakeCommentForest:
+    def __init__(self, submission):
+        self._submission = submission
+
+    def replace_more(self, limit=32):
+        # Listings hand out fresh objects in PRAW, so every run fetches the tree again
+        self._submission._world.request()
+        return []
+
+    def list(self):
+        return list(self._submission._comments)
+
+
+def _listing(world, items, limit):
+    items = list(items[:limit])
+    for _ in range(max(1, -(-len(items) // 100))):
+        world.request()
+    return iter(items)
+
+
+class FakeReddit:
+    def __init__(self, world):
+        self._world = world
+
+    def subreddit(self, name):
+        world = self._world
+
+        def new(limit=100, params=None):
+            with world.lock:
+                posts = [post for sub in name.split('+') for post in world.subreddits[sub]]
+            posts.sort(key=lambda post: -post.created_utc)
+            return _listing(world, posts, limit)
+
+        def submit(title, selftext):
+            world.request()
+            with world.lock:
+                world._next_id += 1
+                submission = FakeSubmission(world, f's{world._next_id:05d}', name, title, selftext, time.time())
+                submission.permalink = f'/r/{name}/comments/{submission.id}/'
+                world.own_submissions.insert(0, submission)
+            return submission
+        return SimpleNamespace(new=new, submit=submit)
+
+    def info(self, fullnames=()):
+        world = self._world
+        wanted = set(fullnames)
+        with world.lock:
+            posts = [post for sub in world.subreddits.values() for post in sub if post.fullname in wanted]
+        return _listing(world, posts, len(posts))
+
+    def redditor(self, name):
+        world = self._world
+        mine = name == world.username
+        comments = world.own_comments if mine else []
+        submissions = world.own_submissions if mine else []
+        return SimpleNamespace(comments=SimpleNamespace(new=lambda limit=100: _listing(world, comments, limit)),
+                               submissions=SimpleNamespace(new=lambda limit=100: _listing(world, submissions, limit)))
+
+
+class _FakeSyncMessages:
+    def __init__(self, client):
+        self._client = client
+
+    def create(self, model, max_tokens, messages, **kwargs):
+        prompt = messages[-1]['content']
+        if '"scores"' in prompt:
+            posts = TRIAGE_ITEM.findall(prompt.split('Posts:', 1)[-1])
+            text = json.dumps({'scores': [
+                {'post': int(n), 'score': 2 if any(marker in post for marker in SKIP_MARKERS) else 8}
+                for n, post in posts]})
+        else:
+            post = prompt.rsplit('Post title:', 1)[-1]   # the instructions mention salaries too
+            skip = any(marker in post for marker in SKIP_MARKERS)
+            text = 'SKIP' if skip else ('Lead every bullet with the result, then the action. ' * 8).strip()
+        output_tokens = min(estimate_tokens(text), max_tokens)
+        time.sleep(self._client.latency(output_tokens))
+        usage = SimpleNamespace(input_tokens=estimate_tokens(prompt), output_tokens=output_tokens)
+        with self._client.lock:
+            self._client.calls.append({'model': model, 'input_tokens': usage.input_tokens,
+                                       'output_tokens': output_tokens})
+        return SimpleNamespace(content=[SimpleNamespace(type='text', text=text)], model=model, usage=usage)
+
+
+class FakeSyncAnthropic:
+    """Drop-in for `anthropic.Anthropic` (messages.create) with Haiku-like latency."""
+
+    def __init__(self, ttft=0.5, tokens_per_sec=150.0, time_scale=1.0):
+        self.ttft = ttft
+        self.tokens_per_sec = tokens_per_sec
+        self.time_scale = time_scale
+        self.calls = []
+        self.lock = threading.Lock()
+        self.messages = _FakeSyncMessages(self)
+
+    def latency(self, output_tokens):
+        return (self.ttft + output_tokens / self.tokens_per_sec) * self.time_scale
+
+    def tokens(self):
+        return sum(c['input_tokens'] + c['output_tokens'] for c in self.calls)
@@ -0,0 +1,258 @@
+"""
+Local HTTP fakes for every service app.py talks to.
+
+One threaded server answers for all of them, so the real SDKs and HTTP
+clients are exercised end to end:
+
+    Anthropic   POST /v1/messages                (JSON or SSE token stream)
+    Stripe      POST /v1/checkout/sessions, GET /v1/checkout/sessions/<id>,
+                and a signed checkout.session.completed webhook per session
+    MailerSend  POST /v1/email
+    ipapi       GET  /<ip>/country/
+
+Point the app at it with ANTHROPIC_BASE_URL, STRIPE_API_BASE,
+MAILERSEND_API_URL and IPAPI_URL (see FakeUpstream.env()). Webhooks are
+only sent when FakeUpstream is given a webhook_url.
+
+Run standalone with `python -m bench.fake_upstream --port 8900`.
+"""
+
+import argparse
+import hashlib
+import hmac
+import json
+import threading
+import time
+import urllib.request
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+from bench.fakes import DEFAULT_TOKENS_PER_SEC, canned_reply, estimate_tokens
+
+
+class UpstreamConfig:
+    """Simulated latencies, in seconds."""
+
+    def __init__(self, ttft=0.6, tokens_per_sec=None, stripe_latency=0.25,
+                 email_latency=0.15, geo_latency=0.1, webhook_delay=2.0, time_scale=1.0):
+        self.ttft = ttft
+        self.tokens_per_sec = {**DEFAULT_TOKENS_PER_SEC, **(tokens_per_sec or {})}
+        self.stripe_latency = stripe_latency
+        self.webhook_delay = webhook_delay    # customer filling in the card form
+        self.email_latency = email_latency
+        self.geo_latency = geo_latency
+        self.time_scale = time_scale
+
+    def sleep(self, seconds):
+        time.sleep(seconds * self.time_scale)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def upstream(self):
+        return self.server.upstream
+
+    def _body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def _send(self, status, body, content_type='application/json'):
+        data = body if isinstance(body, bytes) else body.encode()
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _json(self, status, obj):
+        self._send(status, json.dumps(obj))
+
+    def do_POST(self):
+        body = self._body()
+        if self.path.startswith('/v1/messages'):
+            return self._anthropic(json.loads(body))
+        if self.path.startswith('/v1/checkout/sessions'):
+            return self._stripe_create(parse_qs(body.decode()))
+        if self.path.startswith('/v1/email'):
+            self.upstream.count('mailersend')
+            self.upstream.config.sleep(self.upstream.config.email_latency)
+            return self._send(202, b'')
+        self._json(404, {'error': 'not found'})
+
+    def do_GET(self):
+        if self.path.startswith('/v1/checkout/sessions/'):
+            return self._stripe_retrieve(self.path.rsplit('/', 1)[-1].split('?')[0])
+        if self.path.endswith('/country/'):
+            self.upstream.count('ipapi')
+            self.upstream.config.sleep(self.upstream.config.geo_latency)
+            return self._send(200, 'GB', 'text/plain')
+        if self.path == '/__stats__':
+            return self._json(200, self.upstream.stats())
+        self._json(404, {'error': 'not found'})
+
+    # --- Anthropic ---
+
+    def _anthropic(self, payload):
+        config = self.upstream.config
+        self.upstream.count('anthropic')
+        model = payload.get('model', '')
+        prompt = payload['messages'][-1]['content']
+        text = canned_reply(prompt)
+        output_tokens = min(estimate_tokens(text), payload.get('max_tokens', 4096))
+        tps = config.tokens_per_sec['haiku' if 'haiku' in model else 'sonnet']
+        usage = {'input_tokens': estimate_tokens(prompt), 'output_tokens': output_tokens}
+        message = {
+            'id': f'msg_{uuid.uuid4().hex[:24]}', 'type': 'message', 'role': 'assistant',
+            'model': model, 'stop_reason': 'end_turn', 'stop_sequence': None,
+        }
+        config.sleep(config.ttft)
+        if not payload.get('stream'):
+            config.sleep(output_tokens / tps)
+            return self._json(200, {**message, 'content': [{'type': 'text', 'text': text}], 'usage': usage})
+
+        # Server-sent events, one delta per ~token
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+
+        def event(name, data):
+            self.wfile.write(f'event: {name}\ndata: {json.dumps(data)}\n\n'.encode())
+            self.wfile.flush()
+
+        event('message_start', {'type': 'message_start', 'message': {
+            **message, 'content': [], 'stop_reason': None,
+            'usage': {'input_tokens': usage['input_tokens'], 'output_tokens': 1}}})
+        event('content_block_start', {'type': 'content_block_start', 'index': 0,
+                                      'content_block': {'type': 'text', 'text': ''}})
+        for i in range(0, len(text), 4):
+            config.sleep(1 / tps)
+            event('content_block_delta', {'type': 'content_block_delta', 'index': 0,
+                                          'delta': {'type': 'text_delta', 'text': text[i:i + 4]}})
+        event('content_block_stop', {'type': 'content_block_stop', 'index': 0})
+        event('message_delta', {'type': 'message_delta', 'delta': {'stop_reason': 'end_turn', 'stop_sequence': None},
+                                'usage': {'output_tokens': output_tokens}})
+        event('message_stop', {'type': 'message_stop'})
+
+    # --- Stripe ---
+
+    def _stripe_create(self, form):
+        self.upstream.count('stripe')
+        self.upstream.config.sleep(self.upstream.config.stripe_latency)
+        session_id = f'cs_test_{uuid.uuid4().hex}'
+        success_url = form.get('success_url', [''])[0]
+        session = {
+            'id': session_id,
+            'object': 'checkout.session',
+            'url': success_url.replace('{CHECKOUT_SESSION_ID}', session_id),
+            'client_reference_id': form.get('client_reference_id', [None])[0],
+            'currency': form.get('line_items[0][price_data][currency]', ['usd'])[0],
+            'amount_total': int(form.get('line_items[0][price_data][unit_amount]', ['499'])[0]),
+            'payment_status': 'paid',
+            'status': 'complete',
+            'customer_details': {'email': f'customer-{session_id[-6:]}@example.com'},
+        }
+        self.upstream.sessions[session_id] = session
+        self._json(200, session)
+        if self.upstream.webhook_url:
+            threading.Thread(target=self.upstream.send_webhook, args=(session,), daemon=True).start()
+
+    def _stripe_retrieve(self, session_id):
+        self.upstream.count('stripe')
+        self.upstream.config.sleep(self.upstream.config.stripe_latency)
+        session = self.upstream.sessions.get(session_id)
+        if not session:
+            return self._json(404, {'error': {'type': 'invalid_request_error', 'message': 'No such session'}})
+        self._json(200, session)
+
+
+class FakeUpstream:
+    """Threaded fake server for Anthropic, Stripe, MailerSend and ipapi."""
+
+    webhook_secret = 'whsec_fake'
+
+    def __init__(self, port=0, config=None, webhook_url=None):
+        self.config = config or UpstreamConfig()
+        self.webhook_url = webhook_url
+        self.sessions = {}
+        self.calls = {}
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), _Handler)
+        self.server.daemon_threads = True
+        self.server.upstream = self
+        self.port = self.server.server_address[1]
+        self.url = f'http://127.0.0.1:{self.port}'
+
+    def count(self, service):
+        with self._lock:
+            self.calls[service] = self.calls.get(service, 0) + 1
+
+    def stats(self):
+        with self._lock:
+            return dict(self.calls)
+
+    def send_webhook(self, session):
+        """Deliver a checkout.session.completed event, signed like Stripe does."""
+        self.config.sleep(self.config.webhook_delay)
+        payload = json.dumps({
+            'id': f'evt_{uuid.uuid4().hex[:24]}', 'object': 'event', 'type': 'checkout.session.completed',
+            'data': {'object': session},
+        }).encode()
+        timestamp = int(time.time())
+        signature = hmac.new(self.webhook_secret.encode(), f'{timestamp}.'.encode() + payload,
+                             hashlib.sha256).hexdigest()
+        req = urllib.request.Request(self.webhook_url, data=payload, method='POST', headers={
+            'Content-Type': 'application/json', 'Stripe-Signature': f't={timestamp},v1={signature}'})
+        try:
+            urllib.request.urlopen(req, timeout=30).read()
+            self.count('stripe_webhook')
+        except OSError:
+            self.count('stripe_webhook_failed')
+
+    def env(self):
+        """Environment variables that point app.py at this server."""
+        return {
+            'ANTHROPIC_API_KEY': 'sk-ant-fake',
+            'ANTHROPIC_BASE_URL': self.url,
+            'STRIPE_SECRET_KEY': 'sk_test_fake',
+            'STRIPE_API_BASE': self.url,
+            'STRIPE_WEBHOOK_SECRET': self.webhook_secret,
+            'MAILERSEND_API_KEY': 'mlsn.fake',
+            'MAILERSEND_API_URL': f'{self.url}/v1/email',
+            'IPAPI_URL': self.url,
+        }
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the fake upstream server.')
+    parser.add_argument('--port', type=int, default=8900)
+    parser.add_argument('--ttft', type=float, default=0.6)
+    parser.add_argument('--time-scale', type=float, default=1.0)
+    args = parser.parse_args()
+    upstream = FakeUpstream(args.port, UpstreamConfig(ttft=args.ttft, time_scale=args.time_scale))
+    print(f'Fake upstream on {upstream.url}')
+    for key, value in upstream.env().items():
+        print(f'  export {key}={value}')
+    try:
+        upstream.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
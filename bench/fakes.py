@@ -0,0 +1,154 @@
+"""
+Fake upstream clients for benchmarks.
+
+FakeAnthropic mimics `anthropic.AsyncAnthropic().messages.create` closely
+enough for app.py: it sleeps for a time-to-first-token plus output tokens
+divided by the model's throughput, then returns JSON shaped like the prompt
+asked for.
+Replies are canned; only their size and timing matter.
+"""
+
+import asyncio
+import json
+import re
+import threading
+from types import SimpleNamespace
+
+# Rough output throughput (tokens/sec) per model family
+DEFAULT_TOKENS_PER_SEC = {'haiku': 150.0, 'sonnet': 60.0}
+
+JOB_HEADING = re.compile(r'^(?:(\d+): )?(.+?) \| (.+?) \| (.*\d{4}.*)$')
+
+
+def estimate_tokens(text):
+    return max(1, len(text) // 4)
+
+
+def _find_jobs(prompt):
+    """Return [(line_no, title, company, dates)] for job headings in a prompt."""
+    jobs = []
+    for i, line in enumerate(prompt.splitlines()):
+        m = JOB_HEADING.match(line.strip())
+        if m and not line.strip().startswith('{'):
+            line_no = int(m.group(1)) if m.group(1) else i + 1
+            jobs.append((line_no, m.group(2), m.group(3), m.group(4)))
+    return jobs
+
+
+def _bullets(title, n=3):
+    return [
+        f'Delivered {title.lower()} objectives across a 12-person team, improving throughput by {15 + i * 5}%'
+        for i in range(n)
+    ]
+
+
+def _profile():
+    return {
+        'title': 'Experienced Operations Professional | 10+ Years',
+        'personal_statement': 'Results-driven professional with a decade of experience leading teams, '
+                              'improving processes and delivering measurable gains in efficiency and '
+                              'customer satisfaction. Known for reliability and clear communication.',
+        'key_skills': ['Stakeholder Management', 'Process Improvement', 'Reporting', 'Team Leadership',
+                       'Customer Service', 'Inventory Control', 'Supplier Negotiation', 'Training'],
+        'certifications': ['First Aid at Work', 'Lean Six Sigma Yellow Belt [Recommended]'],
+        'references': 'Available on request',
+        'ats_score_before': 34,
+        'ats_score_after': 79,
+        'changes_made': ['Rewrote every bullet with achievement language and metrics'] * 5,
+    }
+
+
+def _tips():
+    return {'tips_to_100': [
+        {'tip': f'Add a real metric to your most recent role ({i})',
+         'why': 'Only you know the actual numbers, and recruiters scan for them first.'}
+        for i in range(5)
+    ]}
+
+
+def canned_reply(prompt):
+    """Return a reply string shaped like the JSON the prompt asks for."""
+    if '"one_liner"' in prompt:
+        return json.dumps({
+            'score': 41,
+            'roasts': ['Your bullets describe duties, not achievements.'] * 5,
+            'one_liner': 'This resume is a job description wearing a trench coat.',
+        })
+    if '"start_line"' in prompt:
+        jobs = _find_jobs(prompt)
+        total_lines = len(prompt.splitlines())
+        experience = []
+        for idx, (line_no, title, company, dates) in enumerate(jobs):
+            end = jobs[idx + 1][0] - 1 if idx + 1 < len(jobs) else min(line_no + 6, total_lines)
+            experience.append({'title': title, 'company': company, 'dates': dates,
+                               'start_line': line_no, 'end_line': end})
+        return json.dumps({'name': 'Sarah Thompson', 'location': 'Manchester', 'phone': '07700 900123',
+                           'email': 'sarah.thompson@example.com', 'experience': experience})
+    if 'Job to rewrite' in prompt:
+        jobs = _find_jobs(prompt.split('Job to rewrite', 1)[1])
+        _, title, company, dates = jobs[0] if jobs else (0, 'Job Title', 'Company', '2020 — 2024')
+        return json.dumps({'title': title, 'company': company, 'dates': dates, 'bullets': _bullets(title)})
+    if '"cv"' in prompt:
+        jobs = _find_jobs(prompt.split('CV to rewrite', 1)[-1])
+        profile = _profile()
+        return json.dumps({
+            'cv': {
+                'name': 'Sarah Thompson', 'title': profile['title'], 'location': 'Manchester',
+                'phone': '07700 900123', 'email': 'sarah.thompson@example.com',
+                'personal_statement': profile['personal_statement'], 'key_skills': profile['key_skills'],
+                'certifications': profile['certifications'], 'references': 'Available on request',
+                'experience': [{'title': t, 'company': c, 'dates': d, 'bullets': _bullets(t)}
+                               for _, t, c, d in jobs],
+            },
+            'ats_score_before': profile['ats_score_before'],
+            'ats_score_after': profile['ats_score_after'],
+            'changes_made': profile['changes_made'],
+            **_tips(),
+        })
+    if '"changes_made"' in prompt:
+        return json.dumps(_profile())
+    if '"tips_to_100"' in prompt:
+        return json.dumps(_tips())
+    if '"summary"' in prompt:
+        return json.dumps({'summary': 'A partial fit: the core skills are there but half the stack is missing.',
+                           'tips': ['Name the tools you used in each bullet, not just in a skills list.'] * 3})
+    return 'SKIP'
+
+
+class _FakeMessages:
+    def __init__(self, client):
+        self._client = client
+
+    async def create(self, model, max_tokens, messages, **kwargs):
+        prompt = messages[-1]['content']
+        text = canned_reply(prompt)
+        output_tokens = min(estimate_tokens(text), max_tokens)
+        await asyncio.sleep(self._client.latency(model, output_tokens))
+        with self._client.lock:
+            self._client.calls.append({'model': model, 'output_tokens': output_tokens})
+        return SimpleNamespace(
+            content=[SimpleNamespace(type='text', text=text)],
+            model=model,
+            usage=SimpleNamespace(input_tokens=estimate_tokens(prompt), output_tokens=output_tokens),
+        )
+
+
+class FakeAnthropic:
+    """Drop-in for `anthropic.AsyncAnthropic` with simulated generation latency.
+
+    time_scale shrinks every sleep so a benchmark that simulates minutes of
+    model time finishes in seconds; divide measured times by it to report
+    simulated seconds.
+    """
+
+    def __init__(self, ttft=0.6, tokens_per_sec=None, time_scale=1.0):
+        self.ttft = ttft
+        self.tokens_per_sec = {**DEFAULT_TOKENS_PER_SEC, **(tokens_per_sec or {})}
+        self.time_scale = time_scale
+        self.calls = []
+        self.lock = threading.Lock()
+        self.messages = _FakeMessages(self)
+
+    def latency(self, model, output_tokens):
+        family = 'haiku' if 'haiku' in model else 'sonnet'
+        return (self.ttft + output_tokens / self.tokens_per_sec[family]) * self.time_scale
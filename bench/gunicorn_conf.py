@@ -0,0 +1,32 @@
+"""
+Gunicorn hooks used by bench.load to measure worker saturation.
+
+Each worker keeps a running total of seconds spent handling requests and
+writes it to $BENCH_STATS_DIR/<pid>.busy after every request. bench.load
+diffs the totals around a scenario: busy seconds / (workers * wall time)
+is the fraction of worker capacity in use.
+
+The server's own gunicorn.conf.py is loaded first, so benchmarks run with the
+production settings (preload included).
+"""
+
+import os
+import time
+
+_root_conf = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'gunicorn.conf.py')
+with open(_root_conf) as _f:
+    exec(compile(_f.read(), _root_conf, 'exec'))
+
+_stats_dir = os.environ.get('BENCH_STATS_DIR')
+_busy = {'total': 0.0, 'started': 0.0}
+
+
+def pre_request(worker, req):
+    _busy['started'] = time.perf_counter()
+
+
+def post_request(worker, req, environ, resp):
+    _busy['total'] += time.perf_counter() - _busy['started']
+    if _stats_dir:
+        with open(os.path.join(_stats_dir, f'{os.getpid()}.busy'), 'w') as f:
+            f.write(f"{_busy['total']:.6f}")
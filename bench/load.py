@@ -0,0 +1,275 @@
+"""
+Load-test app.py under its production server command.
+
+    python -m bench.load                                   # all scenarios
+    python -m bench.load --scenarios roast-storm,full-reviews
+    python -m bench.load --out before.json
+    python -m bench.load --baseline before.json            # compare a change
+
+The server is started from the `web:` line of the Procfile (override with
+--cmd) with every upstream pointed at bench.fake_upstream, so no real API is
+called and runs are repeatable. For gunicorn commands the bench hooks in
+bench/gunicorn_conf.py are added to measure worker saturation.
+
+Reports requests/sec, p50/p95/p99 latency, server errors (5xx or no
+response) and rejected requests (4xx), worker saturation and the upstream
+calls each scenario made.
+"""
+
+import argparse
+import glob
+import json
+import os
+import random
+import re
+import shlex
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+from bench.corpus import make_pdf, make_resume
+from bench.fake_upstream import FakeUpstream, UpstreamConfig
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LANDING_PATHS = ['/', '/blog', '/free-resume-checker', '/resume-checker-for/nurse',
+                 '/cvroast-vs-jobscan', '/blog/what-is-ats-score', '/feed.xml', '/api/social-proof']
+
+
+def _random_ip(rng):
+    # Distinct IPs keep the free-roast rate limit out of the measurement
+    return '.'.join(str(rng.randint(1, 254)) for _ in range(4))
+
+
+# --- Scenarios ---
+# Each scenario returns a list of request specs: (method, path, requests kwargs)
+
+def landing_burst(n, base_url, rng):
+    return [('GET', rng.choice(LANDING_PATHS), {}) for _ in range(n)]
+
+
+def roast_storm(n, base_url, rng):
+    return [('POST', '/api/roast', {
+        'json': {'resume': make_resume(rng.randint(1, 6), seed=i)},
+        'headers': {'X-Forwarded-For': _random_ip(rng)},
+    }) for i in range(n)]
+
+
+def large_pdf_upload(n, base_url, rng):
+    pdf = make_pdf(make_resume(8), pages=1200)  # ~3.4MB, under the 5MB upload cap
+    return [('POST', '/api/upload', {'files': {'file': ('resume.pdf', pdf, 'application/pdf')}})
+            for _ in range(n)]
+
+
+def full_reviews(n, base_url, rng):
+    # Checkout is setup, not part of the measurement
+    specs = []
+    for i in range(n):
+        resume = make_resume(rng.randint(2, 8), seed=i)
+        resp = requests.post(base_url + '/api/checkout', json={'resume': resume, 'currency': 'gbp'}, timeout=60)
+        query = parse_qs(urlparse(resp.json()['url']).query)
+        specs.append(('POST', '/api/full-review', {'json': {
+            'session_id': query['session_id'][0], 'resume_id': query['rid'][0], 'resume': resume,
+        }}))
+    return specs
+
+
+def review_reloads(n, base_url, rng):
+    # Each paid session is requested four times in a row, as if /success were reloaded while it loads
+    specs = full_reviews(max(1, n // 4), base_url, rng)
+    return [spec for spec in specs for _ in range(4)][:n]
+
+
+SCENARIOS = {
+    # name: (builder, default requests, default concurrency)
+    'landing-burst': (landing_burst, 1000, 50),
+    'roast-storm': (roast_storm, 60, 20),
+    'large-pdf-upload': (large_pdf_upload, 30, 8),
+    'full-reviews': (full_reviews, 8, 8),
+    'review-reloads': (review_reloads, 32, 8),
+}
+
+
+# --- Server ---
+
+def procfile_command():
+    with open(os.path.join(ROOT, 'Procfile')) as f:
+        for line in f:
+            if line.startswith('web:'):
+                return line.split(':', 1)[1].strip()
+    raise SystemExit('No web: line in Procfile')
+
+
+def worker_count(cmd):
+    m = re.search(r'(?:--workers[ =]|-w ?)(\d+)', cmd)
+    return int(m.group(1)) if m else 1
+
+
+def start_server(cmd, port, env):
+    cmd = cmd.replace('$PORT', str(port)).replace('${PORT}', str(port))
+    args = shlex.split(cmd)
+    if os.path.basename(args[0]) == 'gunicorn':
+        args[1:1] = ['-c', os.path.join(ROOT, 'bench', 'gunicorn_conf.py')]
+    proc = subprocess.Popen(args, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f'Server exited during startup:\n{proc.stderr.read().decode()}')
+        try:
+            if requests.get(f'http://127.0.0.1:{port}/health', timeout=1).ok:
+                return proc
+        except requests.RequestException:
+            time.sleep(0.2)
+    proc.terminate()
+    raise SystemExit('Server did not become healthy within 60s')
+
+
+def busy_seconds(stats_dir):
+    total = 0.0
+    for path in glob.glob(os.path.join(stats_dir, '*.busy')):
+        try:
+            with open(path) as f:
+                total += float(f.read() or 0)
+        except (OSError, ValueError):
+            pass
+    return total
+
+
+# --- Measurement ---
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+
+def run_scenario(base_url, specs, concurrency):
+    local = threading.local()
+
+    def send(spec):
+        method, path, kwargs = spec
+        if not hasattr(local, 'session'):
+            local.session = requests.Session()
+        start = time.perf_counter()
+        try:
+            status = local.session.request(method, base_url + path, timeout=300, **kwargs).status_code
+        except requests.RequestException:
+            status = None
+        return time.perf_counter() - start, status
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(send, specs))
+    wall = time.perf_counter() - start
+    latencies = sorted(r[0] for r in results)
+    return {
+        'requests': len(results),
+        'errors': sum(1 for r in results if r[1] is None or r[1] >= 500),
+        'rejected': sum(1 for r in results if r[1] is not None and 400 <= r[1] < 500),
+        'wall_s': round(wall, 3),
+        'rps': round(len(results) / wall, 2) if wall else 0.0,
+        'mean_ms': round(statistics.mean(latencies) * 1000, 1) if latencies else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 1),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 1),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 1),
+    }
+
+
+def print_report(results, baseline=None):
+    header = f"{'scenario':<18} {'reqs':>5} {'err':>4} {'4xx':>4} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'sat':>5}"
+    print(header)
+    print('-' * len(header))
+    for name, r in results.items():
+        sat = f"{r['saturation']:.0%}" if r.get('saturation') is not None else 'n/a'
+        print(f"{name:<18} {r['requests']:>5} {r['errors']:>4} {r.get('rejected', 0):>4} {r['rps']:>8.2f} "
+              f"{r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f} {sat:>5}")
+        if baseline and name in baseline:
+            b = baseline[name]
+            rps_delta = (r['rps'] / b['rps'] - 1) * 100 if b['rps'] else 0
+            p95_delta = (r['p95_ms'] / b['p95_ms'] - 1) * 100 if b['p95_ms'] else 0
+            print(f"{'  vs baseline':<18} {'':>5} {'':>4} {'':>4} {rps_delta:>+7.1f}% {'':>8} {p95_delta:>+7.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load-test app.py against fake upstreams.')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='comma-separated scenario names')
+    parser.add_argument('--requests', type=int, help='override requests per scenario')
+    parser.add_argument('--concurrency', type=int, help='override client concurrency')
+    parser.add_argument('--cmd', help='server command (default: Procfile web line)')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--url', help='test an already running server instead of starting one')
+    parser.add_argument('--time-scale', type=float, default=1.0, help='multiply all fake upstream latencies')
+    parser.add_argument('--ttft', type=float, default=0.6, help='fake Anthropic time to first token (s)')
+    parser.add_argument('--sonnet-tps', type=float, default=60.0, help='fake Sonnet output tokens/sec')
+    parser.add_argument('--haiku-tps', type=float, default=150.0, help='fake Haiku output tokens/sec')
+    parser.add_argument('--webhooks', action='store_true',
+                        help='have the fake Stripe send checkout.session.completed webhooks')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', help='write results as JSON')
+    parser.add_argument('--baseline', help='compare against a previous --out file')
+    args = parser.parse_args()
+
+    names = [n.strip() for n in args.scenarios.split(',') if n.strip()]
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        raise SystemExit(f"Unknown scenario(s): {', '.join(unknown)}. Choose from {', '.join(SCENARIOS)}")
+
+    config = UpstreamConfig(ttft=args.ttft, time_scale=args.time_scale,
+                            tokens_per_sec={'sonnet': args.sonnet_tps, 'haiku': args.haiku_tps})
+    upstream = FakeUpstream(config=config).start()
+    stats_dir = tempfile.mkdtemp(prefix='cvroast-bench-')
+    cmd = args.cmd or procfile_command()
+    proc = None
+    if args.url:
+        base_url, workers = args.url.rstrip('/'), None
+    else:
+        env = {**os.environ, **upstream.env(), 'BENCH_STATS_DIR': stats_dir, 'PYTHONPATH': ROOT,
+               'PAYMENTS_DB': os.path.join(stats_dir, 'payments.db')}
+        proc = start_server(cmd, args.port, env)
+        base_url, workers = f'http://127.0.0.1:{args.port}', worker_count(cmd)
+        print(f'Server: {cmd} ({workers} worker(s))')
+    if args.webhooks:
+        upstream.webhook_url = base_url + '/stripe/webhook'
+    print(f'Upstream: {upstream.url} (latency x{args.time_scale})\n')
+
+    rng = random.Random(args.seed)
+    results = {}
+    try:
+        for name in names:
+            builder, n, concurrency = SCENARIOS[name]
+            specs = builder(args.requests or n, base_url, rng)
+            calls_before, busy_before = upstream.stats(), busy_seconds(stats_dir)
+            result = run_scenario(base_url, specs, args.concurrency or concurrency)
+            busy = busy_seconds(stats_dir) - busy_before
+            result['saturation'] = round(min(busy / (workers * result['wall_s']), 1.0), 3) if workers and busy else None
+            result['upstream_calls'] = {k: v - calls_before.get(k, 0) for k, v in upstream.stats().items()
+                                        if v - calls_before.get(k, 0)}
+            results[name] = result
+    finally:
+        if proc:
+            proc.terminate()
+            proc.wait(timeout=30)
+        upstream.stop()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+    print_report(results, baseline)
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump({'command': cmd, 'time_scale': args.time_scale, 'argv': sys.argv[1:],
+                       'results': results}, f, indent=2)
+        print(f'\nWrote {args.out}')
+
+
+if __name__ == '__main__':
+    main()
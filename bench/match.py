@@ -0,0 +1,84 @@
+"""
+Time /api/match's local keyword scoring on growing inputs.
+
+    python -m bench.match
+    python -m bench.match --sizes 2,16,128,1024 --repeat 20
+
+Builds app.job_keywords' index from the role pages (timed), then scores
+synthetic resumes against job descriptions made from role keywords plus
+filler, from a couple of KB up to a few MB each. The endpoint caps inputs
+at 15K/20K characters; the larger sizes show the scan stays linear.
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+import app
+from bench.corpus import make_resume
+from jobmatch import KeywordIndex
+
+FILLER = ('You will work closely with stakeholders across the business to deliver results. '
+          'We offer flexible working, a pension scheme and 25 days holiday. ')
+
+
+def role_keywords():
+    return [k.strip() for page in app.ROLE_PAGES.values() for k in page['keywords'].split(',')]
+
+
+def make_job_description(chars, seed=0):
+    rng = random.Random(seed)
+    keywords = role_keywords()
+    parts, size = ['Senior role. Requirements:'], 0
+    while size < chars:
+        part = f"Experience with {rng.choice(keywords)} and {rng.choice(keywords)}. {FILLER}"
+        parts.append(part)
+        size += len(part) + 1
+    return ' '.join(parts)[:chars]
+
+
+def make_large_resume(chars, seed=0):
+    # Corpus resumes plus a skills line per job, so about half the role keywords turn up
+    rng = random.Random(seed)
+    keywords = role_keywords()
+    parts, size, job = [], 0, 0
+    while size < chars:
+        part = make_resume(1, bullets_per_job=6, seed=seed + job)
+        part += '\nSkills: ' + ', '.join(rng.sample(keywords, 8)) + '\n'
+        parts.append(part)
+        size += len(part)
+        job += 1
+    return ''.join(parts)[:chars]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the /api/match keyword index.')
+    parser.add_argument('--sizes', default='2,16,128,1024,4096', help='input sizes in KB, comma-separated')
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    builds = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        index = KeywordIndex.from_roles(app.ROLE_PAGES)
+        builds.append((time.perf_counter() - start) * 1000)
+    print(f'index: {len(index)} terms, max phrase {index.max_len} words, '
+          f'built in {statistics.median(builds):.2f} ms\n')
+
+    print(f"{'size':>8} {'job terms':>10} {'score':>6} {'p50 ms':>9} {'max ms':>9} {'MB/s':>8}")
+    for kb in (int(s) for s in args.sizes.split(',') if s.strip()):
+        resume = make_large_resume(kb * 1024, seed=kb)
+        job = make_job_description(kb * 1024, seed=kb)
+        times = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            result = index.match(resume, job)
+            times.append((time.perf_counter() - start) * 1000)
+        p50 = statistics.median(times)
+        mb_per_s = (len(resume) + len(job)) / 1e6 / (p50 / 1000)
+        print(f"{kb:>6}KB {result['terms']:>10} {result['score']!s:>6} {p50:>9.2f} {max(times):>9.2f} {mb_per_s:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""
+Compare the tiered model router with the fixed models it replaced.
+
+    python -m bench.model_router
+    python -m bench.model_router --invalid 0.2 --resumes 40 --scale 0.02
+
+Sends a corpus of resumes (1 to 8 jobs, with a share in French) through
+/api/roast and the full-review rewrite three times: with every roast on
+Haiku and every rewrite on Sonnet, as app.py hard-coded them; with
+modelrouter's default routes; and with the opt-in HAIKU_REWRITES routes. The model is bench.fakes.FakeAnthropic,
+made to return a broken reply (cut off mid-JSON, or missing fields) for a
+share --invalid of Haiku calls. Reports, per task and tier, the calls,
+escalations, median simulated latency and estimated spend, and how many
+roasts fell back to the canned "confused AI" reply.
+"""
+
+import argparse
+import random
+import statistics
+import time
+from collections import defaultdict
+
+import aio
+import app
+from bench.corpus import make_resume
+from bench.fakes import FakeAnthropic
+from modelrouter import ModelRouter, HAIKU_REWRITES
+
+FIXED = {'tasks': {'roast': {'tiers': ['haiku']}, 'commentary': {'tiers': ['haiku']},
+                   'split': {'tiers': ['haiku']}, 'rewrite': {'tiers': ['sonnet'], 'rules': []}}}
+
+FRENCH = """Marie Dupont
+Lyon | 06 12 34 56 78 | marie.dupont@example.fr
+
+PROFIL
+Professionnelle fiable et organisée, à la recherche d'un nouveau défi dans la logistique.
+
+EXPÉRIENCE
+{jobs}
+FORMATION
+Licence de gestion, Université Lyon 2, 2009
+"""
+FRENCH_JOB = """Responsable des opérations | Carrefour, Lyon | {start} — {end}
+- Gestion d'une équipe de douze personnes et suivi des indicateurs de performance
+- Mise en place d'un nouveau système de gestion des stocks avec le service informatique
+- Négociation des prix avec les fournisseurs et préparation des rapports mensuels
+"""
+
+
+class FlakyAnthropic(FakeAnthropic):
+    """FakeAnthropic whose Haiku replies are broken for a share `invalid` of calls."""
+
+    def __init__(self, invalid, seed=0, **kwargs):
+        super().__init__(**kwargs)
+        self.invalid = invalid
+        self.rng = random.Random(seed)
+        create = self.messages.create
+
+        async def flaky_create(model, max_tokens, messages, **kw):
+            response = await create(model, max_tokens, messages, **kw)
+            if 'haiku' in model and self.rng.random() < self.invalid:
+                text = response.content[0].text
+                # Half cut off by max_tokens, half valid JSON without the fields asked for
+                response.content[0].text = text[:len(text) // 2] if self.rng.random() < 0.5 else '{"note": "ok"}'
+            return response
+        self.messages.create = flaky_create
+
+
+def make_corpus(count, french_share, seed=0):
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(count):
+        n_jobs = rng.randint(1, 8)
+        if rng.random() < french_share:
+            jobs = ''.join(FRENCH_JOB.format(start=2024 - 3 * (j + 1), end=2024 - 3 * j) for j in range(n_jobs))
+            corpus.append(FRENCH.format(jobs=jobs))
+        else:
+            corpus.append(make_resume(n_jobs, seed=i))
+    return corpus
+
+
+def run(config, corpus, args):
+    calls = []
+    app.models = ModelRouter(config, observe=lambda *call: calls.append(call))
+    app.ai = FlakyAnthropic(args.invalid, time_scale=args.scale)
+    client = app.app.test_client()
+    fallbacks = 0
+    roast_times, rewrite_times = [], []
+    for i, resume_text in enumerate(corpus):
+        start = time.perf_counter()
+        reply = client.post('/api/roast', json={'resume': resume_text},
+                            headers={'X-Forwarded-For': f'10.0.{i // 250}.{i % 250}'}).get_json()
+        roast_times.append((time.perf_counter() - start) / args.scale)
+        fallbacks += reply.get('resume_id') is None
+        start = time.perf_counter()
+        try:
+            aio.run_sync(app._rewrite_cv(resume_text))
+        except ValueError:
+            pass        # counted as 'invalid' by the router
+        rewrite_times.append((time.perf_counter() - start) / args.scale)
+    return calls, fallbacks, roast_times, rewrite_times
+
+
+def report(name, corpus, calls, fallbacks, roast_times, rewrite_times):
+    by_tier = defaultdict(list)
+    for task, tier, seconds, cost, outcome in calls:
+        by_tier[task, tier].append((seconds, cost, outcome))
+    print(f'\n{name}')
+    print(f"  {'task':<9} {'tier':<7} {'calls':>6} {'escalated':>10} {'invalid':>8} {'p50 s':>7} {'spend $':>9}")
+    for (task, tier), rows in sorted(by_tier.items()):
+        escalated = sum(outcome == 'escalated' for _, _, outcome in rows)
+        invalid = sum(outcome == 'invalid' for _, _, outcome in rows)
+        p50 = statistics.median(seconds for seconds, _, _ in rows) / app.ai.time_scale
+        print(f'  {task:<9} {tier:<7} {len(rows):>6} {escalated:>10} {invalid:>8} {p50:>7.2f} '
+              f'{sum(cost for _, cost, _ in rows):>9.4f}')
+    spend = sum(call[3] for call in calls)
+    escalations = sum(call[4] == 'escalated' for call in calls)
+    print(f'  total spend ${spend:.4f} (${spend / len(corpus):.4f} per resume), '
+          f'{escalations / len(calls):.1%} of calls escalated, {fallbacks} canned roast fallbacks')
+    print(f'  median simulated latency: roast {statistics.median(roast_times):.2f}s, '
+          f'rewrite {statistics.median(rewrite_times):.2f}s')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--resumes', type=int, default=40)
+    parser.add_argument('--french', type=float, default=0.2, help='share of resumes in French')
+    parser.add_argument('--invalid', type=float, default=0.1, help='share of Haiku replies that are broken')
+    parser.add_argument('--scale', type=float, default=0.02, help='fake latency time scale')
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.resumes, args.french)
+    router = ModelRouter(HAIKU_REWRITES)
+    routed = sum(1 for text in corpus if router.plan('rewrite', ModelRouter.signals(text))[0] == 'haiku')
+    print(f'{len(corpus)} resumes, {routed} routed to Haiku for the rewrite by HAIKU_REWRITES; '
+          f'{args.invalid:.0%} of Haiku replies broken')
+    report('fixed models (before)', corpus, *run(FIXED, corpus, args))
+    report('tiered router', corpus, *run({}, corpus, args))
+    report('tiered router, HAIKU_REWRITES', corpus, *run(HAIKU_REWRITES, corpus, args))
+
+
+if __name__ == '__main__':
+    main()
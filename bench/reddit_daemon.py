@@ -0,0 +1,126 @@
+"""
+Compare reddit_monitor's daemon mode with the 30-minute cron, in simulated time.
+
+    python -m bench.reddit_daemon
+    python -m bench.reddit_daemon --hours 8 --posts-per-hour 120 --scale 480
+
+Two identical bench.fake_reddit worlds receive the same stream of new posts
+(--posts-per-hour, each in a random subreddit). One is watched by
+reddit_monitor.run() every 30 simulated minutes, the other by a
+StreamMonitor polling every minute. Time runs --scale times faster than
+real time: the poll interval, cron interval, reply pacing and Reddit and
+model latencies are all divided by it.
+
+Reports, per mode, Reddit requests and model tokens per simulated hour,
+replies, and how long after a post was published its reply went up. Then
+the daemon is restarted on the same state store, to show its first poll
+only fetches the posts published while it was down.
+"""
+
+import argparse
+import contextlib
+import io
+import statistics
+import tempfile
+import threading
+import time
+
+import reddit_monitor
+from bench.fake_reddit import FakeSyncAnthropic, RedditWorld
+from redditstore import SeenPosts
+
+USERNAME = 'cvroast_helper'
+
+
+def scale_monitor(scale):
+    reddit_monitor.STREAM_POLL_SECONDS = 60 / scale
+    reddit_monitor.REPLIES_PER_HOUR *= scale
+    reddit_monitor.REPLY_INTERVAL_SECONDS /= scale
+    reddit_monitor.OWN_COMMENTS_SYNC_SECONDS /= scale
+    reddit_monitor.REQUESTS_PER_MINUTE *= scale
+
+
+def make_world(args):
+    return RedditWorld(reddit_monitor.SUBREDDITS, posts_per_sub=args.posts, username=USERNAME,
+                       latency=0.15 / args.scale, help_share=args.help_share, seed=args.seed)
+
+
+def latencies(world, scale):
+    """Minutes of simulated time from publishing a post to our reply on it."""
+    return [(comment.created_utc - world.published[comment.link_id[3:]]) * scale / 60
+            for comment in world.own_comments if comment.link_id[3:] in world.published]
+
+
+def report(name, world, ai, hours, scale):
+    waits = latencies(world, scale)
+    replies = len(world.own_comments)
+    tokens = ai.tokens()
+    per_reply = f'{tokens / replies:.0f}' if replies else '-'
+    wait = f'{statistics.median(waits):.1f} / {max(waits):.1f}' if waits else '-'
+    print(f'{name:<8} {world.requests / hours:>12.1f} {len(ai.calls):>9} {tokens / hours:>12.0f} {replies:>8} '
+          f'{per_reply:>10} {wait:>15}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark reddit_monitor daemon mode against cron runs.')
+    parser.add_argument('--hours', type=float, default=4, help='simulated hours')
+    parser.add_argument('--scale', type=float, default=240, help='simulated seconds per real second')
+    parser.add_argument('--posts', type=int, default=20, help='posts per subreddit before the start')
+    parser.add_argument('--posts-per-hour', type=float, default=60)
+    parser.add_argument('--help-share', type=float, default=0.08, help='share of posts asking for resume help')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    scale_monitor(args.scale)
+    cron_world, daemon_world = make_world(args), make_world(args)
+    cron_ai, daemon_ai = (FakeSyncAnthropic(time_scale=1 / args.scale) for _ in range(2))
+    data_dir = tempfile.mkdtemp(prefix='cvroast-reddit-daemon-')
+    cron_store = SeenPosts(f'{data_dir}/cron.db')
+    daemon_store = SeenPosts(f'{data_dir}/daemon.db')
+    stop = threading.Event()
+    duration = args.hours * 3600 / args.scale
+
+    def publish():
+        interval = 3600 / args.posts_per_hour / args.scale
+        while not stop.wait(interval):
+            now = time.time()
+            cron_world.publish(1, now)
+            daemon_world.publish(1, now)
+
+    def cron():
+        while not stop.is_set():
+            reddit_monitor.run(cron_world.client, cron_ai, cron_store, USERNAME, dry_run=False)
+            stop.wait(1800 / args.scale)
+
+    monitor = reddit_monitor.StreamMonitor(daemon_world.client(), daemon_ai, daemon_store, USERNAME, dry_run=False)
+    threads = [threading.Thread(target=target) for target in (publish, cron)]
+    threads.append(threading.Thread(target=monitor.run_forever, args=(stop,)))
+    with contextlib.redirect_stdout(io.StringIO()):
+        for thread in threads:
+            thread.start()
+        time.sleep(duration)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+    print(f'{args.hours:g} simulated hours, {args.posts_per_hour:g} new posts/hour\n')
+    print(f"{'mode':<8} {'requests/h':>12} {'AI calls':>9} {'AI tokens/h':>12} {'replies':>8} {'tok/reply':>10} "
+          f"{'wait p50/max m':>15}")
+    report('cron', cron_world, cron_ai, args.hours, args.scale)
+    report('daemon', daemon_world, daemon_ai, args.hours, args.scale)
+
+    # Restart: a new monitor on the same store, after more posts came in while it was down
+    down = 10
+    daemon_world.publish(down)
+    requests = daemon_world.requests
+    restarted = reddit_monitor.StreamMonitor(daemon_world.client(), daemon_ai, daemon_store, USERNAME,
+                                             dry_run=False)
+    restarted.restore()
+    restored = len(restarted.queued)
+    fetched = restarted.poll()
+    print(f'\nrestart: {restored} queued candidates restored, first poll fetched {fetched} posts '
+          f'({down} published while down) in {daemon_world.requests - requests} requests')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""
+Micro-benchmark reddit_monitor's keyword matching and candidate ranking.
+
+    python -m bench.reddit_keywords
+    python -m bench.reddit_keywords --posts 5000 --repeat 5
+    python -m bench.reddit_keywords --posts-file posts.jsonl   # {"title", "selftext", "created_utc"} per line
+    python -m bench.reddit_keywords --extra-keywords 200       # how each matcher scales with the keyword list
+
+Times, per post, the ways of matching reddit_monitor.KEYWORDS against a
+post's title and body:
+
+- substring: `any(kw in text for kw in KEYWORDS)`, the old yes/no check;
+- substring, weighted: the same scan without the early exit, to score;
+- alternation: one regex of all keywords, `\\b(?:kw1|kw2|...)\\b`;
+- trie regex: reddit_monitor.keyword_relevance, the alternation factored
+  into a trie.
+
+Then the time to rank every matching post by relevance and freshness, and
+the posts the substring check accepts but the word-boundary match does not.
+Without --posts-file, posts are generated: Reddit-length bodies of career
+chatter, a fifth of them with keywords, some with near misses ('resumes
+helped', 'cv helpful').
+"""
+
+import argparse
+import json
+import random
+import re
+import statistics
+import time
+
+import reddit_monitor
+from bench.corpus import DUTIES
+from bench.fake_reddit import HELP_TITLES, OFF_TOPIC_TITLES, OTHER_TITLES
+
+CHATTER = ('I applied to forty jobs this month and heard back from two. My manager says the market is slow '
+           'but my friends in tech are getting offers. Should I take a contract role or wait for something '
+           'permanent? The recruiter never called me back after the second interview. ').split()
+NEAR_MISSES = ['my resumes helped me before', 'the cv helpful tips thread', 'no callbacksies lol',
+               'ats scores are a myth', 'a resume reviewer told me', 'precv review']
+
+
+def make_posts(n, seed=0):
+    rng = random.Random(seed)
+    words = CHATTER + ' '.join(DUTIES).split()
+    keywords = list(reddit_monitor.KEYWORDS)
+    now = time.time()
+    posts = []
+    for _ in range(n):
+        body = ' '.join(rng.choice(words) for _ in range(rng.randint(20, 500)))
+        kind = rng.random()
+        if kind < 0.2:
+            body += f' {rng.choice(keywords)}. ' + ' '.join(rng.choice(words) for _ in range(30))
+        elif kind < 0.3:
+            body += f' {rng.choice(NEAR_MISSES)}.'
+        title = rng.choice(HELP_TITLES if kind < 0.2 else OFF_TOPIC_TITLES + OTHER_TITLES)
+        posts.append({'title': title, 'selftext': body, 'created_utc': now - rng.uniform(0, 12) * 3600})
+    return posts
+
+
+def load_posts(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def substring_any(title, selftext):
+    text = (title + ' ' + selftext).lower()
+    return any(kw in text for kw in reddit_monitor.KEYWORDS)
+
+
+def substring_weighted(title, selftext):
+    text = (title + ' ' + selftext).lower()
+    return sum(weight for kw, weight in reddit_monitor.KEYWORDS.items() if kw in text)
+
+
+def alternation_pattern(keywords):
+    return re.compile(r'\b(?:' + '|'.join(re.escape(kw) for kw in keywords) + r')\b')
+
+
+ALTERNATION = alternation_pattern(reddit_monitor.KEYWORDS)
+
+
+def alternation(title, selftext):
+    return ALTERNATION.findall((title + ' ' + selftext).lower())
+
+
+def add_keywords(n, seed=0):
+    """Grow reddit_monitor's keyword list with n made-up phrases of weight 1."""
+    global ALTERNATION
+    rng = random.Random(seed)
+    heads = ['resume', 'cv', 'cover letter', 'linkedin', 'portfolio', 'career', 'job', 'interview']
+    tails = ['check', 'format', 'gap', 'length', 'photo', 'summary', 'wording', 'layout', 'font', 'tailoring']
+    for i in range(n):
+        reddit_monitor.KEYWORDS[f'{rng.choice(heads)} {rng.choice(tails)} {i}'] = 1
+    reddit_monitor.KEYWORD_PATTERN = reddit_monitor.keyword_pattern(reddit_monitor.KEYWORDS)
+    ALTERNATION = alternation_pattern(reddit_monitor.KEYWORDS)
+
+
+def time_per_post(fn, posts, repeat):
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for post in posts:
+            fn(post['title'], post['selftext'])
+        runs.append((time.perf_counter() - start) / len(posts) * 1e6)
+    return statistics.median(runs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark reddit_monitor keyword matching and ranking.')
+    parser.add_argument('--posts', type=int, default=5000, help='posts to generate')
+    parser.add_argument('--posts-file', help='JSON lines of recorded posts instead of generated ones')
+    parser.add_argument('--extra-keywords', type=int, default=0, help='made-up keywords added to the list')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if args.extra_keywords:
+        add_keywords(args.extra_keywords, args.seed)
+    posts = load_posts(args.posts_file) if args.posts_file else make_posts(args.posts, args.seed)
+    chars = statistics.mean(len(p['title']) + len(p['selftext']) for p in posts)
+    print(f'{len(posts)} posts, {chars:.0f} characters on average, {len(reddit_monitor.KEYWORDS)} keywords\n')
+
+    print(f"{'matcher':<22} {'us/post':>8}")
+    for name, fn in (('substring (yes/no)', substring_any), ('substring, weighted', substring_weighted),
+                     ('alternation', alternation), ('trie regex', reddit_monitor.keyword_relevance)):
+        print(f'{name:<22} {time_per_post(fn, posts, args.repeat):>8.1f}')
+
+    now = time.time()
+    runs = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        ranked = []
+        for post in posts:
+            relevance = reddit_monitor.keyword_relevance(post['title'], post['selftext'])
+            if relevance:
+                ranked.append((reddit_monitor.candidate_rank(relevance, post['created_utc'], now), post))
+        ranked.sort(key=lambda item: -item[0])
+        runs.append((time.perf_counter() - start) * 1000)
+    print(f'\nmatch and rank all posts: {statistics.median(runs):.1f} ms, {len(ranked)} candidates')
+
+    rejected = [p for p in posts if substring_any(p['title'], p['selftext'])
+                and not reddit_monitor.matches_keywords(p['title'], p['selftext'])]
+    print(f'substring matches rejected at word boundaries: {len(rejected)}')
+    for post in rejected[:3]:
+        text = (post['title'] + ' ' + post['selftext']).lower()
+        kw = next(kw for kw in reddit_monitor.KEYWORDS if kw in text)
+        i = text.index(kw)
+        print(f'  ...{text[max(0, i - 20):i + len(kw) + 20]}...')
+
+
+if __name__ == '__main__':
+    main()
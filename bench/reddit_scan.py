@@ -0,0 +1,123 @@
+"""
+Compare reddit_monitor runs against a fake Reddit, before and after a change.
+
+    python -m bench.reddit_scan
+    python -m bench.reddit_scan --baseline HEAD~1 --runs 4 --new-posts 5
+    python -m bench.reddit_scan --runs 7 --new-posts 0   # until the backlog is drained
+
+Runs the current reddit_monitor and the one at --baseline (a git revision,
+loaded with `git show`) against identical bench.fake_reddit worlds: a first
+run over full listings, then --runs - 1 further runs with --new-posts new
+posts per subreddit published before each, as between two cron runs. Both
+post live replies to the fake (the 30s pause between replies is skipped).
+
+Reports, per run, the Reddit requests made, model calls and tokens, and
+wall time, with Reddit latency and model latency simulated; then, over all
+runs, the model tokens spent per reply actually posted.
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import subprocess
+import tempfile
+import time
+import types
+
+import reddit_monitor
+from bench.fake_reddit import FakeSyncAnthropic, RedditWorld
+from bench.load import ROOT
+from redditstore import SeenPosts
+
+USERNAME = 'cvroast_helper'
+
+
+def load_baseline(rev):
+    source = subprocess.run(['git', 'show', f'{rev}:reddit_monitor.py'], cwd=ROOT, capture_output=True,
+                            text=True, check=True).stdout
+    module = types.ModuleType('reddit_monitor_baseline')
+    module.__file__ = os.path.join(ROOT, 'reddit_monitor.py')
+    exec(compile(source, module.__file__, 'exec'), module.__dict__)
+    return module
+
+
+def baseline_runner(rev):
+    module = load_baseline(rev)
+    # No pause between replies; everything else as written
+    if hasattr(module, 'REPLY_INTERVAL_SECONDS'):
+        module.REPLY_INTERVAL_SECONDS = 0
+    else:
+        module.time = types.SimpleNamespace(time=time.time, sleep=lambda seconds: None,
+                                            strftime=time.strftime, gmtime=time.gmtime)
+    module.DRY_RUN = False
+    os.environ.setdefault('REDDIT_USERNAME', USERNAME)
+
+    def run(world, ai, data_dir):
+        module.get_reddit = world.client
+        module.get_ai = lambda: ai
+        if hasattr(module, 'run'):
+            return module.run(world.client, ai, SeenPosts(os.path.join(data_dir, 'state.db')), USERNAME,
+                              dry_run=False)
+        module.main()
+    return run
+
+
+def current_runner():
+    reddit_monitor.REPLY_INTERVAL_SECONDS = 0
+
+    def run(world, ai, data_dir):
+        return reddit_monitor.run(world.client, ai, SeenPosts(os.path.join(data_dir, 'state.db')), USERNAME,
+                                  dry_run=False)
+    return run
+
+
+def measure(runner, args):
+    world = RedditWorld(reddit_monitor.SUBREDDITS, posts_per_sub=args.posts, username=USERNAME,
+                        latency=args.latency, help_share=args.help_share, seed=args.seed)
+    ai = FakeSyncAnthropic(time_scale=args.ai_scale)
+    data_dir = tempfile.mkdtemp(prefix='cvroast-reddit-')
+    rows = []
+    for n in range(args.runs):
+        if n:
+            world.add_posts(args.new_posts)
+        requests, calls, tokens = world.requests, len(ai.calls), ai.tokens()
+        replies = len(world.own_comments)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            runner(world, ai, data_dir)
+        rows.append({'requests': world.requests - requests, 'ai_calls': len(ai.calls) - calls,
+                     'ai_tokens': ai.tokens() - tokens, 'replies': len(world.own_comments) - replies,
+                     'seconds': time.perf_counter() - start})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark reddit_monitor against a fake Reddit.')
+    parser.add_argument('--baseline', default='HEAD', help='git revision of the reddit_monitor.py to compare')
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--posts', type=int, default=20, help='posts per subreddit before the first run')
+    parser.add_argument('--new-posts', type=int, default=5, help='new posts per subreddit before each later run')
+    parser.add_argument('--latency', type=float, default=0.15, help='seconds per Reddit request')
+    parser.add_argument('--help-share', type=float, default=0.08, help='share of posts asking for resume help')
+    parser.add_argument('--ai-scale', type=float, default=1.0, help='multiplier on simulated model latency')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    results = {f'baseline ({args.baseline})': measure(baseline_runner(args.baseline), args),
+               'current': measure(current_runner(), args)}
+
+    print(f"{'':<18} {'run':>4} {'requests':>9} {'AI calls':>9} {'AI tokens':>10} {'replies':>8} {'seconds':>8}")
+    for name, rows in results.items():
+        for n, row in enumerate(rows, 1):
+            print(f"{name if n == 1 else '':<18} {n:>4} {row['requests']:>9} {row['ai_calls']:>9} "
+                  f"{row['ai_tokens']:>10} {row['replies']:>8} {row['seconds']:>8.2f}")
+    print()
+    for name, rows in results.items():
+        tokens, replies = sum(r['ai_tokens'] for r in rows), sum(r['replies'] for r in rows)
+        per_reply = f'{tokens / replies:.0f}' if replies else '-'
+        print(f"{name:<18} {tokens} tokens for {replies} replies: {per_reply} per reply")
+
+
+if __name__ == '__main__':
+    main()
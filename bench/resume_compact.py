@@ -0,0 +1,91 @@
+"""
+Measure resume clean-up and compaction against the old character cuts.
+
+    python -m bench.resume_compact
+    python -m bench.resume_compact --jobs 2,6,12,24 --bullets 6 --repeat 20
+
+Builds resumes of --jobs experience entries with bench.corpus and dirties
+them the way PDF extraction does: a header and page number on every page,
+words hyphenated across line breaks, bullets wrapped onto a second line,
+bullet glyphs and a two-column skills sidebar. For each, reports the
+estimated input tokens raw, after resumetext.clean() and after compact()
+with the roast and rewrite budgets, against the old prompts
+(resume_text[:5000] for the roast, the whole text up to 15,000 characters
+for the rewrite). Also reports how many of the jobs' title lines each
+prompt still contains, and the time compact() takes.
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+import app
+import resumetext
+from bench.corpus import make_resume
+
+LINES_PER_PAGE = 45
+
+
+def dirty(resume_text, seed=0):
+    """`resume_text` as pypdf might extract it from a designed two-page PDF."""
+    rng = random.Random(seed)
+    lines = []
+    for line in resume_text.splitlines():
+        if line.startswith('- '):
+            line = '• ' + line[2:]
+            words = line.split()
+            if len(words) > 8 and rng.random() < 0.5:
+                cut = rng.randint(4, len(words) - 3)
+                head, tail = ' '.join(words[:cut]), ' '.join(words[cut:])
+                if rng.random() < 0.5 and len(words[cut]) > 6:
+                    # hyphenated across the break
+                    word = words[cut]
+                    head, tail = f'{head} {word[:3]}-', ' '.join([word[3:]] + words[cut + 1:])
+                lines += [head, tail]
+                continue
+        lines.append(line)
+    sidebar = ['Excel', 'SAP', 'Forklift licence', 'Rota planning', 'Stock control']
+    lines[3:3] = [f'{skill:<20}{line}' for skill, line in zip(sidebar, lines[3:3 + len(sidebar)])]
+    del lines[3 + len(sidebar):3 + 2 * len(sidebar)]
+    name = resume_text.splitlines()[0]
+    pages = []
+    for page, start in enumerate(range(0, len(lines), LINES_PER_PAGE), 1):
+        pages += [f'{name} — Curriculum Vitae', *lines[start:start + LINES_PER_PAGE], f'Page {page}']
+    return '\n'.join(pages)
+
+
+def titles_kept(prompt, resume_text):
+    titles = [line for line in resume_text.splitlines() if resumetext.DATE_RANGE.search(line)]
+    return sum(title in prompt for title in titles), len(titles)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark resume clean-up and compaction.')
+    parser.add_argument('--jobs', default='2,6,12,24', help='comma-separated experience entries per resume')
+    parser.add_argument('--bullets', type=int, default=6, help='bullets per experience entry')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    tokens = resumetext.estimate_tokens
+    print(f"{'jobs':>5} {'raw':>6} {'clean':>6} | {'roast old':>9} {'new':>5} {'titles old':>10} {'new':>6} | "
+          f"{'rewrite old':>11} {'new':>5} {'titles old':>10} {'new':>6} | {'ms':>5}")
+    for n_jobs in (int(n) for n in args.jobs.split(',')):
+        clean_text = make_resume(n_jobs, args.bullets)
+        raw = dirty(clean_text, seed=n_jobs)
+        roast = resumetext.compact(raw, app.ROAST_INPUT_TOKENS)
+        rewrite = resumetext.compact(raw, app.REWRITE_INPUT_TOKENS)
+        old_roast, old_rewrite = raw[:5000], raw[:15000]
+        runs = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            resumetext.compact(raw, app.REWRITE_INPUT_TOKENS)
+            runs.append((time.perf_counter() - start) * 1000)
+        kept = [titles_kept(prompt, clean_text) for prompt in (old_roast, roast.text, old_rewrite, rewrite.text)]
+        print(f'{n_jobs:>5} {tokens(raw):>6} {roast.clean_tokens:>6} | {tokens(old_roast):>9} {roast.tokens:>5} '
+              f'{"%d/%d" % kept[0]:>10} {"%d/%d" % kept[1]:>6} | {tokens(old_rewrite):>11} {rewrite.tokens:>5} '
+              f'{"%d/%d" % kept[2]:>10} {"%d/%d" % kept[3]:>6} | {statistics.median(runs):>5.2f}')
+
+
+if __name__ == '__main__':
+    main()
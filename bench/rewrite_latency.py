@@ -0,0 +1,66 @@
+"""
+Compare single-call and sectional CV rewrites.
+
+    python -m bench.rewrite_latency
+    python -m bench.rewrite_latency --jobs 1,4,8 --scale 0.02 --repeat 5
+
+By default the model is bench.fakes.FakeAnthropic, so numbers reflect the
+shape of each mode (one long generation vs. a short split plus parallel
+sections) rather than live API variance. Pass --live to call the real API
+with ANTHROPIC_API_KEY (this costs money).
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import app
+from bench.corpus import make_corpus
+from bench.fakes import FakeAnthropic
+
+
+async def _time_call(fn, resume_text):
+    start = time.perf_counter()
+    result = await fn(resume_text)
+    return time.perf_counter() - start, result
+
+
+async def run(args):
+    scale = 1.0 if args.live else args.scale
+    if not args.live:
+        app.ai = FakeAnthropic(time_scale=scale)
+
+    corpus = make_corpus(tuple(int(n) for n in args.jobs.split(',')))
+    print(f"{'jobs':>4}  {'single (s)':>10}  {'sectional (s)':>13}  {'speedup':>7}")
+    totals = {'single': 0.0, 'sectional': 0.0}
+    for n_jobs, resume_text in corpus:
+        single, sectional = [], []
+        for _ in range(args.repeat):
+            elapsed, _ = await _time_call(app._rewrite_cv_single, resume_text)
+            single.append(elapsed / scale)
+            elapsed, result = await _time_call(app._rewrite_cv_sectional, resume_text)
+            sectional.append(elapsed / scale)
+            assert len(result['cv']['experience']) == n_jobs, 'sectional rewrite dropped or invented a job'
+        s, p = statistics.median(single), statistics.median(sectional)
+        totals['single'] += s
+        totals['sectional'] += p
+        print(f'{n_jobs:>4}  {s:>10.2f}  {p:>13.2f}  {s / p:>6.2f}x')
+    print(f"\nCorpus total: single {totals['single']:.2f}s, sectional {totals['sectional']:.2f}s "
+          f"({totals['single'] / totals['sectional']:.2f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--jobs', default='1,2,4,6,8', help='comma-separated experience entry counts')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--scale', type=float, default=0.05, help='fake latency time scale')
+    parser.add_argument('--live', action='store_true', help='use the real Anthropic API')
+    args = parser.parse_args()
+
+    # One loop for the whole run: the real async client keeps its connections on it
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
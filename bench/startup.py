@@ -0,0 +1,223 @@
+"""
+Measure how long app.py takes to start.
+
+    python -m bench.startup                         # import profile + server boot
+    python -m bench.startup --out before.json
+    python -m bench.startup --baseline before.json  # compare a change
+
+Three measurements, each the median of several fresh processes:
+
+- import: `python -X importtime -c "import app"`, broken down by the
+  modules app.py imports directly (cumulative time, so `flask` includes
+  werkzeug and jinja2) plus app.py's own module body;
+- deferred: the SDKs app.py imports on first use (app.HEAVY_MODULES),
+  i.e. what the first request that needs one pays, or what the gunicorn
+  master pays once when preloading;
+- boot: time from starting the server command (Procfile `web:` line or
+  --cmd) to the first healthy /health, then the latency of the first
+  checkout, the first request that needs the Stripe SDK;
+- memory: after every page in static/sitemap.xml has been served --warm
+  times, each worker's RSS, PSS (shared pages split between the processes
+  sharing them) and private dirty memory, from /proc/<pid>/smaps_rollup
+  (Linux only).
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlparse
+
+import requests
+
+from bench.fake_upstream import FakeUpstream, UpstreamConfig
+from bench.load import ROOT, procfile_command, start_server
+
+
+def parse_importtime(stderr):
+    """-X importtime output as [(depth, module, cumulative_us)], in the order printed."""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        entries.append((depth, name.strip(), int(cumulative)))
+    return entries
+
+
+def import_profile(code, env):
+    """Cumulative import time (ms) of every top-level import `code` makes, and each one's direct children."""
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT, env=env,
+                          capture_output=True, text=True, check=True)
+    top, children, pending = {}, {}, {}
+    for depth, name, cumulative in parse_importtime(proc.stderr):
+        # Entries are printed when an import finishes, so children come before their parent
+        if depth == 1:
+            pending[name] = cumulative / 1000
+        elif depth == 0:
+            top[name] = cumulative / 1000
+            children[name], pending = pending, {}
+    return top, children
+
+
+def median_profile(code, env, runs):
+    samples = [import_profile(code, env) for _ in range(runs)]
+    tops = {}
+    subs = {}
+    for top, children in samples:
+        for name, ms in top.items():
+            tops.setdefault(name, []).append(ms)
+        for name, ms in children.get('app', {}).items():
+            subs.setdefault(name, []).append(ms)
+    return ({name: statistics.median(v) for name, v in tops.items()},
+            {name: statistics.median(v) for name, v in subs.items()})
+
+
+def measure_imports(env, runs):
+    top, direct = median_profile('import app', env, runs)
+    total = top['app']
+    direct['(app.py body)'] = total - sum(direct.values())
+    # Imports made after app.py finished loading are the deferred SDKs
+    after, _ = median_profile("import app; getattr(app, 'preload_heavy_modules', lambda: None)()", env, runs)
+    names = list(after)
+    deferred = {}
+    for name in names[names.index('app') + 1:]:
+        package = name.split('.')[0]   # the SDKs import some submodules lazily, at top level
+        deferred[package] = deferred.get(package, 0) + after[name]
+    return total, direct, deferred
+
+
+def content_paths():
+    with open(os.path.join(ROOT, 'static', 'sitemap.xml')) as f:
+        return [urlparse(url).path or '/' for url in re.findall(r'<loc>([^<]+)</loc>', f.read())]
+
+
+def worker_pids(pid):
+    """The server's worker processes, or the server itself if it has none."""
+    children = []
+    try:
+        for task in os.listdir(f'/proc/{pid}/task'):
+            with open(f'/proc/{pid}/task/{task}/children') as f:
+                children += [int(c) for c in f.read().split()]
+    except OSError:
+        pass
+    return children or [pid]
+
+
+def memory_kb(pid):
+    """Rss, Pss and Private_Dirty of a process in kB (Linux)."""
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            name, _, value = line.partition(':')
+            if name in ('Rss', 'Pss', 'Private_Dirty'):
+                fields[name] = int(value.split()[0])
+    return fields
+
+
+def measure_boot(cmd, port, env, runs, warm):
+    base = f'http://127.0.0.1:{port}'
+    paths = content_paths()
+    boots, checkouts, memory = [], [], []
+    for _ in range(runs):
+        started = time.perf_counter()
+        proc = start_server(cmd, port, env)
+        try:
+            boots.append((time.perf_counter() - started) * 1000)
+            t = time.perf_counter()
+            resp = requests.post(base + '/api/checkout',
+                                 json={'resume': 'Experienced engineer. ' * 20, 'currency': 'gbp'}, timeout=60)
+            resp.raise_for_status()
+            checkouts.append((time.perf_counter() - t) * 1000)
+            with requests.Session() as session:
+                for _ in range(warm):
+                    for path in paths:
+                        session.get(base + path, timeout=30)
+            try:
+                memory += [memory_kb(pid) for pid in worker_pids(proc.pid)]
+            except OSError:
+                pass
+        finally:
+            proc.terminate()
+            proc.wait(timeout=30)
+    per_worker = {key.lower(): statistics.median(m[key] for m in memory) / 1024
+                  for key in ('Rss', 'Pss', 'Private_Dirty')} if memory else None
+    return statistics.median(boots), statistics.median(checkouts), per_worker
+
+
+def print_report(result, baseline=None, limit=12):
+    def delta(key, value, sub=None):
+        if not baseline:
+            return ''
+        old = baseline.get(key)
+        old = old.get(sub) if sub is not None and isinstance(old, dict) else (None if sub is not None else old)
+        return f'  ({value - old:+.1f} ms)' if old is not None else '  (new)'
+
+    print(f"import app          {result['import_ms']:>8.1f} ms{delta('import_ms', result['import_ms'])}")
+    for name, ms in sorted(result['imports'].items(), key=lambda kv: -kv[1])[:limit]:
+        print(f'  {name:<24} {ms:>8.1f} ms{delta("imports", ms, name)}')
+    if result['deferred']:
+        print(f"deferred to first use {sum(result['deferred'].values()):>5.1f} ms")
+        for name, ms in sorted(result['deferred'].items(), key=lambda kv: -kv[1]):
+            print(f'  {name:<24} {ms:>8.1f} ms{delta("deferred", ms, name)}')
+    if result.get('boot_ms') is not None:
+        print(f"boot to /health     {result['boot_ms']:>8.1f} ms{delta('boot_ms', result['boot_ms'])}")
+        print(f"first checkout      {result['first_checkout_ms']:>8.1f} ms"
+              f"{delta('first_checkout_ms', result['first_checkout_ms'])}")
+    if result.get('worker_mb'):
+        old = (baseline or {}).get('worker_mb') or {}
+        print('per worker, after serving the sitemap:')
+        for key, label in (('rss', 'RSS'), ('pss', 'PSS'), ('private_dirty', 'private dirty')):
+            mb = result['worker_mb'][key]
+            change = f'  ({mb - old[key]:+.2f} MB)' if key in old else ''
+            print(f'  {label:<24} {mb:>8.2f} MB{change}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure app.py import and server boot time.')
+    parser.add_argument('--runs', type=int, default=5, help='fresh processes per measurement (median)')
+    parser.add_argument('--cmd', help='server command (default: Procfile web line)')
+    parser.add_argument('--port', type=int, default=5056)
+    parser.add_argument('--no-boot', action='store_true', help='only profile imports')
+    parser.add_argument('--warm', type=int, default=5, help='times each sitemap page is served before measuring memory')
+    parser.add_argument('--out', help='write results as JSON')
+    parser.add_argument('--baseline', help='compare against a previous --out file')
+    args = parser.parse_args()
+
+    upstream = FakeUpstream(config=UpstreamConfig(time_scale=0.0)).start()
+    data_dir = tempfile.mkdtemp(prefix='cvroast-startup-')
+    env = {**os.environ, **upstream.env(), 'PYTHONPATH': ROOT,
+           'PAYMENTS_DB': os.path.join(data_dir, 'payments.db'),
+           'ANALYTICS_DB': os.path.join(data_dir, 'analytics.db')}
+    cmd = args.cmd or procfile_command()
+    try:
+        total, direct, deferred = measure_imports(env, args.runs)
+        result = {'import_ms': total, 'imports': direct, 'deferred': deferred,
+                  'boot_ms': None, 'first_checkout_ms': None, 'worker_mb': None}
+        if not args.no_boot:
+            print(f'Server: {cmd}\n')
+            result['boot_ms'], result['first_checkout_ms'], result['worker_mb'] = measure_boot(
+                cmd, args.port, env, args.runs, args.warm)
+    finally:
+        upstream.stop()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+    print_report(result, baseline)
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump({'command': cmd, 'runs': args.runs, 'results': result}, f, indent=2)
+        print(f'\nWrote {args.out}')
+
+
+if __name__ == '__main__':
+    main()
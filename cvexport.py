@@ -0,0 +1,384 @@
+"""
+PDF and DOCX exports of a rewritten CV.
+
+render_pdf() and render_docx() turn the `cv` object of a full review into
+a file laid out like the classic format on /success: name, contact line,
+summary, skills, experience, certifications, education and references.
+The PDF is written directly (Helvetica and Helvetica-Bold, which every
+viewer has, so nothing is embedded); the DOCX with python-docx.
+
+CvExports renders both outside the request, in a small process pool per
+worker, and keeps the files in a cache directory named by a hash of the CV,
+so the same result is only ever rendered once:
+
+    key = await exports.render(result)           # '3f9c...', both files exist
+    path = exports.path(key, 'pdf')
+
+    python -m cvexport result.json out/          # render a saved result by hand
+"""
+
+import asyncio
+import concurrent.futures
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+import zlib
+
+RENDER_VERSION = 1   # bump when the layout changes so cached files re-render
+
+FORMATS = {
+    'pdf': 'application/pdf',
+    'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+}
+
+# A4 in points, with 2cm margins
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842
+MARGIN = 56
+
+NAVY = (0.102, 0.212, 0.365)
+INK = (0.2, 0.2, 0.2)
+MUTED = (0.4, 0.4, 0.4)
+
+# (font, size, leading, colour, space before, indent) per block style
+STYLES = {
+    'name': ('F2', 22, 26, (0.102, 0.102, 0.18), 0, 0),
+    'title': ('F1', 12, 16, MUTED, 2, 0),
+    'contact': ('F1', 9.5, 13, MUTED, 4, 0),
+    'heading': ('F2', 10.5, 14, NAVY, 14, 0),
+    'body': ('F1', 10, 14, INK, 4, 0),
+    'job': ('F2', 11, 14, (0.102, 0.102, 0.18), 8, 0),
+    'meta': ('F1', 9.5, 13, MUTED, 1, 0),
+    'bullet': ('F1', 10, 14, INK, 2, 14),
+}
+
+# Advance widths (1/1000 em) of printable ASCII, from the Adobe AFM files
+_ASCII = ''.join(chr(c) for c in range(32, 127))
+_HELVETICA = [
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+]
+_HELVETICA_BOLD = [
+    278, 333, 474, 556, 556, 889, 722, 238, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 333, 333, 584, 584, 584, 611,
+    975, 722, 722, 722, 722, 667, 611, 778, 722, 278, 556, 722, 611, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 333, 278, 333, 584, 556,
+    333, 556, 611, 556, 611, 556, 333, 611, 611, 278, 278, 556, 278, 889, 611, 611,
+    611, 611, 389, 556, 333, 611, 556, 778, 556, 556, 500, 389, 280, 389, 584,
+]
+_PUNCTUATION = {'—': 1000, '–': 556, '•': 350, '‘': 222, '’': 222,
+                '“': 333, '”': 333, '…': 1000, '£': 556, '€': 556}
+WIDTHS = {
+    'F1': {**dict(zip(_ASCII, _HELVETICA)), **_PUNCTUATION},
+    'F2': {**dict(zip(_ASCII, _HELVETICA_BOLD)), **_PUNCTUATION},
+}
+FONTS = {'F1': 'Helvetica', 'F2': 'Helvetica-Bold'}
+
+
+def export_key(cv_data):
+    """Cache key of a review result's exports: a hash of its CV and the layout version."""
+    canonical = json.dumps(cv_data.get('cv') or {}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(f'{RENDER_VERSION}:{canonical}'.encode()).hexdigest()[:32]
+
+
+def _text(value):
+    return str(value).strip() if value else ''
+
+
+def blocks(cv):
+    """The CV as (style, text) blocks, in order, shared by both formats."""
+    out = [('name', _text(cv.get('name')) or 'Your Name')]
+    if cv.get('title'):
+        out.append(('title', _text(cv['title'])))
+    contact = ' | '.join(_text(cv.get(key)) for key in ('location', 'phone', 'email') if cv.get(key))
+    if contact:
+        out.append(('contact', contact))
+    if cv.get('personal_statement'):
+        out += [('heading', 'PROFESSIONAL SUMMARY'), ('body', _text(cv['personal_statement']))]
+    if cv.get('key_skills'):
+        out += [('heading', 'KEY SKILLS'), ('body', ' • '.join(_text(s) for s in cv['key_skills']))]
+    if cv.get('experience'):
+        out.append(('heading', 'PROFESSIONAL EXPERIENCE'))
+        for job in cv['experience']:
+            out.append(('job', _text(job.get('title'))))
+            meta = ' | '.join(_text(job.get(key)) for key in ('company', 'dates') if job.get(key))
+            if meta:
+                out.append(('meta', meta))
+            out += [('bullet', _text(b)) for b in job.get('bullets') or []]
+    if cv.get('certifications'):
+        out.append(('heading', 'CERTIFICATIONS & CLEARANCES'))
+        for cert in cv['certifications']:
+            cert = _text(cert)
+            if '[Recommended]' in cert:
+                cert = cert.replace('[Recommended]', '').strip() + ' (Recommended)'
+            out.append(('bullet', cert))
+    if cv.get('education'):
+        out.append(('heading', 'EDUCATION'))
+        for edu in cv['education']:
+            if isinstance(edu, str):
+                out.append(('body', edu))
+                continue
+            out.append(('job', _text(edu.get('qualification') or edu.get('title'))))
+            meta = ' | '.join(_text(edu.get(key)) for key in ('institution', 'year') if edu.get(key))
+            if meta:
+                out.append(('meta', meta))
+    out += [('heading', 'REFERENCES'), ('body', _text(cv.get('references')) or 'Available on request')]
+    return out
+
+
+# --- PDF ---
+
+def _wrap(text, font, size, width):
+    """Greedy word wrap to `width` points."""
+    widths = WIDTHS[font]
+    space = widths[' '] * size / 1000
+    lines, line, used = [], [], 0.0
+    for word in text.split():
+        w = sum(widths.get(c, 556) for c in word) * size / 1000
+        if line and used + space + w > width:
+            lines.append(' '.join(line))
+            line, used = [], 0.0
+        used += (space if line else 0) + w
+        line.append(word)
+    if line:
+        lines.append(' '.join(line))
+    return lines or ['']
+
+
+def _pdf_string(text):
+    raw = text.encode('cp1252', 'replace')
+    return b'(' + raw.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)') + b')'
+
+
+def _pdf_pages(cv):
+    """Content streams, one per page."""
+    pages, ops = [], []
+    y = PAGE_HEIGHT - MARGIN
+    text_width = PAGE_WIDTH - 2 * MARGIN
+
+    def new_page():
+        nonlocal ops, y
+        if ops:
+            pages.append(b'\n'.join(ops))
+        ops, y = [], PAGE_HEIGHT - MARGIN
+
+    for style, text in blocks(cv):
+        font, size, leading, colour, before, indent = STYLES[style]
+        lines = _wrap(text, font, size, text_width - indent)
+        # Keep a heading or job title with at least two lines of what follows it
+        needed = before + leading * (3 if style in ('heading', 'job') else 1)
+        if y - needed < MARGIN and y < PAGE_HEIGHT - MARGIN:
+            new_page()
+        else:
+            y -= before
+        colour_op = b'%.3f %.3f %.3f rg' % colour
+        for n, line in enumerate(lines):
+            if y - leading < MARGIN:
+                new_page()
+            y -= leading
+            x = MARGIN + indent
+            if style == 'bullet' and n == 0:
+                ops.append(b'BT /F1 %g Tf %s %.2f %.2f Td (\x95) Tj ET' % (size, colour_op, x - 10, y))
+            ops.append(b'BT /%s %g Tf %s %.2f %.2f Td %s Tj ET' % (font.encode(), size, colour_op, x, y,
+                                                                   _pdf_string(line)))
+        if style == 'heading':
+            ops.append(b'%.3f %.3f %.3f RG 0.8 w %d %.2f m %d %.2f l S' % (NAVY + (MARGIN, y - 4, PAGE_WIDTH - MARGIN,
+                                                                              y - 4)))
+            y -= 6
+    new_page()
+    return pages
+
+
+def render_pdf(cv_data):
+    cv = cv_data.get('cv') or {}
+    pages = _pdf_pages(cv)
+    # Objects: 1 catalog, 2 page tree, 3-4 fonts, 5 info, then a page and its content stream per page
+    objects = {
+        1: b'<< /Type /Catalog /Pages 2 0 R >>',
+        3: b'<< /Type /Font /Subtype /Type1 /BaseFont /%s /Encoding /WinAnsiEncoding >>' % FONTS['F1'].encode(),
+        4: b'<< /Type /Font /Subtype /Type1 /BaseFont /%s /Encoding /WinAnsiEncoding >>' % FONTS['F2'].encode(),
+        5: b'<< /Title %s /Producer (CVRoast) >>' % _pdf_string(_text(cv.get('name')) or 'CV'),
+    }
+    kids = []
+    for n, content in enumerate(pages):
+        page, stream = 6 + 2 * n, 7 + 2 * n
+        kids.append(b'%d 0 R' % page)
+        objects[page] = (b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Contents %d 0 R'
+                         b' /Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> >>' % (PAGE_WIDTH, PAGE_HEIGHT, stream))
+        data = zlib.compress(content, 6)
+        objects[stream] = b'<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream' % (len(data), data)
+    objects[2] = b'<< /Type /Pages /Kids [%s] /Count %d >>' % (b' '.join(kids), len(kids))
+
+    out = io.BytesIO()
+    out.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+    offsets = {}
+    for number in sorted(objects):
+        offsets[number] = out.tell()
+        out.write(b'%d 0 obj\n%s\nendobj\n' % (number, objects[number]))
+    xref = out.tell()
+    count = max(objects) + 1
+    out.write(b'xref\n0 %d\n0000000000 65535 f \n' % count)
+    for number in range(1, count):
+        out.write(b'%010d 00000 n \n' % offsets[number])
+    out.write(b'trailer\n<< /Size %d /Root 1 0 R /Info 5 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (count, xref))
+    return out.getvalue()
+
+
+# --- DOCX ---
+
+def render_docx(cv_data):
+    from docx import Document
+    from docx.enum.style import WD_STYLE_TYPE
+    from docx.shared import Cm, Pt, RGBColor
+
+    document = Document()
+    for section in document.sections:
+        section.top_margin = section.bottom_margin = Cm(2)
+        section.left_margin = section.right_margin = Cm(2)
+    document.styles['Normal'].font.name = 'Arial'
+
+    # One paragraph style per block style, so each paragraph is just text plus a style id
+    style_ids = {}
+    for name, (font, size, leading, colour, before, indent) in STYLES.items():
+        style = document.styles.add_style(f'CV {name.title()}', WD_STYLE_TYPE.PARAGRAPH)
+        style.base_style = document.styles['List Bullet' if name == 'bullet' else 'Normal']
+        style.font.size = Pt(size)
+        style.font.bold = font == 'F2'
+        style.font.color.rgb = RGBColor(*(round(c * 255) for c in colour))
+        style.paragraph_format.space_before = Pt(before)
+        style.paragraph_format.space_after = Pt(0)
+        style_ids[name] = style.style_id
+
+    for style, text in blocks(cv_data.get('cv') or {}):
+        paragraph = document.add_paragraph(text)
+        # Set the id directly: Paragraph.style looks up the default style on every assignment
+        paragraph._p.style = style_ids[style]
+
+    out = io.BytesIO()
+    document.save(out)
+    return out.getvalue()
+
+
+RENDERERS = {'pdf': render_pdf, 'docx': render_docx}
+
+
+def _render_to_file(fmt, cv_data, path):
+    """Pool task: render one format and move it into place atomically. Returns seconds spent rendering."""
+    started = time.perf_counter()
+    data = RENDERERS[fmt](cv_data)
+    elapsed = time.perf_counter() - started
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+    return elapsed
+
+
+class CvExports:
+    """Rendered exports in `directory`, named <key>.<format>, rendered by a process pool of `workers`.
+
+    With workers=0 rendering runs in a thread instead (development, tests). Each
+    gunicorn worker starts its own pool on first use; the master never does.
+    """
+
+    def __init__(self, directory, workers=1, observe=None):
+        self.directory = directory
+        self.workers = workers
+        self.observe = observe      # observe(format, seconds) after each render
+        self._pool = None
+        self._pool_pid = None
+        self._lock = threading.Lock()
+        self._inflight = {}         # (key, format) -> concurrent future, this process only
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None or self._pool_pid != os.getpid():
+                if self.workers <= 0:
+                    self._pool = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='cvexport')
+                else:
+                    # spawn, not fork: the worker has threads (event loop, metrics) a forked child could deadlock on
+                    self._pool = concurrent.futures.ProcessPoolExecutor(
+                        max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'))
+                self._pool_pid = os.getpid()
+            return self._pool
+
+    def path(self, key, fmt):
+        """Path of a rendered export, or None if it isn't (or is no longer) cached."""
+        if fmt not in FORMATS or not key.isalnum():
+            return None
+        path = os.path.join(self.directory, f'{key}.{fmt}')
+        return path if os.path.exists(path) else None
+
+    def _submit(self, key, fmt, cv_data):
+        with self._lock:
+            future = self._inflight.get((key, fmt))
+            if future is not None:
+                return future
+        path = os.path.join(self.directory, f'{key}.{fmt}')
+        future = self._executor().submit(_render_to_file, fmt, cv_data, path)
+        with self._lock:
+            self._inflight[(key, fmt)] = future
+        future.add_done_callback(lambda f: self._done(key, fmt, f))
+        return future
+
+    def _done(self, key, fmt, future):
+        with self._lock:
+            self._inflight.pop((key, fmt), None)
+        if self.observe and not future.cancelled() and future.exception() is None:
+            self.observe(fmt, future.result())
+
+    async def render(self, cv_data, formats=tuple(FORMATS)):
+        """Make sure every format of this result is rendered; returns its key."""
+        key = export_key(cv_data)
+        os.makedirs(self.directory, exist_ok=True)
+        pending = []
+        for fmt in formats:
+            try:
+                # Reused by a new review: purge() counts the file's age from now, so its links stay valid
+                os.utime(os.path.join(self.directory, f'{key}.{fmt}'))
+            except FileNotFoundError:
+                pending.append(asyncio.wrap_future(self._submit(key, fmt, cv_data)))
+        if pending:
+            await asyncio.gather(*pending)
+        return key
+
+    def read(self, key, fmt):
+        path = self.path(key, fmt)
+        if path is None:
+            return None
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def purge(self, older_than):
+        """Delete exports last rendered or reused before `older_than`; they hold CV text."""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return
+        for name in names:
+            path = os.path.join(self.directory, name)
+            try:
+                if os.path.getmtime(path) < older_than:
+                    os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        sys.exit('usage: python -m cvexport RESULT.json OUT_DIR')
+    with open(sys.argv[1]) as f:
+        result = json.load(f)
+    os.makedirs(sys.argv[2], exist_ok=True)
+    for fmt in FORMATS:
+        out_path = os.path.join(sys.argv[2], f'{export_key(result)}.{fmt}')
+        print(f'{out_path}: {_render_to_file(fmt, result, out_path) * 1000:.1f} ms')
@@ -0,0 +1,58 @@
+"""
+Transactional email bodies, rendered from Jinja templates in templates/email/.
+
+Each email has an HTML template and a plain-text one (cv.html / cv.txt,
+roast.html / roast.txt). They get their own Environment rather than the
+Flask app's: HTML is autoescaped, plain text is not, and block tags don't
+leave blank lines behind in the text parts. Templates are compiled on first
+use and kept for the life of the worker; under gunicorn --preload,
+when_ready compiles them in the master so workers inherit them.
+
+    html, text = emails.render_cv(result)
+    html, text = emails.render_roast(score, one_liner, roasts)
+"""
+
+import os
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates', 'email')
+
+env = Environment(
+    loader=FileSystemLoader(TEMPLATE_DIR),
+    autoescape=select_autoescape(['html']),
+    trim_blocks=True,
+    lstrip_blocks=True,
+    keep_trailing_newline=True,
+    auto_reload=False,
+)
+
+
+def preload():
+    """Compile every email template now rather than on the first send."""
+    for name in env.list_templates():
+        env.get_template(name)
+
+
+def _render(name, **context):
+    return env.get_template(f'{name}.html').render(context), env.get_template(f'{name}.txt').render(context)
+
+
+def score_color(score):
+    """The red/amber/green the site uses for a 0-100 score."""
+    if not isinstance(score, (int, float)):
+        return '#8e8e9a'
+    return '#ef4444' if score < 45 else ('#eab308' if score < 70 else '#22c55e')
+
+
+def render_cv(cv_data, attached=False):
+    """(html, text) of the rewritten-CV email for a full review result; `attached` if the PDF/DOCX go with it."""
+    cv = cv_data.get('cv') or {}
+    return _render('cv', cv=cv, attached=attached, contact=[cv.get(key) for key in ('location', 'phone', 'email')],
+                   score_before=cv_data.get('ats_score_before', '?'),
+                   score_after=cv_data.get('ats_score_after', '?'))
+
+
+def render_roast(score, one_liner, roasts):
+    """(html, text) of the free roast results email."""
+    return _render('roast', score=score, color=score_color(score), one_liner=one_liner, roasts=roasts)
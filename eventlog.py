@@ -0,0 +1,224 @@
+"""
+Durable analytics for CVRoast.
+
+Every business event (roast, checkout, payment, email signup, upload) is
+appended to an `events` table in a local SQLite file. Workers buffer events
+in memory and write them in batches, and each batch also updates the
+rollups in the same transaction:
+
+- hourly rows: counts, revenue and score sums per kind and hour;
+- daily rows: the same per day, plus running totals since the first event.
+
+Because daily rows carry running totals, the totals for any date range are
+two indexed lookups per kind (the running total at the end of the range
+minus the one just before it), however long the range is.
+"""
+
+import atexit
+import os
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+KINDS = ('roast', 'checkout', 'payment', 'email', 'upload')
+VALUES = ('count', 'amount_cents', 'score_sum', 'score_count')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id           INTEGER PRIMARY KEY,
+    ts           REAL NOT NULL,
+    kind         TEXT NOT NULL,
+    amount_cents INTEGER NOT NULL DEFAULT 0,
+    score        INTEGER
+);
+CREATE TABLE IF NOT EXISTS rollups (
+    period           TEXT NOT NULL,     -- 'hour' or 'day'
+    kind             TEXT NOT NULL,
+    bucket           TEXT NOT NULL,     -- '2026-02-10T14' or '2026-02-10'
+    count            INTEGER NOT NULL DEFAULT 0,
+    amount_cents     INTEGER NOT NULL DEFAULT 0,
+    score_sum        INTEGER NOT NULL DEFAULT 0,
+    score_count      INTEGER NOT NULL DEFAULT 0,
+    cum_count        INTEGER NOT NULL DEFAULT 0,   -- running totals, daily rows only
+    cum_amount_cents INTEGER NOT NULL DEFAULT 0,
+    cum_score_sum    INTEGER NOT NULL DEFAULT 0,
+    cum_score_count  INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (period, kind, bucket)
+);
+"""
+
+
+def day_bucket(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).strftime('%Y-%m-%d')
+
+
+def hour_bucket(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).strftime('%Y-%m-%dT%H')
+
+
+def _empty():
+    return dict.fromkeys(VALUES, 0)
+
+
+class EventLog:
+    def __init__(self, path, flush_interval=2.0, batch_size=500):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._pending = []    # (ts, kind, amount_cents, score)
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._conn = None
+        self._conn_pid = None
+        self._flusher_pid = None
+
+    def _db(self):
+        # One connection per process: SQLite connections must not cross a fork
+        if self._conn is None or self._conn_pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(SCHEMA)
+            self._conn, self._conn_pid = conn, os.getpid()
+        return self._conn
+
+    def log(self, kind, amount_cents=0, score=None):
+        """Queue an event; it is written with the next batch."""
+        with self._lock:
+            self._pending.append((time.time(), kind, amount_cents, score))
+            full = len(self._pending) >= self.batch_size
+        self.ensure_flusher()
+        if full:
+            self.flush()
+
+    def ensure_flusher(self):
+        """Start the batch writer once per process (call after fork)."""
+        if self._flusher_pid == os.getpid():
+            return
+        self._flusher_pid = os.getpid()
+        atexit.register(self.flush)
+
+        def loop():
+            while True:
+                time.sleep(self.flush_interval)
+                try:
+                    self.flush()
+                except Exception as e:
+                    # The batch is queued again; one bad flush must not stop this thread
+                    print(f'eventlog: flush failed, retrying: {e!r}', file=sys.stderr)
+
+        threading.Thread(target=loop, name='eventlog-flush', daemon=True).start()
+
+    def flush(self):
+        """Write queued events and fold them into the rollups, in one transaction."""
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if not batch:
+            return
+        deltas = {}   # (period, kind, bucket) -> {count, amount_cents, score_sum, score_count}
+        for ts, kind, amount_cents, score in batch:
+            for period, bucket in (('hour', hour_bucket(ts)), ('day', day_bucket(ts))):
+                d = deltas.setdefault((period, kind, bucket), _empty())
+                d['count'] += 1
+                d['amount_cents'] += amount_cents
+                if score is not None:
+                    d['score_sum'] += score
+                    d['score_count'] += 1
+        try:
+            with self._db_lock:
+                db = self._db()
+                db.execute('BEGIN IMMEDIATE')
+                try:
+                    db.executemany('INSERT INTO events (ts, kind, amount_cents, score) VALUES (?, ?, ?, ?)', batch)
+                    for (period, kind, bucket), d in sorted(deltas.items()):
+                        self._apply(db, period, kind, bucket, d)
+                    db.execute('COMMIT')
+                except BaseException:
+                    db.execute('ROLLBACK')
+                    raise
+        except Exception:
+            with self._lock:
+                self._pending[:0] = batch   # retry with the next flush
+            raise
+
+    @staticmethod
+    def _apply(db, period, kind, bucket, d):
+        values = [d[v] for v in VALUES]
+        if period == 'hour':
+            db.execute(
+                'INSERT INTO rollups (period, kind, bucket, count, amount_cents, score_sum, score_count)'
+                ' VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT(period, kind, bucket) DO UPDATE SET'
+                ' count = count + excluded.count, amount_cents = amount_cents + excluded.amount_cents,'
+                ' score_sum = score_sum + excluded.score_sum, score_count = score_count + excluded.score_count',
+                (period, kind, bucket, *values))
+            return
+
+        exists = db.execute("SELECT 1 FROM rollups WHERE period = 'day' AND kind = ? AND bucket = ?",
+                            (kind, bucket)).fetchone()
+        if exists:
+            db.execute(
+                "UPDATE rollups SET count = count + ?, amount_cents = amount_cents + ?,"
+                " score_sum = score_sum + ?, score_count = score_count + ?,"
+                " cum_count = cum_count + ?, cum_amount_cents = cum_amount_cents + ?,"
+                " cum_score_sum = cum_score_sum + ?, cum_score_count = cum_score_count + ?"
+                " WHERE period = 'day' AND kind = ? AND bucket = ?",
+                (*values, *values, kind, bucket))
+        else:
+            before = db.execute(
+                "SELECT cum_count, cum_amount_cents, cum_score_sum, cum_score_count FROM rollups"
+                " WHERE period = 'day' AND kind = ? AND bucket < ? ORDER BY bucket DESC LIMIT 1",
+                (kind, bucket)).fetchone() or (0, 0, 0, 0)
+            db.execute(
+                'INSERT INTO rollups (period, kind, bucket, count, amount_cents, score_sum, score_count,'
+                ' cum_count, cum_amount_cents, cum_score_sum, cum_score_count)'
+                " VALUES ('day', ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (kind, bucket, *values, *(b + v for b, v in zip(before, values))))
+        # A batch flushed late (a worker that was idle over midnight) also shifts later running totals
+        db.execute(
+            "UPDATE rollups SET cum_count = cum_count + ?, cum_amount_cents = cum_amount_cents + ?,"
+            " cum_score_sum = cum_score_sum + ?, cum_score_count = cum_score_count + ?"
+            " WHERE period = 'day' AND kind = ? AND bucket > ?",
+            (*values, kind, bucket))
+
+    def _query(self, sql, params=()):
+        with self._db_lock:
+            return self._db().execute(sql, params).fetchall()
+
+    def _running_total(self, kind, before_or_at, inclusive):
+        op = '<=' if inclusive else '<'
+        rows = self._query(
+            'SELECT cum_count, cum_amount_cents, cum_score_sum, cum_score_count FROM rollups'
+            f" WHERE period = 'day' AND kind = ? AND bucket {op} ? ORDER BY bucket DESC LIMIT 1",
+            (kind, before_or_at))
+        return rows[0] if rows else (0, 0, 0, 0)
+
+    def totals(self, start=None, end=None):
+        """Totals per kind for the days start..end inclusive ('YYYY-MM-DD'; None = unbounded)."""
+        result = {}
+        for kind in KINDS:
+            upper = self._running_total(kind, end or '9999-12-31', inclusive=True)
+            lower = self._running_total(kind, start, inclusive=False) if start else (0, 0, 0, 0)
+            result[kind] = {v: u - l for v, u, l in zip(VALUES, upper, lower)}
+        return result
+
+    def _buckets(self, period, since):
+        rows = self._query(
+            'SELECT bucket, kind, count, amount_cents, score_sum, score_count FROM rollups'
+            ' WHERE period = ? AND bucket >= ? ORDER BY bucket DESC', (period, since))
+        buckets = {}
+        for bucket, kind, *values in rows:
+            buckets.setdefault(bucket, {k: _empty() for k in KINDS})[kind] = dict(zip(VALUES, values))
+        return buckets
+
+    def daily(self, days=7):
+        """Per-kind rollups for the last `days` days, newest first."""
+        return self._buckets('day', day_bucket(time.time() - (days - 1) * 86400))
+
+    def hourly(self, hours=24):
+        """Per-kind rollups for the last `hours` hours, newest first."""
+        return self._buckets('hour', hour_bucket(time.time() - (hours - 1) * 3600))
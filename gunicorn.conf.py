@@ -0,0 +1,35 @@
+"""
+Gunicorn settings; gunicorn reads this file from the working directory on its own.
+
+With preload_app the master imports app.py once, along with the upstream SDKs
+the app otherwise imports on first use, compiles the Jinja templates, and forks
+the workers from it. A new or restarted worker is serving straight away instead
+of spending ~2s on imports, and the module code, compiled templates and
+read-only tables (the page content lives in PageTable blobs) stay shared
+copy-on-write between workers rather than being loaded into each one.
+gc.freeze() parks everything loaded so far outside the collector, so garbage
+collection in a worker doesn't write to those pages and un-share them.
+
+Everything per-process in the app (the asyncio loop, SQLite connections,
+metrics and flusher threads) is created lazily and keyed by pid, so none of it
+crosses the fork. Set GUNICORN_PRELOAD=0 to import the app in every worker
+instead.
+"""
+
+import gc
+import os
+
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') != '0'
+
+
+def when_ready(server):
+    # Runs in the master after the preloaded app is imported, before any worker forks
+    if preload_app:
+        import app
+        app.preload_heavy_modules()
+        # Compile every template here rather than once per worker on first render
+        for name in app.app.jinja_env.list_templates():
+            if not name.startswith('email/'):   # emails.env compiles those
+                app.app.jinja_env.get_template(name)
+        app.emails.preload()
+        gc.freeze()
@@ -0,0 +1,165 @@
+"""
+Response compression and HTTP validators for CVRoast.
+
+HttpCache.process() runs on every response (an after_request hook). For a
+successful GET or HEAD that may be stored, it:
+
+- gives the response a strong ETag, a hash of the body, unless the view set
+  one, and answers If-None-Match / If-Modified-Since with 304 Not Modified;
+- compresses text bodies with brotli (when the `brotli` package is
+  installed) or gzip, whichever the client's Accept-Encoding prefers, and
+  adds Vary: Accept-Encoding. Each encoding is its own representation with
+  its own ETag ("<hash>", "<hash>-br", "<hash>-gzip");
+- keeps the compressed bytes in a bounded LRU keyed by ETag and encoding.
+  A page that renders the same bytes every time (every content page) is
+  compressed once per worker rather than once per request.
+
+POST responses and those marked no-store (personal data) are compressed
+too, but get no ETag and are never cached.
+
+StaticFingerprints versions static files by content hash, so templates can
+link to /static/<file>?v=<hash> and those URLs can be cached immutably.
+"""
+
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+COMPRESSIBLE = {'application/json', 'application/javascript', 'application/xml', 'application/rss+xml',
+                'image/svg+xml'}
+
+
+def _compressible(mimetype):
+    return bool(mimetype) and (mimetype.startswith('text/') or mimetype in COMPRESSIBLE)
+
+
+def _compress(body, encoding, level):
+    if encoding == 'br':
+        return brotli.compress(body, quality=level)
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+class HttpCache:
+    def __init__(self, max_bytes=16 * 1024 * 1024, min_size=512, gzip_level=6, brotli_quality=5,
+                 max_passthrough=1024 * 1024):
+        self.max_bytes = max_bytes
+        self.min_size = min_size              # smaller bodies aren't worth the header overhead
+        self.levels = {'gzip': gzip_level, 'br': brotli_quality}
+        self.max_passthrough = max_passthrough   # largest file response read into memory to compress
+        self._cache = OrderedDict()           # (etag, encoding) -> compressed bytes
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def encodings(self):
+        return ('br', 'gzip') if brotli else ('gzip',)
+
+    def negotiate(self, accept_encodings):
+        """The supported encoding the client prefers (br on a tie), or None for identity."""
+        best, best_q = None, 0
+        for encoding in self.encodings():
+            q = accept_encodings.quality(encoding)
+            if q > best_q:
+                best, best_q = encoding, q
+        return best
+
+    def process(self, response, request):
+        if response.status_code != 200 or request.method not in ('GET', 'HEAD', 'POST'):
+            return response
+        if response.is_streamed and not self._materialize(response):
+            return response
+        if 'Content-Encoding' in response.headers:
+            return response
+        compressible = _compressible(response.mimetype)
+        if compressible:
+            response.vary.add('Accept-Encoding')
+        body_size = response.content_length or 0
+        encoding = self.negotiate(request.accept_encodings) if compressible and body_size >= self.min_size else None
+
+        cacheable = request.method != 'POST' and not response.cache_control.no_store
+        if not cacheable:
+            if encoding:
+                self._encode(response, encoding, None)
+            return response
+
+        etag, weak = response.get_etag()
+        if etag is None or weak:
+            etag = hashlib.sha1(response.get_data()).hexdigest()[:20]
+        response.set_etag(f'{etag}-{encoding}' if encoding else etag)
+        response.make_conditional(request)
+        if response.status_code == 304:
+            return response
+        if encoding:
+            self._encode(response, encoding, etag)
+        return response
+
+    def _materialize(self, response):
+        """Read a small file response (send_file) into memory so it can be compressed."""
+        if not (response.direct_passthrough and _compressible(response.mimetype)):
+            return False
+        if (response.content_length or self.max_passthrough + 1) > self.max_passthrough:
+            return False
+        wrapper = response.response
+        response.direct_passthrough = False
+        response.set_data(b''.join(wrapper))
+        if hasattr(wrapper, 'close'):
+            wrapper.close()
+        return True
+
+    def _encode(self, response, encoding, etag):
+        key = (etag, encoding)
+        data = None
+        if etag is not None:
+            with self._lock:
+                data = self._cache.get(key)
+                if data is not None:
+                    self._cache.move_to_end(key)
+        if data is None:
+            data = _compress(response.get_data(), encoding, self.levels[encoding])
+            if etag is not None:
+                self._store(key, data)
+        response.set_data(data)
+        response.headers['Content-Encoding'] = encoding
+
+    def _store(self, key, data):
+        with self._lock:
+            if key in self._cache or len(data) > self.max_bytes:
+                return
+            self._cache[key] = data
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                _, evicted = self._cache.popitem(last=False)
+                self._size -= len(evicted)
+
+    @property
+    def size(self):
+        return self._size
+
+
+class StaticFingerprints:
+    """Content hashes of static files, recomputed when a file changes."""
+
+    def __init__(self, directory, length=10):
+        self.directory = directory
+        self.length = length
+        self._hashes = {}     # filename -> (mtime, hash)
+
+    def version(self, filename):
+        path = os.path.join(self.directory, filename)
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            return None
+        cached = self._hashes.get(filename)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        with open(path, 'rb') as f:
+            digest = hashlib.sha1(f.read()).hexdigest()[:self.length]
+        self._hashes[filename] = (mtime, digest)
+        return digest
@@ -0,0 +1,156 @@
+"""
+Resume vs job description keyword matching for /api/match.
+
+The vocabulary is the keyword tables of the role pages (ROLE_PAGES), about
+200 skills and phrases. KeywordIndex tokenizes and stems each phrase once, at
+startup, into an inverted index keyed by a phrase's first stem. Matching
+is then linear in the size of the texts:
+
+- the job description is scanned once; at each position only the phrases
+  starting with that stem are compared. Terms the job description repeats
+  that the vocabulary doesn't know (a tool name, a domain word) are added,
+  so a posting for something the role pages don't cover still gets a useful
+  score;
+- the resume is scanned the same way into a set of phrases and a set of
+  stems, so checking whether it contains each required term is a lookup.
+
+The score is the weighted share of the job description's terms that the
+resume contains; skills from the vocabulary weigh twice as much as other
+repeated words.
+"""
+
+import re
+from collections import Counter
+from functools import lru_cache
+
+TOKEN = re.compile(r'[a-z0-9]+(?:[+#]+)?', re.IGNORECASE)
+SUFFIXES = ('ations', 'ation', 'ments', 'ment', 'ings', 'ing', 'ies', 'ied', 'ers', 'er', 'es', 'ed', 'ly', 's')
+STOPWORDS = frozenset("""
+a about above across after all also an and any are as at be been being both but by can could do does
+each either etc for from has have having he her his how i if in into is it its just least may more most
+must not of on or other our out over own per please role same shall she should so some such than that the
+their them then there these they this those through to too under up us very via was we were what when
+where which while who whom why will with within without would you your
+ability able candidate candidates company day days duties experience help including job join looking
+new opportunity position required requirements responsibilities skills strong team teams work working
+year years well plus ideal key ensure provide using use based across excellent good great
+""".split())
+SKILL_WEIGHT = 2.0
+WORD_WEIGHT = 1.0
+MIN_REPEATS = 2     # unknown words the job description uses this often count as terms
+
+
+@lru_cache(maxsize=65536)
+def stem(word):
+    """A light suffix-stripping stemmer: managing, managed, manager and management all become 'manag'."""
+    if len(word) <= 3 or not word.isalpha():
+        return word
+    for suffix in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            if suffix == 's' and word.endswith('ss'):
+                break
+            word = word[:-len(suffix)] + ('y' if suffix in ('ies', 'ied') else '')
+            break
+    return word[:-1] if word.endswith('e') and len(word) > 4 else word
+
+
+def tokenize(text):
+    """Word tokens as written; '+' and '#' stay attached (C++, C#)."""
+    return TOKEN.findall(text)
+
+
+def stems(text):
+    return [stem(token) for token in tokenize(text.lower())]
+
+
+class KeywordIndex:
+    def __init__(self, phrases):
+        """phrases: {display phrase: set of role slugs that list it}."""
+        self.terms = {}        # stem tuple -> display phrase
+        self.roles = {}        # stem tuple -> role slugs
+        self.by_first = {}     # first stem -> stem tuples starting with it, longest first
+        for phrase, roles in phrases.items():
+            key = tuple(stems(phrase))
+            if not key:
+                continue
+            self.terms.setdefault(key, phrase)
+            self.roles.setdefault(key, set()).update(roles)
+        for key in self.terms:
+            self.by_first.setdefault(key[0], []).append(key)
+        for keys in self.by_first.values():
+            keys.sort(key=len, reverse=True)
+        self.max_len = max((len(k) for k in self.terms), default=1)
+
+    @classmethod
+    def from_roles(cls, role_pages):
+        phrases = {}
+        for slug, page in role_pages.items():
+            for phrase in page['keywords'].split(','):
+                if phrase.strip():
+                    phrases.setdefault(phrase.strip(), set()).add(slug)
+        return cls(phrases)
+
+    def __len__(self):
+        return len(self.terms)
+
+    def _scan(self, seq):
+        """Vocabulary phrases in a stem sequence, and the positions no phrase covers."""
+        found, loose = [], []
+        by_first = self.by_first
+        i, n = 0, len(seq)
+        while i < n:
+            for key in by_first.get(seq[i], ()):
+                if tuple(seq[i:i + len(key)]) == key:
+                    found.append(key)
+                    i += len(key)
+                    break
+            else:
+                loose.append(i)
+                i += 1
+        return found, loose
+
+    def job_terms(self, text):
+        """The terms a job description asks for: {stem tuple: display text}."""
+        tokens = tokenize(text)
+        seq = [stem(t.lower()) for t in tokens]
+        found, loose = self._scan(seq)
+        terms = {key: self.terms[key] for key in found}
+        counts, first_form = Counter(), {}
+        for j in loose:
+            s = seq[j]
+            if len(s) > 2 and not s.isdigit() and tokens[j].lower() not in STOPWORDS:
+                counts[s] += 1
+                first_form.setdefault(s, tokens[j])
+        for s, n in counts.items():
+            if n >= MIN_REPEATS and (s,) not in terms:
+                terms[(s,)] = first_form[s]
+        return terms
+
+    def resume_terms(self, text):
+        """Everything a resume could match: its vocabulary phrases and single stems."""
+        seq = stems(text)
+        found, _ = self._scan(seq)
+        return set(found), set(seq)
+
+    def match(self, resume, job_description, max_missing=15):
+        wanted = self.job_terms(job_description)
+        phrases, words = self.resume_terms(resume)
+        matched, missing = [], []
+        total = got = 0.0
+        for key, label in wanted.items():
+            weight = SKILL_WEIGHT if key in self.terms else WORD_WEIGHT
+            total += weight
+            if key in phrases or (len(key) == 1 and key[0] in words):
+                got += weight
+                matched.append(label)
+            else:
+                missing.append((weight, label))
+        missing.sort(key=lambda m: -m[0])
+        role_hits = Counter(slug for key in wanted if key in self.roles for slug in self.roles[key])
+        return {
+            'score': round(100 * got / total) if total else None,
+            'matched': matched,
+            'missing': [label for _, label in missing[:max_missing]],
+            'terms': len(wanted),
+            'roles': [slug for slug, _ in role_hits.most_common(3)],
+        }
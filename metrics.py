@@ -0,0 +1,229 @@
+"""
+Prometheus-style metrics for CVRoast.
+
+Every gunicorn worker records counters, gauges and histograms in memory and
+periodically snapshots them to METRICS_DIR/<pid>.json. Rendering merges the
+snapshots of every worker started by the same master, so a scrape of
+/metrics sees totals for the whole deployment whichever worker answers it.
+
+Counters and histograms of workers that have exited are kept (they are
+cumulative); gauges only count workers that are still alive.
+"""
+
+import bisect
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets in seconds: fast page renders up to long Sonnet rewrites
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 80)
+
+
+def _key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    body = ','.join('{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"')) for k, v in pairs)
+    return '{' + body + '}'
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class Metrics:
+    def __init__(self, prefix='cvroast', directory=None, flush_interval=5.0, buckets=DEFAULT_BUCKETS):
+        self.prefix = prefix
+        self.directory = directory or os.path.join(tempfile.gettempdir(), f'{prefix}-metrics')
+        self.flush_interval = flush_interval
+        self.buckets = tuple(buckets)
+        self._help = {}           # name -> (type, help)
+        self._counters = {}       # (name, labels) -> value
+        self._gauges = {}         # (name, labels) -> value
+        self._gauge_fns = {}      # name -> callable returning a number
+        self._histograms = {}     # (name, labels) -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+        self._flusher_pid = None
+
+    # --- Recording ---
+
+    def describe(self, name, kind, help_text):
+        self._help[name] = (kind, help_text)
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        with self._lock:
+            self._gauges[(name, _key(labels))] = value
+
+    def add(self, name, value, **labels):
+        key = (name, _key(labels))
+        with self._lock:
+            self._gauges[key] = self._gauges.get(key, 0) + value
+
+    def gauge_fn(self, name, fn):
+        """Register a gauge whose value is read from `fn` at snapshot time."""
+        self._gauge_fns[name] = fn
+
+    def observe(self, name, value, **labels):
+        key = (name, _key(labels))
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                hist[index] += 1
+            hist[-2] += value
+            hist[-1] += 1
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Observe the duration of the block, labelled outcome=ok|error."""
+        start = time.perf_counter()
+        outcome = 'ok'
+        try:
+            yield
+        except BaseException:
+            outcome = 'error'
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - start, outcome=outcome, **labels)
+
+    # --- Cross-worker aggregation ---
+
+    def snapshot(self):
+        gauges = {}
+        for name, fn in self._gauge_fns.items():
+            try:
+                gauges[(name, ())] = fn()
+            except Exception:
+                pass
+        with self._lock:
+            gauges.update(self._gauges)
+            return {
+                'pid': os.getpid(),
+                'ppid': os.getppid(),
+                'counters': [[n, l, v] for (n, l), v in self._counters.items()],
+                'gauges': [[n, l, v] for (n, l), v in gauges.items()],
+                'histograms': [[n, l, h] for (n, l), h in self._histograms.items()],
+            }
+
+    def flush(self):
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f'{os.getpid()}.json')
+        tmp = f'{path}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp, path)
+
+    def ensure_flusher(self):
+        """Start the snapshot thread once per process (call after fork)."""
+        if self._flusher_pid == os.getpid():
+            return
+        self._flusher_pid = os.getpid()
+
+        def loop():
+            while True:
+                try:
+                    self.flush()
+                except OSError:
+                    pass
+                time.sleep(self.flush_interval)
+
+        threading.Thread(target=loop, name='metrics-flush', daemon=True).start()
+
+    def _load_snapshots(self):
+        own = self.snapshot()
+        snapshots = [own]
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return snapshots
+        for filename in names:
+            if not filename.endswith('.json') or filename == f"{own['pid']}.json":
+                continue
+            path = os.path.join(self.directory, filename)
+            try:
+                with open(path) as f:
+                    snap = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if snap.get('ppid') != own['ppid']:
+                # Left over from a previous server; drop it once its worker is gone
+                if not _pid_alive(snap.get('pid', 0)):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                continue
+            snap['alive'] = _pid_alive(snap['pid'])
+            snapshots.append(snap)
+        return snapshots
+
+    def collect(self):
+        """Merge every worker's snapshot into (counters, gauges, histograms)."""
+        counters, gauges, histograms = {}, {}, {}
+        for snap in self._load_snapshots():
+            for name, labels, value in snap['counters']:
+                key = (name, tuple(map(tuple, labels)))
+                counters[key] = counters.get(key, 0) + value
+            if snap.get('alive', True):
+                for name, labels, value in snap['gauges']:
+                    key = (name, tuple(map(tuple, labels)))
+                    gauges[key] = gauges.get(key, 0) + value
+            for name, labels, hist in snap['histograms']:
+                key = (name, tuple(map(tuple, labels)))
+                merged = histograms.setdefault(key, [0] * len(hist))
+                for i, v in enumerate(hist):
+                    merged[i] += v
+        return counters, gauges, histograms
+
+    def render(self):
+        """Render merged metrics in the Prometheus text exposition format."""
+        counters, gauges, histograms = self.collect()
+        lines = []
+        seen = set()
+
+        def header(name, default_kind):
+            if name in seen:
+                return
+            seen.add(name)
+            kind, help_text = self._help.get(name, (default_kind, ''))
+            if help_text:
+                lines.append(f'# HELP {self.prefix}_{name} {help_text}')
+            lines.append(f'# TYPE {self.prefix}_{name} {kind}')
+
+        for (name, labels), value in sorted(counters.items()):
+            header(name, 'counter')
+            lines.append(f'{self.prefix}_{name}{_format_labels(labels)} {value}')
+        for (name, labels), value in sorted(gauges.items()):
+            header(name, 'gauge')
+            lines.append(f'{self.prefix}_{name}{_format_labels(labels)} {value}')
+        for (name, labels), hist in sorted(histograms.items()):
+            header(name, 'histogram')
+            full = f'{self.prefix}_{name}'
+            cumulative = 0
+            for bound, count in zip(self.buckets, hist):
+                cumulative += count
+                lines.append(f'{full}_bucket{_format_labels(labels, [("le", bound)])} {cumulative}')
+            lines.append(f'{full}_bucket{_format_labels(labels, [("le", "+Inf")])} {hist[-1]}')
+            lines.append(f'{full}_sum{_format_labels(labels)} {hist[-2]:.6f}')
+            lines.append(f'{full}_count{_format_labels(labels)} {hist[-1]}')
+        return '\n'.join(lines) + '\n'
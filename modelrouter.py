@@ -0,0 +1,187 @@
+"""
+Which Claude model answers each model call, picked from cheap local signals.
+
+Every call in app.py names a task (roast, commentary, split, rewrite). A
+task has a ladder of tiers, cheapest first. The first tier is chosen from the
+resume alone: its length, how many jobs it lists and whether it is in
+English, all measured locally in well under a millisecond. A call moves up
+the ladder only when the reply fails validation (not JSON, or missing the
+fields the prompt asked for); API errors are raised as they are.
+
+The defaults keep roasts, the job-match commentary and the section split on
+Haiku, and every rewrite on Sonnet. Set MODEL_ROUTES to a JSON object, or
+the path of a JSON file, to change them. Its "tiers" and "tasks" are merged
+over DEFAULT_CONFIG one key deep. HAIKU_REWRITES starts the rewrites of
+short, English, few-job CVs on Haiku; it is opt-in until the quality of
+those rewrites has been measured:
+
+    {"tasks": {"rewrite": {"tiers": ["haiku", "sonnet"],
+                           "rules": [{"tier": "sonnet", "chars": 2500}, {"tier": "sonnet", "jobs": 3},
+                                     {"tier": "sonnet", "english": false}]}}}
+
+    {"tiers": {"opus": {"model": "claude-opus-4-1", "prices": [15.0, 75.0]}},
+     "tasks": {"rewrite": {"tiers": ["sonnet", "opus"],
+                           "rules": [{"tier": "opus", "jobs": 8}]}}}
+
+A rule starts the call on its tier when all of its conditions hold: "chars"
+and "jobs" are minimums, "english" must equal the detected language. The
+highest matching tier wins; with none, the call starts on the first tier.
+
+    models = ModelRouter.from_env(observe=...)
+    result = await models.run('roast', models.signals(text), call, parse)
+"""
+
+import json
+import os
+import re
+import time
+from collections import namedtuple
+
+from resumetext import DATE_RANGE
+
+DEFAULT_CONFIG = {
+    'tiers': {
+        # USD per million (input, output) tokens, for spend estimates
+        'haiku': {'model': 'claude-haiku-4-5-20251001', 'prices': [1.0, 5.0]},
+        'sonnet': {'model': 'claude-sonnet-4-5-20250929', 'prices': [3.0, 15.0]},
+    },
+    'tasks': {
+        'roast': {'tiers': ['haiku', 'sonnet']},
+        'commentary': {'tiers': ['haiku', 'sonnet']},
+        'split': {'tiers': ['haiku', 'sonnet']},
+        'rewrite': {'tiers': ['sonnet']},
+    },
+}
+
+# MODEL_ROUTES that give Haiku the rewrites of short, English CVs with at most two jobs
+HAIKU_REWRITES = {
+    'tasks': {
+        'rewrite': {'tiers': ['haiku', 'sonnet'],
+                    'rules': [{'tier': 'sonnet', 'chars': 2500},
+                              {'tier': 'sonnet', 'jobs': 3},
+                              {'tier': 'sonnet', 'english': False}]},
+    },
+}
+
+Signals = namedtuple('Signals', 'chars jobs english')
+
+WORD = re.compile(r'[^\W\d_]+')
+# Function words a resume written in English can't avoid, even in clipped bullet points
+ENGLISH_WORDS = frozenset(
+    'a an and the of to in for with on at by from as or is was are were be been i my me our we'
+    ' team customer customers managed led worked work responsible new'.split())
+LANGUAGE_SAMPLE_WORDS = 400
+ENGLISH_MIN_SHARE = 0.08
+
+
+class InvalidReply(ValueError):
+    """A model reply that parsed but isn't what the prompt asked for."""
+
+
+def require(result, **fields):
+    """Raise InvalidReply unless `result` is a dict with each field of the given type(s), and lists non-empty."""
+    if not isinstance(result, dict):
+        raise InvalidReply(f'expected a JSON object, got {type(result).__name__}')
+    for name, kind in fields.items():
+        value = result.get(name)
+        if not isinstance(value, kind) or isinstance(value, bool) or (isinstance(value, list) and not value):
+            raise InvalidReply(f'{name!r} missing or not {kind}')
+
+
+def signals(text):
+    """Length, experience entries and language of a resume."""
+    words = WORD.findall(text[:LANGUAGE_SAMPLE_WORDS * 12])[:LANGUAGE_SAMPLE_WORDS]
+    common = sum(1 for word in words if word.lower() in ENGLISH_WORDS)
+    english = len(words) < 20 or common / len(words) >= ENGLISH_MIN_SHARE
+    jobs = sum(1 for line in text.splitlines() if DATE_RANGE.search(line))
+    return Signals(len(text), jobs, english)
+
+
+def _load(value):
+    if not value:
+        return {}
+    if value.lstrip().startswith('{'):
+        return json.loads(value)
+    with open(value) as f:
+        return json.load(f)
+
+
+def merge_config(overrides):
+    """DEFAULT_CONFIG with `overrides` merged over its tiers and tasks."""
+    config = {section: dict(DEFAULT_CONFIG[section]) for section in ('tiers', 'tasks')}
+    for section in config:
+        for name, entry in (overrides.get(section) or {}).items():
+            config[section][name] = {**config[section].get(name, {}), **entry}
+    for task, entry in config['tasks'].items():
+        unknown = [tier for tier in entry.get('tiers', [])
+                   + [rule['tier'] for rule in entry.get('rules', [])] if tier not in config['tiers']]
+        if not entry.get('tiers') or unknown:
+            raise ValueError(f'MODEL_ROUTES: task {task!r} needs tiers from {sorted(config["tiers"])}')
+    return config
+
+
+class ModelRouter:
+    """Picks a tier per call and escalates on invalid replies.
+
+    `observe(task, tier, seconds, cost_usd, outcome)` is called after every
+    model call; outcome is 'accepted', 'escalated' (invalid, retried a tier
+    up) or 'invalid' (invalid on the last tier, raised to the caller).
+    """
+
+    def __init__(self, config=None, observe=None):
+        self.config = merge_config(config or {})
+        self.observe = observe
+        self._prices = {tier['model']: tier['prices'] for tier in self.config['tiers'].values()}
+
+    @classmethod
+    def from_env(cls, observe=None):
+        return cls(_load(os.environ.get('MODEL_ROUTES')), observe=observe)
+
+    signals = staticmethod(signals)
+
+    def model(self, tier):
+        return self.config['tiers'][tier]['model']
+
+    def cost(self, model, usage):
+        """Estimated USD cost of a call, from its token usage."""
+        input_price, output_price = self._prices.get(model) or (
+            self.config['tiers']['haiku' if 'haiku' in model else 'sonnet']['prices'])
+        return (usage.input_tokens * input_price + usage.output_tokens * output_price) / 1_000_000
+
+    def plan(self, task, signals):
+        """The tiers a call may use, in order: the starting tier and those above it."""
+        entry = self.config['tasks'][task]
+        tiers = entry['tiers']
+        start = 0
+        for rule in entry.get('rules', ()):
+            if (signals.chars >= rule.get('chars', 0) and signals.jobs >= rule.get('jobs', 0)
+                    and signals.english == rule.get('english', signals.english)):
+                start = max(start, tiers.index(rule['tier']) if rule['tier'] in tiers else 0)
+        return tiers[start:]
+
+    async def run(self, task, signals, call, parse):
+        """Await `call(model)` on each tier in turn until `parse(response)` accepts the reply.
+
+        `parse` returns the result or raises ValueError (json.JSONDecodeError,
+        InvalidReply); the last tier's error is raised if every tier failed.
+        """
+        tiers = self.plan(task, signals)
+        for i, tier in enumerate(tiers):
+            model = self.model(tier)
+            started = time.perf_counter()
+            response = await call(model)
+            seconds = time.perf_counter() - started
+            try:
+                result = parse(response)
+            except ValueError:
+                last = i == len(tiers) - 1
+                self._observe(task, tier, seconds, response, 'invalid' if last else 'escalated')
+                if last:
+                    raise
+                continue
+            self._observe(task, tier, seconds, response, 'accepted')
+            return result
+
+    def _observe(self, task, tier, seconds, response, outcome):
+        if self.observe is not None:
+            self.observe(task, tier, seconds, self.cost(self.model(tier), response.usage), outcome)
@@ -0,0 +1,47 @@
+"""
+Read-only page content packed into one bytes object.
+
+The SEO, comparison, role and blog pages are ~100KB of nested dicts, tuples
+and strings. Kept as Python objects they don't stay shared between forked
+gunicorn workers: reading a string to render it writes its reference count,
+so every memory page holding content ends up copied into every worker.
+
+PageTable marshals each page once, when app.py is imported (in the gunicorn
+master, with preload), into a single immutable bytes blob plus an index of
+offsets. A lookup unpacks just that page into fresh objects the request owns
+and drops afterwards; the blob is never written to, so its pages stay shared.
+Unpacking a page takes a few microseconds.
+"""
+
+import marshal
+from collections.abc import Mapping
+
+
+class PageTable(Mapping):
+    """An immutable slug -> page mapping, iterated in the order it was built."""
+
+    __slots__ = ('_blob', '_index')
+
+    def __init__(self, pages):
+        chunks, index, offset = [], {}, 0
+        for slug, page in pages.items():
+            data = marshal.dumps(page)
+            chunks.append(data)
+            index[slug] = (offset, offset + len(data))
+            offset += len(data)
+        self._blob = b''.join(chunks)
+        self._index = index
+
+    @classmethod
+    def from_list(cls, pages, key='slug'):
+        return cls({page[key]: page for page in pages})
+
+    def __getitem__(self, slug):
+        start, end = self._index[slug]
+        return marshal.loads(memoryview(self._blob)[start:end])
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self):
+        return len(self._index)
@@ -0,0 +1,311 @@
+"""
+Local ledger of Stripe Checkout payments for CVRoast.
+
+Stripe's checkout.session.completed webhook records each payment here, so
+/api/full-review can confirm a payment with a primary-key lookup instead of
+a round trip to the Stripe API. Sessions the webhook has not delivered yet
+are fetched from Stripe once and recorded too.
+
+The ledger is a SQLite file shared by every gunicorn worker. It is also the
+one place that knows a session has been redeemed, so a review can't be
+generated twice by hitting two different workers, whether the review was
+started by the webhook or by the browser on /success.
+
+The customer's email address is only needed to send the review; purge_emails()
+clears it from payments older than the retention window.
+
+Finished reviews are kept per session for a while (save_review/review), so
+refreshing /success shows the same review again instead of an error.
+
+Rewrites started speculatively at checkout are kept here too, with the
+daily budget counters they are started against, so whichever worker serves
+the paid review can use one, and the budget holds across workers.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS payments (
+    session_id     TEXT PRIMARY KEY,
+    resume_id      TEXT,
+    payment_status TEXT NOT NULL,
+    amount_total   INTEGER,
+    currency       TEXT,
+    email          TEXT,
+    source         TEXT NOT NULL,
+    recorded_at    REAL NOT NULL,
+    redeemed_at    REAL
+)
+"""
+
+REVIEWS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS reviews (
+    session_id TEXT PRIMARY KEY,
+    review     TEXT NOT NULL,
+    created_at REAL NOT NULL
+)
+"""
+
+SPECULATIVE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS speculative (
+    resume_id   TEXT PRIMARY KEY,
+    started_at  REAL NOT NULL,
+    finished_at REAL,
+    result      TEXT,
+    cost        REAL NOT NULL DEFAULT 0
+)
+"""
+
+SPECULATIVE_DAILY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS speculative_daily (
+    day           TEXT PRIMARY KEY,
+    started       INTEGER NOT NULL DEFAULT 0,
+    used          INTEGER NOT NULL DEFAULT 0,
+    abandoned     INTEGER NOT NULL DEFAULT 0,
+    skipped       INTEGER NOT NULL DEFAULT 0,
+    used_usd      REAL NOT NULL DEFAULT 0,
+    abandoned_usd REAL NOT NULL DEFAULT 0
+)
+"""
+
+SPECULATIVE_DAILY_COLUMNS = ('started', 'used', 'abandoned', 'skipped', 'used_usd', 'abandoned_usd')
+
+Speculative = namedtuple('Speculative', 'started_at finished result cost')   # result is None if it failed
+
+COLUMNS = ('session_id', 'resume_id', 'payment_status', 'amount_total', 'currency', 'email',
+           'source', 'recorded_at', 'redeemed_at')
+
+
+def session_fields(session):
+    """Pull the fields the ledger keeps out of a Stripe Checkout Session (object or dict)."""
+    details = session.get('customer_details') or {}
+    return {
+        'session_id': session['id'],
+        'resume_id': session.get('client_reference_id'),
+        'payment_status': session.get('payment_status') or 'unpaid',
+        'amount_total': session.get('amount_total'),
+        'currency': session.get('currency'),
+        'email': details.get('email'),
+    }
+
+
+class PaymentLedger:
+    def __init__(self, path):
+        self.path = path
+        self._conn = None
+        self._conn_pid = None
+        self._lock = threading.Lock()
+        self._paid = {}     # session_id -> row; paid rows never change, so they are cached
+        self._reviews = {}  # session_id -> (created_at, review); a stored review never changes either
+
+    def _db(self):
+        # One connection per process: SQLite connections must not cross a fork
+        if self._conn is None or self._conn_pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(SCHEMA)
+            conn.execute(REVIEWS_SCHEMA)
+            conn.execute(SPECULATIVE_SCHEMA)
+            conn.execute(SPECULATIVE_DAILY_SCHEMA)
+            self._conn, self._conn_pid = conn, os.getpid()
+            self._paid = {}
+            self._reviews = {}
+        return self._conn
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            return self._db().execute(sql, params)
+
+    @contextmanager
+    def _transaction(self):
+        """The connection inside a write transaction: no other worker writes until it ends."""
+        with self._lock:
+            db = self._db()
+            db.execute('BEGIN IMMEDIATE')
+            try:
+                yield db
+            except BaseException:
+                db.execute('ROLLBACK')
+                raise
+            db.execute('COMMIT')
+
+    def record(self, session, source):
+        """Insert or update a payment from a Stripe session. Returns the stored row.
+
+        A session only ever moves towards 'paid', so an older event arriving
+        late can't undo a payment.
+        """
+        fields = session_fields(session)
+        self._execute(
+            'INSERT INTO payments (session_id, resume_id, payment_status, amount_total, currency, email,'
+            ' source, recorded_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)'
+            ' ON CONFLICT(session_id) DO UPDATE SET'
+            "  payment_status = CASE WHEN payments.payment_status = 'paid' THEN 'paid'"
+            '                   ELSE excluded.payment_status END,'
+            '  resume_id = COALESCE(payments.resume_id, excluded.resume_id),'
+            '  amount_total = COALESCE(excluded.amount_total, payments.amount_total),'
+            '  currency = COALESCE(excluded.currency, payments.currency),'
+            '  email = COALESCE(excluded.email, payments.email)',
+            (fields['session_id'], fields['resume_id'], fields['payment_status'], fields['amount_total'],
+             fields['currency'], fields['email'], source, time.time()),
+        )
+        self._paid.pop(fields['session_id'], None)
+        return self.get(fields['session_id'])
+
+    def get(self, session_id):
+        """Return the payment as a dict, or None if the ledger hasn't seen it."""
+        row = self._paid.get(session_id)
+        if row is not None:
+            return row
+        found = self._execute(f"SELECT {', '.join(COLUMNS)} FROM payments WHERE session_id = ?",
+                              (session_id,)).fetchone()
+        if found is None:
+            return None
+        row = dict(zip(COLUMNS, found))
+        if row['payment_status'] == 'paid':
+            self._paid[session_id] = row
+        return row
+
+    def redeem(self, session_id):
+        """Mark a paid session as used. False if it was already redeemed (by any worker)."""
+        cursor = self._execute(
+            "UPDATE payments SET redeemed_at = ? WHERE session_id = ? AND payment_status = 'paid'"
+            ' AND redeemed_at IS NULL',
+            (time.time(), session_id),
+        )
+        return cursor.rowcount == 1
+
+    def redeemed_at(self, session_id):
+        """When the session was redeemed, read from the database (get() may hold an older copy)."""
+        found = self._execute('SELECT redeemed_at FROM payments WHERE session_id = ?', (session_id,)).fetchone()
+        return found[0] if found else None
+
+    def release(self, session_id):
+        """Undo redeem() so the customer can retry after a failed rewrite."""
+        self._execute('UPDATE payments SET redeemed_at = NULL WHERE session_id = ?', (session_id,))
+
+    def purge_emails(self, older_than):
+        """Forget the email addresses of payments recorded before `older_than`."""
+        self._execute('UPDATE payments SET email = NULL WHERE email IS NOT NULL AND recorded_at < ?', (older_than,))
+        for session_id, row in list(self._paid.items()):
+            if row['recorded_at'] < older_than:
+                del self._paid[session_id]
+
+    def save_review(self, session_id, review):
+        """Keep the finished review of a session, for page reloads."""
+        now = time.time()
+        self._execute('INSERT OR REPLACE INTO reviews (session_id, review, created_at) VALUES (?, ?, ?)',
+                      (session_id, json.dumps(review), now))
+        self._reviews[session_id] = (now, review)
+
+    def review(self, session_id, newer_than=0):
+        """The stored review of a session, or None. Served from memory after the first lookup."""
+        cached = self._reviews.get(session_id)
+        if cached is None:
+            found = self._execute('SELECT created_at, review FROM reviews WHERE session_id = ?',
+                                  (session_id,)).fetchone()
+            if found is None:
+                return None
+            cached = self._reviews[session_id] = (found[0], json.loads(found[1]))
+        created_at, review = cached
+        return review if created_at >= newer_than else None
+
+    def purge_reviews(self, older_than):
+        """Forget reviews stored before `older_than`."""
+        self._execute('DELETE FROM reviews WHERE created_at < ?', (older_than,))
+        for session_id, (created_at, _) in list(self._reviews.items()):
+            if created_at < older_than:
+                del self._reviews[session_id]
+
+    def _speculative_day(self, db):
+        day = time.strftime('%Y-%m-%d', time.gmtime())
+        db.execute('INSERT OR IGNORE INTO speculative_daily (day) VALUES (?)', (day,))
+        return day
+
+    def _count_speculative(self, db, **amounts):
+        """Add to today's speculative counters, inside a transaction."""
+        day = self._speculative_day(db)
+        db.execute(f"UPDATE speculative_daily SET {', '.join(f'{name} = {name} + ?' for name in amounts)}"
+                   ' WHERE day = ?', (*amounts.values(), day))
+
+    def start_speculative(self, resume_id, budget_usd, default_cost):
+        """Claim a speculative rewrite of `resume_id` if today's budget allows it.
+
+        Every rewrite still pending could end up abandoned, so a new one only
+        starts while today's abandoned spend plus the cost of those pending
+        stays under `budget_usd`. An unfinished rewrite counts at the average
+        cost of today's settled ones (`default_cost` before there are any).
+        Returns 'started', 'skipped' (over budget) or None if one is already
+        stored for the resume.
+        """
+        with self._transaction() as db:
+            if db.execute('SELECT 1 FROM speculative WHERE resume_id = ?', (resume_id,)).fetchone():
+                return None
+            day = self._speculative_day(db)
+            used, abandoned, used_usd, abandoned_usd = db.execute(
+                'SELECT used, abandoned, used_usd, abandoned_usd FROM speculative_daily WHERE day = ?',
+                (day,)).fetchone()
+            settled = used + abandoned
+            guess = (used_usd + abandoned_usd) / settled if settled else default_cost
+            pending = db.execute('SELECT TOTAL(CASE WHEN finished_at IS NULL THEN ? ELSE cost END) FROM speculative',
+                                 (guess,)).fetchone()[0]
+            if abandoned_usd + pending + guess > budget_usd:
+                self._count_speculative(db, skipped=1)
+                return 'skipped'
+            db.execute('INSERT INTO speculative (resume_id, started_at) VALUES (?, ?)', (resume_id, time.time()))
+            self._count_speculative(db, started=1)
+            return 'started'
+
+    def finish_speculative(self, resume_id, result, cost):
+        """Store a speculative rewrite once it is done (`result` None if it failed) with its measured cost."""
+        self._execute('UPDATE speculative SET finished_at = ?, result = ?, cost = ? WHERE resume_id = ?',
+                      (time.time(), None if result is None else json.dumps(result), cost, resume_id))
+
+    def take_speculative(self, resume_id):
+        """The Speculative of `resume_id`, or None.
+
+        A finished one is removed and counted as used, or as abandoned if it
+        failed: its spend bought nothing, so it is no hit.
+        """
+        with self._transaction() as db:
+            found = db.execute('SELECT started_at, finished_at, result, cost FROM speculative WHERE resume_id = ?',
+                               (resume_id,)).fetchone()
+            if found is None:
+                return None
+            started_at, finished_at, result, cost = found
+            if finished_at is None:
+                return Speculative(started_at, False, None, cost)
+            db.execute('DELETE FROM speculative WHERE resume_id = ?', (resume_id,))
+            if result is None:
+                self._count_speculative(db, abandoned=1, abandoned_usd=cost)
+            else:
+                self._count_speculative(db, used=1, used_usd=cost)
+        return Speculative(started_at, True, None if result is None else json.loads(result), cost)
+
+    def abandon_speculative(self, older_than):
+        """Drop speculative rewrites started before `older_than`, counted as abandoned. Returns their costs."""
+        with self._transaction() as db:
+            costs = [cost for cost, in db.execute('SELECT cost FROM speculative WHERE started_at < ?',
+                                                  (older_than,))]
+            if costs:
+                db.execute('DELETE FROM speculative WHERE started_at < ?', (older_than,))
+                self._count_speculative(db, abandoned=len(costs), abandoned_usd=sum(costs))
+        return costs
+
+    def speculative_stats(self, days=7):
+        """Pending speculative rewrites and the counters of the last `days` days, across all workers."""
+        pending = self._execute('SELECT COUNT(*) FROM speculative').fetchone()[0]
+        rows = self._execute(f"SELECT day, {', '.join(SPECULATIVE_DAILY_COLUMNS)} FROM speculative_daily"
+                             ' ORDER BY day DESC LIMIT ?', (days,)).fetchall()
+        return {'pending': pending,
+                'daily_breakdown': {day: dict(zip(SPECULATIVE_DAILY_COLUMNS, counts)) for day, *counts in rows}}
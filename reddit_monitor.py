@@ -1,17 +1,37 @@
 """
 Reddit Monitor Bot for CVRoast
-Runs every 30 minutes via Railway cron.
+Runs every 30 minutes via Railway cron, or continuously with --daemon.
 
 Scans resume-related subreddits for people asking for help,
 replies with genuinely helpful advice + subtle CVRoast mention.
 
-Stateless — checks own comment history to avoid double-replying.
+Every post looked at is recorded with its verdict in a local SQLite store
+(redditstore.SeenPosts), so later runs skip it without any API or model
+calls. Our own recent comments are synced into the store at the start of
+each run (one listing call) instead of walking every candidate post's
+comment tree. Subreddit listings are fetched concurrently, each thread with
+its own PRAW client, under one shared request budget.
+
+The model is asked in two stages: one cheap batched call scores every new
+candidate of the run for how much it needs resume advice, then replies are
+written, in parallel, only for the best MAX_REPLIES_PER_RUN of them.
+Before that, candidates are ranked without any model call: keyword relevance
+(one regex pass over the post, weighted by keyword and by title vs body),
+decayed by the post's age.
 """
 
+import argparse
+import heapq
+import json
 import os
+import re
+import signal
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import praw
 import anthropic
+from redditstore import SeenPosts
 
 # --- Config ---
 SUBREDDITS = [
@@ -24,18 +44,40 @@ SUBREDDITS = [
     'recruitinghell',     # frustrated job seekers
 ]
 
-KEYWORDS = [
-    'resume review', 'resume help', 'resume feedback', 'cv review',
-    'resume advice', 'resume tips', 'rewrite my resume', 'resume roast',
-    'ats score', 'ats friendly', 'applicant tracking',
-    'not getting interviews', 'no callbacks', 'no responses',
-    'resume critique', 'rate my resume', 'fix my resume',
-    'resume template', 'cv help', 'cv feedback',
-]
+# Keyword -> weight: 3 = asking for a review, 2 = asking for help, 1 = a symptom of a weak resume
+KEYWORDS = {
+    'resume review': 3, 'resume feedback': 3, 'resume critique': 3, 'resume roast': 3,
+    'rate my resume': 3, 'fix my resume': 3, 'rewrite my resume': 3, 'cv review': 3, 'cv feedback': 3,
+    'resume help': 2, 'resume advice': 2, 'resume tips': 2, 'resume template': 2, 'cv help': 2,
+    'ats score': 2, 'ats friendly': 2, 'applicant tracking': 2,
+    'not getting interviews': 1, 'no callbacks': 1, 'no responses': 1,
+}
+TITLE_WEIGHT = 2              # a keyword in the title counts double
+FRESHNESS_HALF_LIFE_HOURS = 4
 
 MAX_REPLIES_PER_RUN = 3
+TRIAGE_MODEL = "claude-haiku-4-5-20251001"
+TRIAGE_BATCH = 25             # posts per classification call
+TRIAGE_BODY_CHARS = 300
+MIN_TRIAGE_SCORE = 6          # out of 10; lower-scored posts are recorded as ai_skip
 POST_MAX_AGE_HOURS = 12
+LISTING_LIMIT = 20
+OWN_COMMENTS_LIMIT = 100      # one listing page
+FETCH_WORKERS = 4
+# Reddit allows 100 requests/minute per OAuth client; stay well inside it
+REQUESTS_PER_MINUTE = 60
+REQUEST_BURST = 20
+REPLY_INTERVAL_SECONDS = 30   # between live replies
+# Daemon mode (--daemon)
+STREAM_POLL_SECONDS = 60
+STREAM_LIMIT = 100            # posts per poll of the merged listing
+REPLIES_PER_HOUR = 6          # what the 30-minute cron allows
+REPLY_BURST = 2
+REPLY_ATTEMPTS = 3            # failed reply calls before a queued candidate is dropped
+REPLY_BACKOFF_SECONDS = 5     # pause after a failed reply call, doubled per failure up to STREAM_POLL_SECONDS
+OWN_COMMENTS_SYNC_SECONDS = 3600
 DRY_RUN = os.environ.get('REDDIT_DRY_RUN', 'true').lower() == 'true'
+STATE_DB = os.environ.get('REDDIT_STATE_DB', 'reddit_state.db')
 
 
 def get_reddit():
@@ -52,25 +94,182 @@ def get_ai():
     return anthropic.Anthropic(api_key=os.environ['ANTHROPIC_API_KEY'])
 
 
-def matches_keywords(title, selftext):
-    text = (title + ' ' + selftext).lower()
-    return any(kw in text for kw in KEYWORDS)
+def keyword_pattern(phrases):
+    """One regex matching any of the phrases as whole words, in a single pass over the text.
 
+    The alternation is factored into a trie, 'resume (?:critique|feedback|...)',
+    so at each position the engine follows one branch per character instead
+    of trying every phrase in turn. Any run of whitespace matches a space.
+    """
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for ch in phrase:
+            node = node.setdefault(ch, {})
+        node[''] = None      # a phrase ends here
 
-def already_replied(post, username):
-    """Check if we already commented on this post. Stateless."""
-    try:
-        post.comments.replace_more(limit=0)
-        for comment in post.comments.list():
-            if comment.author and comment.author.name == username:
+    def branch(node):
+        alternatives = [(r'\s+' if ch == ' ' else re.escape(ch)) + branch(child)
+                        for ch, child in sorted(node.items()) if ch]
+        if not alternatives:
+            return ''
+        body = alternatives[0] if len(alternatives) == 1 else '(?:' + '|'.join(alternatives) + ')'
+        return f'(?:{body})?' if '' in node else body
+
+    return re.compile(r'(?<![a-z0-9])' + branch(trie) + r'(?![a-z0-9])')
+
+
+KEYWORD_PATTERN = keyword_pattern(KEYWORDS)
+
+
+def keyword_relevance(title, selftext):
+    """Sum of the weights of the distinct keywords in a post; 0 if there are none."""
+    found = {}
+    for text, weight in ((selftext, 1), (title, TITLE_WEIGHT)):
+        for match in KEYWORD_PATTERN.findall(text.lower()):
+            found[' '.join(match.split())] = weight
+    return sum(KEYWORDS[keyword] * weight for keyword, weight in found.items())
+
+
+def matches_keywords(title, selftext):
+    return keyword_relevance(title, selftext) > 0
+
+
+def candidate_rank(relevance, created_utc, now=None):
+    """Keyword relevance halved every FRESHNESS_HALF_LIFE_HOURS of the post's age."""
+    age_hours = max(0.0, (now or time.time()) - created_utc) / 3600
+    return relevance * 0.5 ** (age_hours / FRESHNESS_HALF_LIFE_HOURS)
+
+
+class RateBudget:
+    """Token bucket shared by every thread: `per_minute` requests, in bursts of up to `burst`."""
+
+    def __init__(self, per_minute, burst=1):
+        self.rate = per_minute / 60
+        self.capacity = burst
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def try_acquire(self):
+        with self.lock:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
                 return True
-    except Exception:
-        pass
-    return False
+            return False
+
+    def wait_time(self):
+        """Seconds until a token is available; 0 if one is now."""
+        with self.lock:
+            self._refill()
+            return max(0.0, (1 - self.tokens) / self.rate)
+
+
+def sync_own_replies(reddit, username, store, budget):
+    """Mark every post we recently commented on as replied, from one page of our comment history."""
+    budget.acquire()
+    synced = 0
+    for comment in reddit.redditor(username).comments.new(limit=OWN_COMMENTS_LIMIT):
+        # link_id is the post's fullname, 't3_<id>'
+        store.record(comment.link_id.split('_', 1)[-1], 'replied', subreddit=comment.subreddit.display_name,
+                     reason='own comment')
+        synced += 1
+    return synced
+
+
+def fetch_listings(reddit_factory, subreddits, budget, limit=LISTING_LIMIT, workers=FETCH_WORKERS):
+    """New posts of each subreddit, fetched in parallel. Returns [(name, posts)] in subreddit order."""
+    local = threading.local()   # PRAW clients aren't thread-safe: one per fetch thread
+
+    def fetch(name):
+        if getattr(local, 'reddit', None) is None:
+            local.reddit = reddit_factory()
+        budget.acquire()
+        try:
+            return name, list(local.reddit.subreddit(name).new(limit=limit))
+        except Exception as e:
+            print(f"  Error scanning r/{name}: {e}")
+            return name, []
+
+    with ThreadPoolExecutor(max_workers=min(workers, len(subreddits)) or 1) as pool:
+        return list(pool.map(fetch, subreddits))
+
+
+def filter_reason(post, relevance, now=None):
+    """Why a post isn't worth a reply, from the listing data alone; None if it is a candidate."""
+    if (now or time.time()) - post.created_utc > POST_MAX_AGE_HOURS * 3600:
+        return 'too old'
+    # Image/link posts have no text body
+    if not post.selftext or len(post.selftext) < 30:
+        return 'no text'
+    if not relevance:
+        return 'no keywords'
+    return None
+
+
+def response_tokens(response):
+    usage = getattr(response, 'usage', None)
+    return (usage.input_tokens + usage.output_tokens) if usage else 0
+
+
+def triage(ai, posts):
+    """Score candidate posts 0-10 for how much they need resume advice, TRIAGE_BATCH per model call.
+
+    Returns (scores, tokens). A batch the model doesn't answer usably scores
+    MIN_TRIAGE_SCORE for each post, leaving the decision to the reply prompt.
+    """
+    scores, tokens = [], 0
+    for start in range(0, len(posts), TRIAGE_BATCH):
+        batch = posts[start:start + TRIAGE_BATCH]
+        listing = '\n\n'.join(f"[{i}] {post.title}\n{post.selftext[:TRIAGE_BODY_CHARS]}"
+                               for i, post in enumerate(batch, 1))
+        batch_scores = {}
+        try:
+            response = ai.messages.create(
+                model=TRIAGE_MODEL,
+                max_tokens=20 + 12 * len(batch),
+                messages=[{
+                    "role": "user",
+                    "content": f"""You screen Reddit posts for a career advisor who only gives resume/CV advice.
+
+Score each post 0-10 for how much its author would benefit from specific advice about their resume or CV.
+10 = asking for resume help or feedback. 0 = about something else (salary, interviews, job searching with no resume component, venting).
+
+Return ONLY JSON, one entry per post: {{"scores": [{{"post": 1, "score": 7}}, ...]}}
+
+Posts:
+
+{listing}"""
+                }]
+            )
+            tokens += response_tokens(response)
+            text = response.content[0].text
+            for item in json.loads(text[text.index('{'):text.rindex('}') + 1])['scores']:
+                batch_scores[int(item['post'])] = int(item['score'])
+        except Exception as e:
+            print(f"  Triage failed, passing the batch to the reply prompt: {e}")
+        scores += [batch_scores.get(i, MIN_TRIAGE_SCORE) for i in range(1, len(batch) + 1)]
+    return scores, tokens
 
 
 def generate_reply(ai, post_title, post_text):
-    """Use Claude Haiku to generate a genuinely helpful, personalized reply."""
+    """Use Claude Haiku to generate a genuinely helpful, personalized reply. Returns (text, tokens)."""
     response = ai.messages.create(
         model="claude-haiku-4-5-20251001",
         max_tokens=350,
@@ -94,75 +293,357 @@ Post title: {post_title}
 Post body: {post_text[:1500]}"""
         }]
     )
-    return response.content[0].text.strip()
+    return response.content[0].text.strip(), response_tokens(response)
 
 
-def main():
-    print(f"=== CVRoast Reddit Monitor {'[DRY RUN]' if DRY_RUN else '[LIVE]'} ===")
-    print(f"Time: {time.strftime('%Y-%m-%d %H:%M UTC', time.gmtime())}")
+def try_generate_reply(ai, post):
+    """generate_reply() for a post, or None if the model call failed. The post is left unrecorded."""
+    try:
+        return generate_reply(ai, post.title, post.selftext)
+    except Exception as e:
+        print(f"  Error writing a reply to {post.id}: {e}")
+        return None
+
+
+def _seen(sub_name, post):
+    return {'subreddit': sub_name, 'title': post.title, 'created_utc': post.created_utc}
+
+
+def _new_stats():
+    return {'scanned': 0, 'known': 0, 'filtered': 0, 'ai_skipped': 0, 'replied': 0, 'ai_tokens': 0}
+
+
+def consider(store, stats, sub_name, post, now):
+    """A new post's candidate rank, or None once it is recorded as filtered."""
+    relevance = keyword_relevance(post.title, post.selftext)
+    reason = filter_reason(post, relevance, now)
+    if reason:
+        stats['filtered'] += 1
+        store.record(post.id, 'filtered', reason=reason, **_seen(sub_name, post))
+        return None
+    return candidate_rank(relevance, post.created_utc, now)
+
+
+def score_candidates(ai, store, stats, candidates):
+    """Triage candidates [(rank, sub_name, post)], best-ranked first, in at most one model call.
+
+    The best-ranked TRIAGE_BATCH without a stored score are classified; those
+    scoring under MIN_TRIAGE_SCORE are recorded as ai_skip. Returns the rest
+    as [(score, rank, sub_name, post)], best first. Candidates past the batch
+    are left out, for a later call.
+    """
+    scores = store.scores(post.id for _, _, post in candidates)
+    unscored = [post for _, _, post in candidates if post.id not in scores][:TRIAGE_BATCH]
+    if unscored:
+        new_scores, tokens = triage(ai, unscored)
+        stats['ai_tokens'] += tokens
+        new_scores = {post.id: score for post, score in zip(unscored, new_scores)}
+        store.record_scores(new_scores)
+        scores.update(new_scores)
+    ranked = []
+    scored = [(scores[post.id], rank, sub_name, post) for rank, sub_name, post in candidates if post.id in scores]
+    for score, rank, sub_name, post in sorted(scored, key=lambda item: (-item[0], -item[1])):
+        if score < MIN_TRIAGE_SCORE:
+            stats['ai_skipped'] += 1
+            store.record(post.id, 'ai_skip', reason=f'triage {score}/10', **_seen(sub_name, post))
+        else:
+            ranked.append((score, rank, sub_name, post))
+    return ranked
+
+
+def deliver(store, stats, budget, sub_name, post, reply_text, tokens, dry_run):
+    """Post (or preview) a generated reply and record the verdict.
+
+    True if it counts as a reply, False if the model skipped the post, None
+    if posting it failed (nothing is recorded then).
+    """
+    stats['ai_tokens'] += tokens
+    seen = _seen(sub_name, post)
+    if reply_text.strip() == 'SKIP':
+        stats['ai_skipped'] += 1
+        store.record(post.id, 'ai_skip', **seen)
+        print(f"  SKIP (AI): r/{sub_name} — {post.title[:60]}")
+        return False
+
+    if dry_run:
+        print(f"\n  [DRY RUN] r/{sub_name}: {post.title[:70]}")
+        print(f"  Reply preview: {reply_text[:200]}...")
+        store.record(post.id, 'dry_run', **seen)
+    else:
+        try:
+            budget.acquire()
+            post.reply(reply_text)
+            print(f"  REPLIED r/{sub_name}: {post.title[:70]}")
+        except Exception as e:
+            print(f"  ERROR replying: {e}")
+            return None
+        store.record(post.id, 'replied', **seen)
+    stats['replied'] += 1
+    return True
+
+
+def run(reddit_factory, ai, store, username, dry_run=DRY_RUN):
+    """One scan: fetch the listings, reply to up to MAX_REPLIES_PER_RUN new candidates. Returns counts."""
+    budget = RateBudget(REQUESTS_PER_MINUTE, REQUEST_BURST)
+    reddit = reddit_factory()
+    store.purge()
+    stats = _new_stats()
+    try:
+        stats['synced'] = sync_own_replies(reddit, username, store, budget)
+    except Exception as e:
+        print(f"  Error reading own comments: {e}")
+
+    posts, ids = [], set()
+    for sub_name, listing in fetch_listings(reddit_factory, SUBREDDITS, budget):
+        for post in listing:
+            if post.id not in ids:   # crossposts show up in several subreddits
+                ids.add(post.id)
+                posts.append((sub_name, post))
+    stats['scanned'] = len(posts)
+    known = store.verdicts(ids, include_dry_run=dry_run)
+
+    now = time.time()
+    candidates = []
+    for sub_name, post in posts:
+        if post.id in known:
+            stats['known'] += 1
+            continue
+        rank = consider(store, stats, sub_name, post, now)
+        if rank is not None:
+            candidates.append((rank, sub_name, post))
+    candidates.sort(key=lambda item: -item[0])
+
+    # Stage 1: one classification call for the best-ranked new candidates
+    ranked = [(sub_name, post) for _, _, sub_name, post in score_candidates(ai, store, stats, candidates)]
+    # Candidates left over past MAX_REPLIES_PER_RUN keep their score and compete again next run
+
+    # Stage 2: replies for the best candidates, written in parallel; backfill for any the model SKIPs
+    while ranked and stats['replied'] < MAX_REPLIES_PER_RUN:
+        room = MAX_REPLIES_PER_RUN - stats['replied']
+        picked, ranked = ranked[:room], ranked[room:]
+        with ThreadPoolExecutor(max_workers=len(picked)) as pool:
+            replies = list(pool.map(lambda item: try_generate_reply(ai, item[1]), picked))
+        if all(reply is None for reply in replies):
+            break   # the model API is failing; unrecorded candidates compete again next run
+
+        for (sub_name, post), reply in zip(picked, replies):
+            if reply is None:
+                continue
+            reply_text, tokens = reply
+            if deliver(store, stats, budget, sub_name, post, reply_text, tokens, dry_run) and not dry_run:
+                time.sleep(REPLY_INTERVAL_SECONDS)  # Respect rate limits
+
+    return stats
+
+
+class StreamMonitor:
+    """Daemon mode: follow the merged new-post listing of SUBREDDITS and reply as the reply budget allows.
+
+    Each poll is one request for the posts newer than the checkpoint (the
+    newest fullname seen). New candidates go into a priority queue by
+    candidate rank; since every rank decays by the same factor over time,
+    the queue's order never goes stale. Whenever the reply token bucket
+    (REPLIES_PER_HOUR, bursts of REPLY_BURST) has a token, the best queued
+    candidates are triaged in one call and the best of those gets a reply.
+    The checkpoint and the queued post ids are saved after every poll, so a
+    restart picks up where it stopped without re-listing or re-queueing.
+    """
+
+    CHECKPOINT_KEY = 'stream_checkpoint'
+
+    def __init__(self, reddit, ai, store, username, dry_run=DRY_RUN):
+        self.reddit = reddit
+        self.ai = ai
+        self.store = store
+        self.username = username
+        self.dry_run = dry_run
+        self.budget = RateBudget(REQUESTS_PER_MINUTE, REQUEST_BURST)
+        self.replies = RateBudget(REPLIES_PER_HOUR / 60, REPLY_BURST)
+        self.pending = []      # heap of (-rank, post_id): candidates not triaged yet
+        self.ready = []        # heap of (-score, -rank, post_id): triaged, worth a reply
+        self.queued = {}       # post_id -> (rank, sub_name, post), for both heaps
+        self.failures = {}     # post_id -> failed reply calls
+        self.backoff = 0.0     # seconds paused after the last failed reply call, 0 after a success
+        self.retry_at = 0.0    # no reply calls before this time
+        self.checkpoint = store.get_state(self.CHECKPOINT_KEY)
+        self.stats = _new_stats()
+        self.synced_at = 0.0
+
+    def restore(self):
+        """Re-queue the candidates queued when the checkpoint was saved (one request)."""
+        fullnames = (self.checkpoint or {}).get('queued') or []
+        if not fullnames:
+            return
+        self.budget.acquire()
+        try:
+            self._consider_all(list(self.reddit.info(fullnames=fullnames[:100])))
+        except Exception as e:
+            print(f"  Error restoring queued candidates: {e}")
+
+    def fetch_new(self):
+        """Posts newer than the checkpoint, oldest first, from one merged listing request."""
+        self.budget.acquire()
+        listing = self.reddit.subreddit('+'.join(SUBREDDITS)).new(limit=STREAM_LIMIT)
+        fresh = []
+        for post in listing:
+            if self.checkpoint and (post.fullname == self.checkpoint['last']
+                                    or post.created_utc < self.checkpoint['created_utc']):
+                break
+            fresh.append(post)
+        return fresh[::-1]
+
+    def _consider_all(self, posts):
+        posts = [post for post in posts if post.id not in self.queued]
+        self.stats['scanned'] += len(posts)
+        known = self.store.verdicts((post.id for post in posts), include_dry_run=self.dry_run)
+        now = time.time()
+        for post in posts:
+            if post.id in known:
+                self.stats['known'] += 1
+                continue
+            sub_name = post.subreddit.display_name
+            rank = consider(self.store, self.stats, sub_name, post, now)
+            if rank is not None:
+                self.queued[post.id] = (rank, sub_name, post)
+                heapq.heappush(self.pending, (-rank, post.id))
+
+    def poll(self):
+        fresh = self.fetch_new()
+        self._consider_all(fresh)
+        if fresh:
+            newest = fresh[-1]
+            self.checkpoint = {'last': newest.fullname, 'created_utc': newest.created_utc}
+        self._expire()
+        if self.checkpoint:
+            self.checkpoint['queued'] = [post.fullname for _, _, post in self.queued.values()]
+            self.store.set_state(self.CHECKPOINT_KEY, self.checkpoint)
+        return len(fresh)
+
+    def _expire(self):
+        """Drop queued candidates that have grown too old to reply to."""
+        cutoff = time.time() - POST_MAX_AGE_HOURS * 3600
+        stale = [post_id for post_id, (_, _, post) in self.queued.items() if post.created_utc < cutoff]
+        for post_id in stale:
+            _, sub_name, post = self.queued.pop(post_id)
+            self.failures.pop(post_id, None)
+            self.stats['filtered'] += 1
+            self.store.record(post_id, 'filtered', reason='too old', **_seen(sub_name, post))
+        if stale:
+            self.pending = [item for item in self.pending if item[1] in self.queued]
+            self.ready = [item for item in self.ready if item[2] in self.queued]
+            heapq.heapify(self.pending)
+            heapq.heapify(self.ready)
+
+    def _triage_pending(self):
+        batch = []
+        while self.pending and len(batch) < TRIAGE_BATCH:
+            _, post_id = heapq.heappop(self.pending)
+            if post_id in self.queued:
+                batch.append(self.queued[post_id])
+        triaged = {post.id for _, _, post in batch}
+        for score, rank, _, post in score_candidates(self.ai, self.store, self.stats, batch):
+            heapq.heappush(self.ready, (-score, -rank, post.id))
+            triaged.discard(post.id)
+        for post_id in triaged:   # recorded as ai_skip
+            self.queued.pop(post_id, None)
+
+    def reply_next(self):
+        """If the reply budget allows, reply to the best queued candidate. True if a reply was made."""
+        if self.replies.wait_time() > 0 or not self.queued or time.time() < self.retry_at:
+            return False
+        if self.pending:
+            self._triage_pending()
+        while self.ready:
+            item = heapq.heappop(self.ready)
+            post_id = item[2]
+            if post_id not in self.queued:
+                continue
+            entry = self.queued.pop(post_id)
+            _, sub_name, post = entry
+            reply = try_generate_reply(self.ai, post)
+            delivered = reply and deliver(self.store, self.stats, self.budget, sub_name, post, *reply, self.dry_run)
+            if delivered is None:
+                self._reply_failed(item, entry)
+                return False
+            self.failures.pop(post_id, None)
+            self.backoff = 0.0
+            if delivered:
+                self.replies.try_acquire()
+                return True
+        return False
+
+    def _reply_failed(self, item, entry):
+        """Back off after a failed reply call or post, and queue the candidate again unless it keeps failing."""
+        # Anthropic or Reddit is likely failing: no further calls until retry_at
+        self.backoff = min(STREAM_POLL_SECONDS, max(REPLY_BACKOFF_SECONDS, self.backoff * 2))
+        self.retry_at = time.time() + self.backoff
+        post_id = item[2]
+        failures = self.failures[post_id] = self.failures.get(post_id, 0) + 1
+        if failures < REPLY_ATTEMPTS:
+            self.queued[post_id] = entry
+            heapq.heappush(self.ready, item)
+        else:
+            del self.failures[post_id]
+
+    def step(self):
+        if time.time() - self.synced_at >= OWN_COMMENTS_SYNC_SECONDS:
+            try:
+                sync_own_replies(self.reddit, self.username, self.store, self.budget)
+                self.store.purge()
+            except Exception as e:
+                print(f"  Error reading own comments: {e}")
+            self.synced_at = time.time()
+        try:
+            self.poll()
+        except Exception as e:
+            print(f"  Error polling: {e}")
+        while self.reply_next():
+            pass
 
-    reddit = get_reddit()
-    ai = get_ai()
-    username = os.environ['REDDIT_USERNAME']
+    def next_wait(self):
+        """Seconds to the next poll, earlier if a queued candidate is waiting for a reply token."""
+        if self.ready or self.pending:
+            return min(STREAM_POLL_SECONDS, max(1.0, self.replies.wait_time(), self.retry_at - time.time()))
+        return STREAM_POLL_SECONDS
 
-    replies_this_run = 0
-    scanned = 0
-    skipped_ai = 0
+    def run_forever(self, stop):
+        self.restore()
+        while not stop.is_set():
+            self.step()
+            stop.wait(self.next_wait())
+        return self.stats
 
-    for sub_name in SUBREDDITS:
-        if replies_this_run >= MAX_REPLIES_PER_RUN:
-            break
 
-        try:
-            subreddit = reddit.subreddit(sub_name)
-            for post in subreddit.new(limit=20):
-                if replies_this_run >= MAX_REPLIES_PER_RUN:
-                    break
-
-                scanned += 1
-
-                # Skip old posts
-                if time.time() - post.created_utc > POST_MAX_AGE_HOURS * 3600:
-                    continue
-
-                # Skip posts with no text body (image/link posts)
-                if not post.selftext or len(post.selftext) < 30:
-                    continue
-
-                # Check keywords
-                if not matches_keywords(post.title, post.selftext):
-                    continue
-
-                # Skip if already replied
-                if already_replied(post, username):
-                    continue
-
-                # Generate reply
-                reply_text = generate_reply(ai, post.title, post.selftext)
-
-                if reply_text.strip() == 'SKIP':
-                    skipped_ai += 1
-                    print(f"  SKIP (AI): r/{sub_name} — {post.title[:60]}")
-                    continue
-
-                if DRY_RUN:
-                    print(f"\n  [DRY RUN] r/{sub_name}: {post.title[:70]}")
-                    print(f"  Reply preview: {reply_text[:200]}...")
-                else:
-                    try:
-                        post.reply(reply_text)
-                        print(f"  REPLIED r/{sub_name}: {post.title[:70]}")
-                    except Exception as e:
-                        print(f"  ERROR replying: {e}")
-                        continue
-
-                replies_this_run += 1
-                time.sleep(30)  # Respect rate limits
+def print_stats(stats, started):
+    print(f"\nDone in {time.time() - started:.1f}s. Scanned: {stats['scanned']} | Already seen: {stats['known']} | "
+          f"Filtered: {stats['filtered']} | Replied: {stats['replied']} | AI skipped: {stats['ai_skipped']}")
+    per_reply = f" ({stats['ai_tokens'] // stats['replied']} per reply)" if stats['replied'] else ''
+    print(f"AI tokens: {stats['ai_tokens']}{per_reply}")
 
-        except Exception as e:
-            print(f"  Error scanning r/{sub_name}: {e}")
 
-    print(f"\nDone. Scanned: {scanned} | Replied: {replies_this_run} | AI skipped: {skipped_ai}")
+def main():
+    parser = argparse.ArgumentParser(description='CVRoast Reddit monitor')
+    parser.add_argument('--daemon', action='store_true',
+                        help='follow the subreddits continuously instead of scanning once')
+    args = parser.parse_args()
+
+    mode = 'DRY RUN' if DRY_RUN else 'LIVE'
+    print(f"=== CVRoast Reddit Monitor [{mode}]{' [DAEMON]' if args.daemon else ''} ===")
+    print(f"Time: {time.strftime('%Y-%m-%d %H:%M UTC', time.gmtime())}")
+
+    started = time.time()
+    store = SeenPosts(STATE_DB)
+    if args.daemon:
+        stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+        monitor = StreamMonitor(get_reddit(), get_ai(), store, os.environ['REDDIT_USERNAME'])
+        try:
+            stats = monitor.run_forever(stop)
+        except KeyboardInterrupt:
+            stats = monitor.stats
+    else:
+        stats = run(get_reddit, get_ai(), store, os.environ['REDDIT_USERNAME'])
+    print_stats(stats, started)
 
 
 if __name__ == '__main__':
@@ -5,15 +5,25 @@ Runs once daily (2pm UTC) via Railway cron.
 Posts one value-first article per day to a rotating subreddit.
 Content is genuinely helpful — CVRoast is mentioned casually at the end.
 
-Stateless — checks own recent submissions to avoid double-posting.
+Every submission is recorded in a local ledger (redditstore.PostLedger), so
+deciding whether to post today and where takes no Reddit requests. The
+ledger is reconciled against our own submission history once a week, and
+rebuilt from it when empty. Articles rotate deterministically: the one
+posted longest ago goes next, to its least recently used subreddit.
 """
 
+import heapq
 import os
 import time
-import random
 import praw
+from redditstore import PostLedger
 
 DRY_RUN = os.environ.get('REDDIT_DRY_RUN', 'true').lower() == 'true'
+STATE_DB = os.environ.get('REDDIT_STATE_DB', 'reddit_state.db')
+POST_INTERVAL_HOURS = 20      # at most one post per run of the daily cron
+SUBREDDIT_COOLDOWN_DAYS = 7
+RECONCILE_DAYS = 7
+RECONCILE_LIMIT = 25          # one listing page of our submissions
 
 # --- Content Library ---
 # Each article is genuinely useful. CVRoast mention is natural, not forced.
@@ -317,29 +327,55 @@ def get_reddit():
     )
 
 
-def posted_recently(reddit, username, hours=20):
-    """Check if we posted in the last N hours. Stateless."""
-    try:
-        user = reddit.redditor(username)
-        for submission in user.submissions.new(limit=5):
-            if time.time() - submission.created_utc < hours * 3600:
-                return True
-    except Exception:
-        pass
-    return False
-
-
-def get_recent_subreddits(reddit, username, days=7):
-    """Get subreddits we posted to recently to avoid repeats."""
-    recent = set()
-    try:
-        user = reddit.redditor(username)
-        for submission in user.submissions.new(limit=20):
-            if time.time() - submission.created_utc < days * 86400:
-                recent.add(submission.subreddit.display_name.lower())
-    except Exception:
-        pass
-    return recent
+def reconcile(reddit, username, ledger, limit=RECONCILE_LIMIT):
+    """Copy our recent submissions into the ledger: posts made by hand, or a lost ledger. One request."""
+    synced = 0
+    for submission in reddit.redditor(username).submissions.new(limit=limit):
+        ledger.record(submission.id, submission.title, submission.subreddit.display_name,
+                      submission.created_utc, submission.permalink)
+        synced += 1
+    ledger.set_state('reconciled_at', time.time())
+    return synced
+
+
+def reconcile_due(ledger, now=None):
+    reconciled_at = ledger.get_state('reconciled_at')
+    return not len(ledger) or reconciled_at is None or (now or time.time()) - reconciled_at > RECONCILE_DAYS * 86400
+
+
+class Rotation:
+    """Article/subreddit pairs, least recently used first.
+
+    A heap keyed by (when the article was last posted anywhere, when the
+    pair was last posted, the article's and subreddit's positions in
+    ARTICLES): the article posted longest ago (or never) comes first, then
+    its least recently used subreddit, and ties go by list order, so the
+    choice is deterministic. Each pick is O(log n).
+    """
+
+    def __init__(self, articles, last_used):
+        article_last = {}
+        for (title, _), posted_at in last_used.items():
+            article_last[title] = max(posted_at, article_last.get(title, 0))
+        self.heap = [((article_last.get(article['title'], 0), last_used.get((article['title'], sub.lower()), 0), i, j),
+                      article, sub)
+                     for i, article in enumerate(articles) for j, sub in enumerate(article['subreddits'])]
+        heapq.heapify(self.heap)
+
+    def pick(self, blocked=()):
+        """Remove and return the least recently used (article, subreddit) whose subreddit isn't blocked."""
+        skipped = []
+        try:
+            while self.heap:
+                entry = heapq.heappop(self.heap)
+                if entry[2].lower() in blocked:
+                    skipped.append(entry)
+                    continue
+                return entry[1], entry[2]
+            return None
+        finally:
+            for entry in skipped:
+                heapq.heappush(self.heap, entry)
 
 
 def main():
@@ -348,29 +384,27 @@ def main():
 
     reddit = get_reddit()
     username = os.environ['REDDIT_USERNAME']
+    ledger = PostLedger(STATE_DB)
+
+    if reconcile_due(ledger):
+        try:
+            print(f"Reconciled {reconcile(reddit, username, ledger)} submissions from Reddit")
+        except Exception as e:
+            print(f"Error reconciling the ledger: {e}")
 
     # Don't post if we already posted today
-    if posted_recently(reddit, username, hours=20):
-        print("Already posted in the last 20 hours. Skipping.")
+    last = ledger.last_posted_at()
+    if last and time.time() - last < POST_INTERVAL_HOURS * 3600:
+        print(f"Already posted in the last {POST_INTERVAL_HOURS} hours. Skipping.")
         return
 
-    # Get recently-used subreddits to rotate
-    recent_subs = get_recent_subreddits(reddit, username, days=7)
-    print(f"Recent subs (7d): {recent_subs or 'none'}")
-
-    # Shuffle articles and pick one we can post
-    articles = ARTICLES.copy()
-    random.shuffle(articles)
-
-    for article in articles:
-        # Find a subreddit we haven't posted to recently
-        available_subs = [s for s in article['subreddits']
-                         if s.lower() not in recent_subs]
-
-        if not available_subs:
-            continue
+    # Subreddits posted to recently are skipped
+    recent_subs = ledger.subreddits_since(time.time() - SUBREDDIT_COOLDOWN_DAYS * 86400)
+    print(f"Recent subs ({SUBREDDIT_COOLDOWN_DAYS}d): {recent_subs or 'none'}")
 
-        target_sub = available_subs[0]
+    rotation = Rotation(ARTICLES, ledger.last_used())
+    while (pick := rotation.pick(recent_subs)) is not None:
+        article, target_sub = pick
 
         if DRY_RUN:
             print(f"\n[DRY RUN] Would post to r/{target_sub}:")
@@ -387,7 +421,9 @@ def main():
                 print(f"URL: https://reddit.com{submission.permalink}")
             except Exception as e:
                 print(f"Error posting to r/{target_sub}: {e}")
+                recent_subs.add(target_sub.lower())   # don't try its other articles either
                 continue
+            ledger.record(submission.id, article['title'], target_sub, time.time(), submission.permalink)
 
         return  # One post per run
 
@@ -0,0 +1,184 @@
+"""
+Local state for the Reddit bots.
+
+SeenPosts records every post reddit_monitor has looked at, with its verdict,
+so a run only spends API calls and model calls on posts it hasn't handled:
+
+- 'replied'  we commented (also learned from our own comment history);
+- 'ai_skip'  the model decided the post doesn't need resume advice;
+- 'filtered' dropped by the cheap local checks (age, no body, no keywords);
+- 'dry_run'  a reply was generated but not posted; only dry runs honour it.
+
+Triage scores (how much a candidate needs resume advice, 0-10) are kept
+alongside, so a good candidate that didn't make this run's replies isn't
+classified again by the next run. The daemon mode also keeps its stream
+checkpoint here (get_state/set_state).
+
+PostLedger records reddit_poster's submissions (article, subreddit, time,
+permalink), so the poster decides when and where to post next without
+listing its own submission history. It is reconciled against that history
+now and then, and rebuilt from it when empty.
+
+Both live in one SQLite file (REDDIT_STATE_DB). On Railway, put it on a
+volume so it outlives the cron container; if it is lost, our own comment
+and submission history rebuild the 'replied' rows and the ledger.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+STATE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS state (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+)
+"""
+
+SEEN_SCHEMA = """
+CREATE TABLE IF NOT EXISTS seen_posts (
+    post_id     TEXT PRIMARY KEY,
+    subreddit   TEXT,
+    title       TEXT,
+    created_utc REAL,
+    verdict     TEXT NOT NULL,
+    reason      TEXT,
+    seen_at     REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS triage_scores (
+    post_id   TEXT PRIMARY KEY,
+    score     INTEGER NOT NULL,
+    scored_at REAL NOT NULL
+)
+"""
+
+LEDGER_SCHEMA = """
+CREATE TABLE IF NOT EXISTS submissions (
+    submission_id TEXT PRIMARY KEY,
+    article       TEXT NOT NULL,
+    subreddit     TEXT NOT NULL,
+    posted_at     REAL NOT NULL,
+    permalink     TEXT
+);
+CREATE INDEX IF NOT EXISTS submissions_posted_at ON submissions (posted_at);
+CREATE INDEX IF NOT EXISTS submissions_subreddit ON submissions (subreddit, posted_at)
+"""
+
+VERDICTS = ('replied', 'ai_skip', 'filtered', 'dry_run')
+
+
+class _Store:
+    """One SQLite connection per store (WAL, shared by threads under a lock) plus a key/value state table."""
+
+    SCHEMA = ''
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _db(self):
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(STATE_SCHEMA + ';' + self.SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            return self._db().execute(sql, params)
+
+    def get_state(self, key, default=None):
+        row = self._execute('SELECT value FROM state WHERE key = ?', (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set_state(self, key, value):
+        self._execute('INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)', (key, json.dumps(value)))
+
+
+class SeenPosts(_Store):
+    SCHEMA = SEEN_SCHEMA
+
+    def __init__(self, path, keep_days=30):
+        super().__init__(path)
+        self.keep_days = keep_days
+
+    def verdicts(self, post_ids, include_dry_run=False):
+        """{post_id: verdict} for the posts already handled; dry-run verdicts only if asked."""
+        post_ids = list(post_ids)
+        if not post_ids:
+            return {}
+        marks = ', '.join('?' * len(post_ids))
+        rows = self._execute(f'SELECT post_id, verdict FROM seen_posts WHERE post_id IN ({marks})',
+                             post_ids).fetchall()
+        return {post_id: verdict for post_id, verdict in rows if include_dry_run or verdict != 'dry_run'}
+
+    def record(self, post_id, verdict, subreddit=None, title=None, created_utc=None, reason=None):
+        """Store a verdict. 'replied' is final; anything else can be overwritten by a later run."""
+        if verdict not in VERDICTS:
+            raise ValueError(f'unknown verdict {verdict!r}')
+        self._execute(
+            'INSERT INTO seen_posts (post_id, subreddit, title, created_utc, verdict, reason, seen_at)'
+            ' VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT(post_id) DO UPDATE SET'
+            "  verdict = CASE WHEN seen_posts.verdict = 'replied' THEN 'replied' ELSE excluded.verdict END,"
+            '  reason = excluded.reason, seen_at = excluded.seen_at,'
+            '  subreddit = COALESCE(excluded.subreddit, seen_posts.subreddit),'
+            '  title = COALESCE(excluded.title, seen_posts.title),'
+            '  created_utc = COALESCE(excluded.created_utc, seen_posts.created_utc)',
+            (post_id, subreddit, title, created_utc, verdict, reason, time.time()),
+        )
+
+    def scores(self, post_ids):
+        """{post_id: triage score} for the posts already scored."""
+        post_ids = list(post_ids)
+        if not post_ids:
+            return {}
+        marks = ', '.join('?' * len(post_ids))
+        return dict(self._execute(f'SELECT post_id, score FROM triage_scores WHERE post_id IN ({marks})',
+                                  post_ids).fetchall())
+
+    def record_scores(self, scores):
+        now = time.time()
+        with self._lock:
+            self._db().executemany('INSERT OR REPLACE INTO triage_scores (post_id, score, scored_at) VALUES (?, ?, ?)',
+                                   [(post_id, score, now) for post_id, score in scores.items()])
+
+    def counts(self):
+        return dict(self._execute('SELECT verdict, COUNT(*) FROM seen_posts GROUP BY verdict').fetchall())
+
+    def purge(self):
+        """Forget posts older than keep_days; the listings never show them again."""
+        cutoff = time.time() - self.keep_days * 86400
+        self._execute('DELETE FROM seen_posts WHERE seen_at < ?', (cutoff,))
+        self._execute('DELETE FROM triage_scores WHERE scored_at < ?', (cutoff,))
+
+
+class PostLedger(_Store):
+    SCHEMA = LEDGER_SCHEMA
+
+    def record(self, submission_id, article, subreddit, posted_at, permalink=None):
+        self._execute('INSERT OR REPLACE INTO submissions (submission_id, article, subreddit, posted_at, permalink)'
+                      ' VALUES (?, ?, ?, ?, ?)', (submission_id, article, subreddit, posted_at, permalink))
+
+    def __len__(self):
+        return self._execute('SELECT COUNT(*) FROM submissions').fetchone()[0]
+
+    def last_posted_at(self):
+        return self._execute('SELECT MAX(posted_at) FROM submissions').fetchone()[0]
+
+    def subreddits_since(self, since):
+        """Lower-cased names of the subreddits posted to since `since`."""
+        rows = self._execute('SELECT DISTINCT subreddit FROM submissions WHERE posted_at >= ?', (since,))
+        return {subreddit.lower() for subreddit, in rows.fetchall()}
+
+    def last_used(self):
+        """{(article, lower-cased subreddit): last posted_at} for every pair ever posted."""
+        rows = self._execute('SELECT article, LOWER(subreddit), MAX(posted_at) FROM submissions'
+                             ' GROUP BY article, LOWER(subreddit)').fetchall()
+        return {(article, subreddit): posted_at for article, subreddit, posted_at in rows}
@@ -0,0 +1,296 @@
+"""
+Resume text clean-up and compaction, shared by the free roast and the rewrite.
+
+Text pasted from a PDF, or extracted by pypdf in /api/upload, carries junk
+the model pays for but can't use. clean() removes it:
+
+- Unicode ligatures and look-alikes (NFKC), zero-width and control
+  characters, bullet glyphs (all become "- ");
+- words hyphenated across a line break ("manage-" / "ment") and sentences
+  wrapped onto the next line, except in the contact block at the top and
+  for email addresses and links;
+- page numbers ("Page 2 of 3", "- 2 -") and running headers and footers:
+  short lines repeated a page or more apart, kept where they first appear;
+- two columns read side by side: rows split by a wide gap, with running
+  text on the right, are separated and the left column emitted before the
+  right one.
+
+sections() then finds the headings (experience, education, skills, ...)
+and, under experience, the job entries, each starting at its date range.
+compact() fits the result into a token budget by dropping the least
+informative lines first: references, interests, repeated bullets, bullets
+past the second of older jobs, the tails of other sections and education,
+then the bullets of jobs older than the two most recent. Headings, contact
+details and job titles and dates are never dropped; only if all that still
+doesn't fit is the text cut at a line boundary.
+
+    compacted = resumetext.compact(text, budget_tokens=1500)
+    compacted.text, compacted.raw_tokens, compacted.tokens
+"""
+
+import re
+import unicodedata
+from collections import Counter, namedtuple
+
+# A job heading carries a date range: "2019 — 2023", "03/2019 - present", "Jan 2019 to Dec 2021", "2018 – heute".
+# PDF text extraction turns a dash it has no mapping for into "?" or U+FFFD.
+DATE_RANGE = re.compile(
+    r'\b(?:19|20)\d{2}\b[^\n]{0,4}?\s*(?:-|–|—|\?|\ufffd|\b(?:to|until|bis|au|à|a|al|hasta)\b)\s*[^\n]{0,10}?'
+    r"(?:\b(?:19|20)\d{2}\b"
+    r"|\b(?:present|current|now|today|date|heute|aujourd'hui|actuel|presente|actualidad|hoy|oggi)\b)",
+    re.IGNORECASE)
+
+SECTION_HEADINGS = {
+    'summary': ('profile', 'summary', 'professional summary', 'personal statement', 'about me', 'objective',
+                'career objective', 'personal profile', 'career summary'),
+    'experience': ('experience', 'work experience', 'professional experience', 'employment', 'employment history',
+                   'work history', 'career history', 'relevant experience'),
+    'education': ('education', 'qualifications', 'education and training', 'academic background', 'training'),
+    'skills': ('skills', 'key skills', 'core skills', 'technical skills', 'competencies', 'core competencies'),
+    'certifications': ('certifications', 'certificates', 'licenses', 'licences', 'courses'),
+    'interests': ('interests', 'hobbies', 'hobbies and interests', 'interests and hobbies', 'activities'),
+    'references': ('references', 'referees'),
+}
+HEADING_KIND = {title: kind for kind, titles in SECTION_HEADINGS.items() for title in titles}
+
+BULLET = re.compile(r'^\s*(?:[-*•·‣◦▪▫■□●○►▶➢✓✔–—]|\d{1,2}[.)])\s*')
+BULLET_GLYPHS = re.compile(r'^\s*[•·‣◦▪▫■□●○►▶➢✓✔*]\s*')
+PAGE_NUMBER = re.compile(r'^(?:page\s*)?\d{1,3}(?:\s*(?:of|/)\s*\d{1,3})?$|^[-–—]\s*\d{1,3}\s*[-–—]$',
+                         re.IGNORECASE)
+COLUMN_ROW = re.compile(r'^\s*(\S.*?)(?: {4,}|\t+)(\S.*?)?\s*$')
+COLUMN_RUN = 3
+COLUMN_PROSE_WORDS = 6      # a right-hand cell this long is running text, not a date or place aligned right
+CONTACT = re.compile(r'@|https?://|www\.|\b[\w-]+(?:\.[\w-]+)*\.[a-z]{2,}/|^[\w.-]+\.(?:com|org|net|io|dev|me)$',
+                     re.IGNORECASE)
+CONTACT_BLOCK_LINES = 6     # at most, before the first known heading
+INVISIBLE = dict.fromkeys([*range(0, 9), 11, 12, *range(14, 32), 0x7f, 0xad, 0x200b, 0x200c, 0x200d, 0xfeff])
+HEADER_MAX_CHARS = 80
+HEADER_MIN_GAP = 20         # lines between repeats of a running header or footer
+TRUNCATED = '[...]'
+
+Section = namedtuple('Section', 'kind heading lines')    # heading is None for the contact block at the top
+Compacted = namedtuple('Compacted', 'text raw_tokens clean_tokens tokens trimmed')
+
+
+def estimate_tokens(text):
+    """A rough token count: about four characters per token of English text."""
+    return (len(text) + 3) // 4
+
+
+def _only_dates(cell):
+    """True for a cell that is a date range, perhaps with a place: "2012 - 2015", "London, Jan 2019 - present"."""
+    return DATE_RANGE.search(cell) is not None and len(DATE_RANGE.sub('', cell).split()) <= 2
+
+
+def _is_columns(run):
+    """Whether rows split by a wide gap are two columns side by side, not titles with their details aligned right.
+
+    It takes COLUMN_RUN rows or more, running text in the right column and
+    no right cell that is just dates.
+    """
+    rights = [right for _, right in run if right]
+    return (len(run) >= COLUMN_RUN and not any(_only_dates(right) for right in rights)
+            and any(len(right.split()) >= COLUMN_PROSE_WORDS for right in rights))
+
+
+def _split_columns(lines):
+    """Lines with two columns read side by side put back in reading order.
+
+    A run of rows split by a wide gap that _is_columns() is a two-column
+    layout: its left column comes out first. Inside a run, a row whose right
+    column is empty still belongs to it. Any other run is titles with their
+    dates or place aligned right, and each row stays together.
+    """
+    out, run = [], []
+    for line in lines + ['']:
+        row = COLUMN_ROW.match(line.strip('\n'))
+        if row and (row.group(2) or run):
+            run.append((row.group(1), row.group(2)))
+            continue
+        if _is_columns(run):
+            out += [left for left, _ in run] + [right for _, right in run if right]
+        else:
+            out += [f'{left} | {right}' if right else left for left, right in run]
+        run = []
+        out.append(line)
+    return out[:-1]
+
+
+def _is_heading(line):
+    return heading_kind(line) is not None
+
+
+def heading_kind(line):
+    """The section kind of a heading line ('other' for an unknown all-caps one), or None."""
+    text = line.strip().rstrip(':').strip()
+    if not text or len(text) > 40:
+        return None
+    kind = HEADING_KIND.get(text.lower().replace('&', 'and'))
+    if kind:
+        return kind
+    if text.isupper() and len(text) >= 5 and len(text.split()) <= 4 and not any(c.isdigit() for c in text):
+        return 'other'
+    return None
+
+
+def clean(text):
+    """Resume text with PDF-extraction junk removed; see the module docstring."""
+    text = unicodedata.normalize('NFKC', text).translate(INVISIBLE).replace('\r\n', '\n').replace('\r', '\n')
+    lines = [line.rstrip() for line in _split_columns(text.split('\n'))]
+
+    # Page numbers, then running headers and footers (the first copy stays)
+    lines = [line for line in lines if not PAGE_NUMBER.match(line.strip())]
+    counts = Counter(line.strip() for line in lines)
+    last_seen, kept = {}, []
+    for line in lines:
+        key = line.strip()
+        # Not bullets, headings, dates or the lowercase second half of a wrapped line
+        if (counts[key] > 1 and key and not key[0].islower() and len(key) <= HEADER_MAX_CHARS
+                and not BULLET.match(key) and not key.endswith(':') and not DATE_RANGE.search(key)
+                and not _is_heading(key)):
+            previous = last_seen.get(key)
+            last_seen[key] = len(kept)
+            if previous is not None and len(kept) - previous >= HEADER_MIN_GAP:
+                continue
+        kept.append(line)
+
+    # Re-join hyphenated words and wrapped sentences; normalise bullets and spacing.
+    # Not in the contact block, where each line stands alone, nor for addresses and links.
+    out = []
+    in_contact = True
+    for line in kept:
+        line = ' '.join(BULLET_GLYPHS.sub('- ', line).split())
+        previous = out[-1] if out else ''
+        if (line and previous and line[0].islower() and not in_contact and not _is_heading(previous)
+                and not CONTACT.search(line) and not CONTACT.search(previous)):
+            if re.search(r'[^\W\d_]-$', previous):
+                out[-1] = previous[:-1] + line
+                continue
+            if not re.search(r'[.:;!?]$', previous):
+                out[-1] = f'{previous} {line}'
+                continue
+        if not line and not previous:
+            continue
+        if line and line == previous:
+            continue
+        out.append(line)
+        if in_contact and (heading_kind(line) not in (None, 'other') or len(out) >= CONTACT_BLOCK_LINES):
+            in_contact = False
+    return '\n'.join(out).strip()
+
+
+def sections(text):
+    """[Section], in order; the first (kind 'header', no heading) holds whatever precedes the first heading.
+
+    An unknown all-caps line only starts a section after a known one: at the
+    top it is more likely the name, under experience a job title.
+    """
+    result = [Section('header', None, [])]
+    for line in text.split('\n'):
+        kind = heading_kind(line)
+        if kind == 'other' and result[-1].kind in ('header', 'experience'):
+            kind = None
+        if kind:
+            result.append(Section(kind, line, []))
+        else:
+            result[-1].lines.append(line)
+    return result
+
+
+def jobs(lines):
+    """Split experience lines into entries: [(heading lines, bullet lines)], in the order written.
+
+    An entry starts at a line with a date range, or at the line just above it
+    when that is the job title on its own line.
+    """
+    entries, preamble = [], []
+    for line in lines:
+        if DATE_RANGE.search(line) and not BULLET.match(line):
+            heading = [line]
+            above = entries[-1][1] if entries else preamble
+            if above and above[-1] and not BULLET.match(above[-1]) and (len(above) < 2 or not above[-2]):
+                heading.insert(0, above.pop())
+            entries.append((heading, []))
+        elif entries:
+            entries[-1][1].append(line)
+        else:
+            preamble.append(line)
+    if not entries:
+        return [(preamble, [])] if preamble else []
+    entries[0][0][:0] = preamble
+    return entries
+
+
+# Drop order for compact(): lower levels go first
+DROP_REFERENCES, DROP_INTERESTS, DROP_REPEATS, DROP_OLD_BULLETS, DROP_OTHER_TAIL, DROP_EDUCATION_TAIL, \
+    DROP_JOB_BULLETS, DROP_SUMMARY_TAIL = range(8)
+KEEP_BULLETS = 2        # per job, until DROP_JOB_BULLETS
+KEEP_RECENT_JOBS = 2    # whose bullets are never dropped
+KEEP_SECTION_LINES = {'other': 3, 'education': 4, 'certifications': 4, 'skills': 6, 'summary': 4}
+
+
+def _droppable(parts):
+    """[(line, drop level or None, order)] for the sections of a resume; within a level, lower orders go first."""
+    rows = []
+    seen_bullets = set()
+    for section in parts:
+        if section.heading is not None:
+            level = {'references': DROP_REFERENCES, 'interests': DROP_INTERESTS}.get(section.kind)
+            rows.append((section.heading, level, len(rows)))
+        if section.kind in ('references', 'interests'):
+            level = DROP_REFERENCES if section.kind == 'references' else DROP_INTERESTS
+            rows += [(line, level, len(rows)) for line in section.lines]
+            continue
+        if section.kind == 'experience':
+            entries = jobs(section.lines)
+            for age, (heading, bullets) in enumerate(entries):
+                rows += [(line, None, 0) for line in heading]
+                recent = age < KEEP_RECENT_JOBS
+                # Older jobs lose their bullets first, and within a job the last bullets first
+                oldest_first = (len(entries) - age) * 1000
+                for i, line in enumerate(bullets):
+                    key = BULLET.sub('', line).lower()
+                    if not line:
+                        level = None
+                    elif key in seen_bullets:
+                        level = DROP_REPEATS
+                    elif i < KEEP_BULLETS:
+                        level = None if recent else DROP_JOB_BULLETS
+                    else:
+                        level = DROP_JOB_BULLETS if recent else DROP_OLD_BULLETS
+                    seen_bullets.add(key)
+                    rows.append((line, level, oldest_first - i))
+            continue
+        keep = KEEP_SECTION_LINES.get(section.kind)
+        level = {'other': DROP_OTHER_TAIL, 'education': DROP_EDUCATION_TAIL, 'certifications': DROP_EDUCATION_TAIL,
+                 'skills': DROP_OTHER_TAIL, 'summary': DROP_SUMMARY_TAIL}.get(section.kind)
+        content = 0
+        for line in section.lines:
+            content += bool(line)
+            droppable = keep is not None and content > keep and line
+            rows.append((line, level if droppable else None, -len(rows)))
+    return rows
+
+
+def compact(text, budget_tokens):
+    """Clean `text` and fit it into `budget_tokens`, dropping the least informative lines first."""
+    cleaned = clean(text)
+    raw_tokens, clean_tokens = estimate_tokens(text), estimate_tokens(cleaned)
+    if clean_tokens <= budget_tokens:
+        return Compacted(cleaned, raw_tokens, clean_tokens, clean_tokens, False)
+
+    rows = _droppable(sections(cleaned))
+    budget_chars = budget_tokens * 4
+    size = len(cleaned)
+    dropped = set()
+    candidates = sorted((level, order, index) for index, (_, level, order) in enumerate(rows) if level is not None)
+    for level, _, index in candidates:
+        if size <= budget_chars:
+            break
+        dropped.add(index)
+        size -= len(rows[index][0]) + 1
+    lines = [line for index, (line, _, _) in enumerate(rows) if index not in dropped]
+    result = re.sub(r'\n{3,}', '\n\n', '\n'.join(lines)).strip()
+    if len(result) > budget_chars:
+        result = result[:budget_chars - len(TRUNCATED) - 1].rsplit('\n', 1)[0] + '\n' + TRUNCATED
+    return Compacted(result, raw_tokens, clean_tokens, estimate_tokens(result), True)
@@ -0,0 +1,127 @@
+"""
+Constant-time roast score statistics.
+
+Scores are integers from 0 to 100, so a histogram with one bin per score is
+exact and small. ScoreStats keeps:
+
+- a fixed-size ring buffer of the most recent scores (array-backed, no
+  per-append allocation), with a histogram and sum of just those scores, so
+  the mean and percentiles of the recent window are O(1);
+- a histogram per UTC day for the last few days (the daily distribution).
+
+Every operation is bounded by the 101 bins, whatever the traffic.
+"""
+
+import threading
+import time
+from array import array
+from datetime import datetime, timezone
+
+MAX_SCORE = 100
+BINS = MAX_SCORE + 1
+
+
+def _day(ts=None):
+    return datetime.fromtimestamp(ts or time.time(), timezone.utc).strftime('%Y-%m-%d')
+
+
+def _percentile(hist, total, pct):
+    """Smallest score with at least pct% of the histogram at or below it."""
+    if not total:
+        return None
+    rank = max(1, -(-total * pct // 100))  # ceil(total * pct / 100)
+    seen = 0
+    for score, n in enumerate(hist):
+        seen += n
+        if seen >= rank:
+            return score
+    return MAX_SCORE
+
+
+def _summary(hist, total, score_sum):
+    return {
+        'count': total,
+        'mean': round(score_sum / total, 1) if total else None,
+        'p25': _percentile(hist, total, 25),
+        'p50': _percentile(hist, total, 50),
+        'p75': _percentile(hist, total, 75),
+        'p90': _percentile(hist, total, 90),
+    }
+
+
+class ScoreStats:
+    def __init__(self, window=256, days=14):
+        self.window = window
+        self.days = days
+        self._ring = array('b', [0]) * window
+        self._next = 0          # slot the next score goes into
+        self._size = 0
+        self._hist = array('l', [0]) * BINS   # counts of the scores in the ring
+        self._sum = 0
+        self._daily = {}        # 'YYYY-MM-DD' -> [histogram, count, sum]
+        self._lock = threading.Lock()
+
+    def add(self, score, ts=None):
+        score = min(max(int(score), 0), MAX_SCORE)
+        with self._lock:
+            if self._size == self.window:
+                evicted = self._ring[self._next]
+                self._hist[evicted] -= 1
+                self._sum -= evicted
+            else:
+                self._size += 1
+            self._ring[self._next] = score
+            self._next = (self._next + 1) % self.window
+            self._hist[score] += 1
+            self._sum += score
+
+            day = _day(ts)
+            entry = self._daily.get(day)
+            if entry is None:
+                entry = self._daily[day] = [array('l', [0]) * BINS, 0, 0]
+                if len(self._daily) > self.days:
+                    del self._daily[min(self._daily)]
+            entry[0][score] += 1
+            entry[1] += 1
+            entry[2] += score
+
+    def __len__(self):
+        return self._size
+
+    def recent(self, n=None):
+        """The last n scores in the window, oldest first."""
+        with self._lock:
+            n = self._size if n is None else min(n, self._size)
+            start = (self._next - n) % self.window
+            if start + n <= self.window:
+                return self._ring[start:start + n].tolist()
+            return (self._ring[start:] + self._ring[:(start + n) % self.window]).tolist()
+
+    def mean(self):
+        with self._lock:
+            return self._sum / self._size if self._size else None
+
+    def percentile(self, pct):
+        with self._lock:
+            return _percentile(self._hist, self._size, pct)
+
+    def summary(self):
+        """Count, mean and quartiles of the recent window."""
+        with self._lock:
+            return _summary(self._hist, self._size, self._sum)
+
+    def day_summary(self, day=None, bucket_width=10):
+        """Summary and bucketed distribution ('0-9': n, ..., '90-100': n) of one UTC day."""
+        with self._lock:
+            hist, total, score_sum = self._daily.get(day or _day(), [None, 0, 0])
+            distribution = {}
+            for low in range(0, MAX_SCORE, bucket_width):
+                high = low + bucket_width - 1 if low + bucket_width < MAX_SCORE else MAX_SCORE
+                distribution[f'{low}-{high}'] = sum(hist[low:high + 1]) if hist else 0
+            return {**_summary(hist or (), total, score_sum), 'distribution': distribution}
+
+    def daily(self):
+        """Day summaries, newest first."""
+        with self._lock:
+            days = sorted(self._daily, reverse=True)
+        return {day: self.day_summary(day) for day in days}
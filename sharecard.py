@@ -0,0 +1,348 @@
+"""
+Open Graph share cards for /score/<score>, drawn in pure Python.
+
+There are only 101 possible cards, so they are rendered once into a cache
+directory as content-hashed PNGs (score-041-<hash>.png) and served as
+immutable files. Rendering runs in a separate process, never in a request
+worker:
+
+    python -m sharecard og_cache        # pre-render at build/deploy time
+
+ShareCards.name_for() starts that process on first use if the cache is
+empty, and returns None (use the static og.png) until the cards exist.
+"""
+
+import hashlib
+import json
+import math
+import os
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+
+WIDTH, HEIGHT = 1200, 630
+RENDER_VERSION = 1   # bump when the design changes so caches re-render
+LOCK_STALE_SECONDS = 300
+
+BG = (8, 8, 10)
+CARD = (17, 17, 20)
+BORDER = (37, 37, 48)
+TEXT = (237, 237, 240)
+MUTED = (124, 124, 138)
+ORANGE = (255, 107, 44)
+RED, YELLOW, GREEN = (239, 68, 68), (234, 179, 8), (34, 197, 94)
+
+# 5x7 bitmap font: 7 rows of 5 columns per glyph
+FONT = {
+    'A': ('01110', '10001', '10001', '11111', '10001', '10001', '10001'),
+    'B': ('11110', '10001', '10001', '11110', '10001', '10001', '11110'),
+    'C': ('01110', '10001', '10000', '10000', '10000', '10001', '01110'),
+    'D': ('11110', '10001', '10001', '10001', '10001', '10001', '11110'),
+    'E': ('11111', '10000', '10000', '11110', '10000', '10000', '11111'),
+    'F': ('11111', '10000', '10000', '11110', '10000', '10000', '10000'),
+    'G': ('01110', '10001', '10000', '10111', '10001', '10001', '01111'),
+    'H': ('10001', '10001', '10001', '11111', '10001', '10001', '10001'),
+    'I': ('01110', '00100', '00100', '00100', '00100', '00100', '01110'),
+    'J': ('00111', '00010', '00010', '00010', '00010', '10010', '01100'),
+    'K': ('10001', '10010', '10100', '11000', '10100', '10010', '10001'),
+    'L': ('10000', '10000', '10000', '10000', '10000', '10000', '11111'),
+    'M': ('10001', '11011', '10101', '10101', '10001', '10001', '10001'),
+    'N': ('10001', '10001', '11001', '10101', '10011', '10001', '10001'),
+    'O': ('01110', '10001', '10001', '10001', '10001', '10001', '01110'),
+    'P': ('11110', '10001', '10001', '11110', '10000', '10000', '10000'),
+    'Q': ('01110', '10001', '10001', '10001', '10101', '10010', '01101'),
+    'R': ('11110', '10001', '10001', '11110', '10100', '10010', '10001'),
+    'S': ('01111', '10000', '10000', '01110', '00001', '00001', '11110'),
+    'T': ('11111', '00100', '00100', '00100', '00100', '00100', '00100'),
+    'U': ('10001', '10001', '10001', '10001', '10001', '10001', '01110'),
+    'V': ('10001', '10001', '10001', '10001', '10001', '01010', '00100'),
+    'W': ('10001', '10001', '10001', '10101', '10101', '10101', '01010'),
+    'X': ('10001', '10001', '01010', '00100', '01010', '10001', '10001'),
+    'Y': ('10001', '10001', '01010', '00100', '00100', '00100', '00100'),
+    'Z': ('11111', '00001', '00010', '00100', '01000', '10000', '11111'),
+    '0': ('01110', '10001', '10011', '10101', '11001', '10001', '01110'),
+    '1': ('00100', '01100', '00100', '00100', '00100', '00100', '01110'),
+    '2': ('01110', '10001', '00001', '00010', '00100', '01000', '11111'),
+    '3': ('11111', '00010', '00100', '00010', '00001', '10001', '01110'),
+    '4': ('00010', '00110', '01010', '10010', '11111', '00010', '00010'),
+    '5': ('11111', '10000', '11110', '00001', '00001', '10001', '01110'),
+    '6': ('00110', '01000', '10000', '11110', '10001', '10001', '01110'),
+    '7': ('11111', '00001', '00010', '00100', '01000', '01000', '01000'),
+    '8': ('01110', '10001', '10001', '01110', '10001', '10001', '01110'),
+    '9': ('01110', '10001', '10001', '01111', '00001', '00010', '01100'),
+    ' ': ('00000',) * 7,
+    '.': ('00000', '00000', '00000', '00000', '00000', '01100', '01100'),
+    ',': ('00000', '00000', '00000', '00000', '01100', '00100', '01000'),
+    '?': ('01110', '10001', '00001', '00010', '00100', '00000', '00100'),
+    '!': ('00100', '00100', '00100', '00100', '00100', '00000', '00100'),
+    "'": ('00100', '00100', '01000', '00000', '00000', '00000', '00000'),
+    '/': ('00001', '00001', '00010', '00100', '01000', '10000', '10000'),
+    '-': ('00000', '00000', '00000', '11111', '00000', '00000', '00000'),
+    ':': ('00000', '01100', '01100', '00000', '01100', '01100', '00000'),
+}
+# Lit pixels per glyph as (column, row), so drawing skips the blanks
+_GLYPHS = {ch: [(x, y) for y, row in enumerate(rows) for x, bit in enumerate(row) if bit == '1']
+           for ch, rows in FONT.items()}
+
+
+def score_color(score):
+    """Same thresholds as the ring on score.html."""
+    return GREEN if score >= 70 else YELLOW if score >= 45 else RED
+
+
+def score_message(score):
+    """The headline score.html shows for this score."""
+    if score < 30:
+        return 'Yikes. Think you can do better?'
+    if score < 50:
+        return f'Not great. Can you beat {score}?'
+    if score < 70:
+        return 'Decent. But can you beat it?'
+    return f'Impressive. Can you match {score}?'
+
+
+class Canvas:
+    """An RGB bitmap with just the primitives a share card needs."""
+
+    def __init__(self, width, height, color):
+        self.width, self.height = width, height
+        self.pixels = bytearray(bytes(color) * (width * height))
+
+    def fill_rect(self, x, y, w, h, color):
+        x0, x1 = max(x, 0), min(x + w, self.width)
+        if x1 <= x0:
+            return
+        run = bytes(color) * (x1 - x0)
+        for row in range(max(y, 0), min(y + h, self.height)):
+            start = (row * self.width + x0) * 3
+            self.pixels[start:start + len(run)] = run
+
+    def blend(self, x, y, color, alpha):
+        if alpha <= 0 or not (0 <= x < self.width and 0 <= y < self.height):
+            return
+        i = (y * self.width + x) * 3
+        px = self.pixels
+        if alpha >= 1:
+            px[i:i + 3] = bytes(color)
+            return
+        for c in range(3):
+            px[i + c] = int(px[i + c] + (color[c] - px[i + c]) * alpha + 0.5)
+
+    def rounded_rect(self, x, y, w, h, radius, color):
+        self.fill_rect(x + radius, y, w - 2 * radius, h, color)
+        self.fill_rect(x, y + radius, radius, h - 2 * radius, color)
+        self.fill_rect(x + w - radius, y + radius, radius, h - 2 * radius, color)
+        for cx, cy in ((x + radius, y + radius), (x + w - radius - 1, y + radius),
+                       (x + radius, y + h - radius - 1), (x + w - radius - 1, y + h - radius - 1)):
+            for dy in range(-radius, radius + 1):
+                for dx in range(-radius, radius + 1):
+                    px, py = cx + dx, cy + dy
+                    inside = (px < x + radius or px >= x + w - radius) and (py < y + radius or py >= y + h - radius)
+                    if inside:
+                        self.blend(px, py, color, min(max(radius + 0.5 - math.hypot(dx, dy), 0), 1))
+
+    def ring(self, cx, cy, radius, thickness, color, fraction=1.0):
+        """Anti-aliased ring, or the arc of it that runs clockwise from 12 o'clock for `fraction`."""
+        inner, outer = radius - thickness / 2, radius + thickness / 2
+        sweep = fraction * 2 * math.pi
+        cap_radius = thickness / 2 + 0.5
+        end_x, end_y = cx + radius * math.sin(sweep), cy - radius * math.cos(sweep)
+        for y in range(int(cy - outer) - 1, int(cy + outer) + 2):
+            dy = y + 0.5 - cy
+            if abs(dy) > outer + 1:
+                continue
+            # Only visit the pixels of this row that can touch the band
+            x_out = math.sqrt(max((outer + 1) ** 2 - dy * dy, 0))
+            x_in = math.sqrt((inner - 1) ** 2 - dy * dy) if abs(dy) < inner - 1 else 0
+            for lo, hi in ((cx - x_out, cx - x_in), (cx + x_in, cx + x_out)):
+                for x in range(int(lo) - 1, int(hi) + 2):
+                    dx = x + 0.5 - cx
+                    d = math.hypot(dx, dy)
+                    alpha = min(d - inner + 0.5, outer - d + 0.5, 1)
+                    if alpha <= 0:
+                        continue
+                    if fraction < 1 and math.atan2(dx, -dy) % (2 * math.pi) > sweep:
+                        # Outside the sweep: only the round caps at either end
+                        start_cap = cap_radius - math.hypot(dx, dy + radius)
+                        end_cap = cap_radius - math.hypot(x + 0.5 - end_x, y + 0.5 - end_y)
+                        alpha = min(alpha, max(start_cap, end_cap))
+                    self.blend(x, y, color, alpha)
+
+    @staticmethod
+    def text_width(text, scale):
+        return max(len(text) * 6 * scale - scale, 0)
+
+    def text(self, x, y, text, scale, color):
+        for i, ch in enumerate(text.upper()):
+            for gx, gy in _GLYPHS.get(ch, _GLYPHS['?']):
+                self.fill_rect(x + (i * 6 + gx) * scale, y + gy * scale, scale, scale, color)
+
+    def png(self):
+        row_bytes = self.width * 3
+        raw = b''.join(b'\x00' + bytes(self.pixels[r * row_bytes:(r + 1) * row_bytes])
+                       for r in range(self.height))
+
+        def chunk(kind, data):
+            return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+        header = struct.pack('>IIBBBBB', self.width, self.height, 8, 2, 0, 0, 0)
+        return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header)
+                + chunk(b'IDAT', zlib.compress(raw, 9)) + chunk(b'IEND', b''))
+
+
+def _wrap(text, max_chars):
+    lines, line = [], ''
+    for word in text.split():
+        if line and len(line) + 1 + len(word) > max_chars:
+            lines.append(line)
+            line = word
+        else:
+            line = f'{line} {word}'.strip()
+    return lines + [line] if line else lines
+
+
+def render(score):
+    """PNG bytes of the share card for one score."""
+    color = score_color(score)
+    c = Canvas(WIDTH, HEIGHT, BG)
+    c.rounded_rect(40, 40, WIDTH - 80, HEIGHT - 80, 28, BORDER)
+    c.rounded_rect(42, 42, WIDTH - 84, HEIGHT - 84, 26, CARD)
+    c.fill_rect(240, 42, WIDTH - 480, 4, ORANGE)
+
+    # Score ring, as on score.html
+    cx, cy = 330, HEIGHT // 2
+    c.ring(cx, cy, 170, 26, BORDER)
+    if score:
+        c.ring(cx, cy, 170, 26, color, score / 100)
+    digits = str(score)
+    c.text(cx - c.text_width(digits, 16) // 2, cy - 78, digits, 16, TEXT)
+    c.text(cx - c.text_width('OUT OF 100', 3) // 2, cy + 58, 'OUT OF 100', 3, MUTED)
+
+    left = 580
+    c.text(left, 110, 'CVROAST', 6, ORANGE)
+    c.text(left, 196, "Someone's resume scored", 3, MUTED)
+    y = 250
+    for line in _wrap(score_message(score), 18):
+        c.text(left, y, line, 5, TEXT)
+        y += 56
+    c.text(left, 470, 'Check yours free', 4, TEXT)
+    c.text(left, 515, 'cvroast.com', 4, ORANGE)
+    return c.png()
+
+
+def card_name(score, data):
+    return f'score-{score:03d}-{hashlib.sha256(data).hexdigest()[:12]}.png'
+
+
+def _write_atomic(path, data):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def render_all(directory):
+    """Render all 101 cards into `directory` and write manifest.json last."""
+    os.makedirs(directory, exist_ok=True)
+    cards = {}
+    for score in range(101):
+        data = render(score)
+        name = card_name(score, data)
+        path = os.path.join(directory, name)
+        if not os.path.exists(path):
+            _write_atomic(path, data)
+        cards[str(score)] = name
+    _write_atomic(os.path.join(directory, 'manifest.json'),
+                  json.dumps({'version': RENDER_VERSION, 'cards': cards}).encode())
+    return cards
+
+
+class ShareCards:
+    """Looks up rendered cards and starts the renderer when there are none."""
+
+    def __init__(self, directory, check_interval=5.0):
+        self.directory = directory
+        self.check_interval = check_interval
+        self._cards = {}
+        self._mtime = None
+        self._checked = 0.0
+        self._proc = None
+
+    @property
+    def _manifest(self):
+        return os.path.join(self.directory, 'manifest.json')
+
+    @property
+    def _lock(self):
+        return os.path.join(self.directory, 'render.lock')
+
+    def _load(self):
+        try:
+            mtime = os.stat(self._manifest).st_mtime
+        except FileNotFoundError:
+            return False
+        if mtime != self._mtime:
+            try:
+                with open(self._manifest) as f:
+                    manifest = json.load(f)
+            except (OSError, ValueError):
+                return False
+            self._mtime = mtime
+            self._cards = manifest['cards'] if manifest.get('version') == RENDER_VERSION else {}
+        return bool(self._cards)
+
+    def _start_renderer(self):
+        if self._proc is not None and self._proc.poll() is None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        try:
+            if time.time() - os.stat(self._lock).st_mtime < LOCK_STALE_SECONDS:
+                return   # another worker is rendering
+            os.remove(self._lock)
+        except FileNotFoundError:
+            pass
+        try:
+            os.close(os.open(self._lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            return
+        self._proc = subprocess.Popen(
+            [sys.executable, '-m', 'sharecard', self.directory, '--lock', self._lock],
+            cwd=os.path.dirname(os.path.abspath(__file__)), start_new_session=True,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+
+    def name_for(self, score):
+        """File name of the card for `score`, or None while the cards are being rendered."""
+        now = time.monotonic()
+        if now - self._checked >= self.check_interval:
+            self._checked = now
+            if self._proc is not None:
+                self._proc.poll()   # reap a finished renderer
+            if not self._load():
+                self._start_renderer()
+        return self._cards.get(str(score))
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description='Pre-render the /score/<n> share cards.')
+    parser.add_argument('directory')
+    parser.add_argument('--lock', help='lock file to remove when done')
+    args = parser.parse_args()
+    try:
+        started = time.perf_counter()
+        render_all(args.directory)
+        print(f'Rendered 101 cards into {args.directory} in {time.perf_counter() - started:.1f}s')
+    finally:
+        if args.lock:
+            try:
+                os.remove(args.lock)
+            except FileNotFoundError:
+                pass
+
+
+if __name__ == '__main__':
+    main()
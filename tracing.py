@@ -0,0 +1,266 @@
+"""
+Request tracing and slow-request profiling for CVRoast.
+
+A trace is started per request and spans are recorded around the expensive
+steps (file extraction, model calls, JSON parsing, Stripe, email). The trace
+ID is returned in the X-Trace-Id header and span timings in Server-Timing,
+so the browser dev tools show where a slow roast spent its time.
+
+The sampling profiler is opt-in: when enabled, a background thread samples
+the stacks of threads serving requests, and any request slower than the
+threshold has its collapsed stacks (flamegraph.pl / speedscope format) and
+spans written to a local directory.
+
+Async views run on the worker's event loop, shared by every request in
+flight, so a thread can't stand for a request there. The profiler wraps the
+loop's tasks (instrument()) to note which request each task step runs for:
+loop samples go to that request, and a request with no step running is
+awaiting I/O, sampled as AWAITING. A request thread blocked on the loop
+(waiting_on_loop()) is not sampled meanwhile.
+"""
+
+import asyncio
+import collections.abc
+import contextvars
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+_trace = contextvars.ContextVar('trace', default=None)
+_parent = contextvars.ContextVar('parent_span', default=None)
+
+TRACE_ID_RE = re.compile(r'^[0-9a-fA-F-]{8,64}$')
+MAX_SERVER_TIMING_SPANS = 20
+AWAITING = '(awaiting I/O)'
+
+
+class Trace:
+    def __init__(self, trace_id=None, name=''):
+        self.trace_id = trace_id or uuid.uuid4().hex
+        self.name = name
+        self.started = time.perf_counter()
+        self.started_at = time.time()
+        self.spans = []       # [name, span_id, parent_id, start offset s, duration s, attrs]
+        self.samples = {}     # collapsed stack -> count
+        self.thread_id = threading.get_ident()
+        self._lock = threading.Lock()
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def add_span(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+    def server_timing(self):
+        parts = [f'{name.replace(" ", "_")};dur={duration * 1000:.1f}'
+                 for name, _, _, _, duration, _ in self.spans[:MAX_SERVER_TIMING_SPANS]]
+        parts.append(f'total;dur={self.elapsed() * 1000:.1f}')
+        return ', '.join(parts)
+
+    def to_dict(self):
+        return {
+            'trace_id': self.trace_id,
+            'name': self.name,
+            'started_at': self.started_at,
+            'duration_ms': round(self.elapsed() * 1000, 1),
+            'spans': [{'name': name, 'id': span_id, 'parent': parent, 'start_ms': round(start * 1000, 1),
+                       'duration_ms': round(duration * 1000, 1), **attrs}
+                      for name, span_id, parent, start, duration, attrs in self.spans],
+        }
+
+
+def trace_id_from_headers(headers):
+    """Reuse an incoming X-Trace-Id or W3C traceparent so traces join up with a proxy's."""
+    trace_id = headers.get('X-Trace-Id', '')
+    if not trace_id and headers.get('traceparent'):
+        parts = headers['traceparent'].split('-')
+        trace_id = parts[1] if len(parts) == 4 else ''
+    return trace_id if TRACE_ID_RE.match(trace_id) else None
+
+
+def start_trace(trace_id=None, name=''):
+    trace = Trace(trace_id, name)
+    _trace.set(trace)
+    _parent.set(None)
+    return trace
+
+
+def current_trace():
+    return _trace.get()
+
+
+def end_trace():
+    trace = _trace.get()
+    _trace.set(None)
+    return trace
+
+
+@contextmanager
+def span(name, **attrs):
+    """Time a block as a span of the current trace. A no-op outside a trace."""
+    trace = _trace.get()
+    if trace is None:
+        yield
+        return
+    span_id = uuid.uuid4().hex[:8]
+    parent = _parent.get()
+    token = _parent.set(span_id)
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException as e:
+        attrs['error'] = type(e).__name__
+        raise
+    finally:
+        _parent.reset(token)
+        trace.add_span([name, span_id, parent, start - trace.started, time.perf_counter() - start, attrs])
+
+
+class _Attributed(collections.abc.Coroutine):
+    """A task's coroutine whose steps mark the loop thread as running for the task's trace."""
+
+    __slots__ = ('_coro', '_profiler')
+
+    def __init__(self, coro, profiler):
+        self._coro = coro
+        self._profiler = profiler
+
+    def send(self, value):
+        return self._profiler._step(self._coro.send, value)
+
+    def throw(self, *args):
+        return self._profiler._step(self._coro.throw, *args)
+
+    def close(self):
+        return self._coro.close()
+
+    def __await__(self):
+        return self._coro.__await__()
+
+    def __repr__(self):
+        return repr(self._coro)
+
+
+class SlowRequestProfiler:
+    """Samples the stacks of in-flight requests and keeps the slow ones."""
+
+    def __init__(self, threshold_ms, directory, interval_ms=10):
+        self.threshold = threshold_ms / 1000
+        self.directory = directory
+        self.interval = interval_ms / 1000
+        self._active = set()  # Traces of the requests in flight
+        self._running = {}    # thread id -> Trace whose code the thread is running
+        self._lock = threading.Lock()
+        self._sampler_pid = None
+        self._loops = set()
+
+    def _ensure_sampler(self):
+        if self._sampler_pid == os.getpid():
+            return
+        self._sampler_pid = os.getpid()
+        threading.Thread(target=self._sample_loop, name='slow-request-profiler', daemon=True).start()
+
+    def _sample_loop(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                active = set(self._active)
+                running = list(self._running.items())
+            if not active:
+                continue
+            frames = sys._current_frames()
+            keys = [(trace, AWAITING) for trace in active.difference(trace for _, trace in running)]
+            for thread_id, trace in running:
+                frame = frames.get(thread_id)
+                if frame is None or trace not in active:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+                    frame = frame.f_back
+                keys.append((trace, ';'.join(reversed(stack))))
+            # finish() reads the samples on the request thread
+            with self._lock:
+                for trace, key in keys:
+                    trace.samples[key] = trace.samples.get(key, 0) + 1
+
+    def instrument(self, loop):
+        """Attribute the steps of `loop`'s tasks to the trace in each task's context."""
+        with self._lock:
+            if id(loop) in self._loops:
+                return
+            self._loops.add(id(loop))
+        previous = loop.get_task_factory()
+
+        def factory(loop, coro, **kwargs):
+            coro = _Attributed(coro, self)
+            if previous is not None:
+                return previous(loop, coro, **kwargs)
+            return asyncio.Task(coro, loop=loop, **kwargs)
+        loop.set_task_factory(factory)
+
+    def _step(self, method, *args):
+        trace = _trace.get()
+        if trace is None or trace not in self._active:
+            return method(*args)
+        thread_id = threading.get_ident()
+        with self._lock:
+            outer = self._running.get(thread_id)
+            self._running[thread_id] = trace
+        try:
+            return method(*args)
+        finally:
+            with self._lock:
+                if outer is None:
+                    self._running.pop(thread_id, None)
+                else:
+                    self._running[thread_id] = outer
+
+    @contextmanager
+    def waiting_on_loop(self):
+        """Don't sample this thread while it waits for the request's coroutine on the loop."""
+        thread_id = threading.get_ident()
+        with self._lock:
+            trace = self._running.pop(thread_id, None)
+        try:
+            yield
+        finally:
+            if trace is not None:
+                with self._lock:
+                    self._running[thread_id] = trace
+
+    def begin(self, trace):
+        self._ensure_sampler()
+        on_loop = asyncio._get_running_loop() is not None
+        with self._lock:
+            self._active.add(trace)
+            # On the loop the thread is shared: _step() claims it per task step instead
+            if not on_loop:
+                self._running[trace.thread_id] = trace
+
+    def finish(self, trace):
+        """Stop sampling `trace`; write it out if it was slow. Returns the file path, if any."""
+        with self._lock:
+            self._active.discard(trace)
+            if self._running.get(trace.thread_id) is trace:
+                del self._running[trace.thread_id]
+            samples = dict(trace.samples)
+        if trace.elapsed() < self.threshold:
+            return None
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = time.strftime('%Y%m%dT%H%M%S', time.gmtime(trace.started_at))
+        base = os.path.join(self.directory, f'{stamp}-{trace.trace_id}')
+        with open(f'{base}.folded', 'w') as f:
+            for stack, count in sorted(samples.items()):
+                f.write(f'{stack} {count}\n')
+        with open(f'{base}.json', 'w') as f:
+            json.dump({**trace.to_dict(), 'sample_interval_ms': self.interval * 1000,
+                       'samples': sum(samples.values())}, f, indent=2)
+        return f'{base}.folded'